@@ -1,18 +1,55 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, g
-import sqlite3
-import requests
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, g, Response, abort, stream_with_context, make_response
+from markupsafe import Markup
 import json
 import os
+import sys
 from datetime import datetime
 import logging
 import time
-import re
+import asyncio
+import click
+import base64
+import tempfile
 from dotenv import load_dotenv
 from flask_wtf.csrf import CSRFProtect, generate_csrf
 from flask_talisman import Talisman
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.middleware.proxy_fix import ProxyFix
+import assets
+import auth
+import db
+import search as search_module
+import ingredient_index
+import library
+import migrations
+import model_router
+import near_duplicates
+import page_cache
+import prompts
+import recipe_store
+from generation_cache import GenerationCache, cache_key
+from gemini_client import GeminiClient, AsyncGeminiClient, GeminiError, CircuitOpenError, DEFAULT_BASE_URL, DEFAULT_MODEL
+from recipe_parser import parse_recipe_response, ingredients_to_strings, instruction_to_string
+from recipe_stream import IncrementalJSONParser, chunk_text, iter_stream_text
+from quota import UsageQuota, QuotaExceeded
+from jobs import GenerationJobQueue, AsyncGenerationJobQueue, GenerationError, QueueFullError, FINISHED_STATUSES
+from metrics import MetricsRegistry
+
+# Durata fazelor de pornire după importuri (importul `app` în fiecare worker), logată la final;
+# `python tools/profile_startup.py` le raportează împreună cu costul importurilor
+STARTUP_PHASES = []
+_startup_mark = time.perf_counter()
+
+
+def startup_phase(name):
+    """Încheie faza de pornire `name` (durata de la faza precedentă)."""
+    global _startup_mark
+    now = time.perf_counter()
+    STARTUP_PHASES.append((name, now - _startup_mark))
+    _startup_mark = now
+
 
 load_dotenv()
+startup_phase('dotenv')
 
 # Aplicație Flask pentru generarea și gestionarea rețetelor cu AI
 app = Flask(__name__)
@@ -67,10 +104,62 @@ talisman = Talisman(
     session_cookie_secure=SECURE_COOKIES,
 )
 
+# Fișiere statice: bundle-urile cu hash generate de `python assets.py` (manifest) sunt servite
+# de un middleware WSGI înaintea Flask, cu `Cache-Control: immutable` și variante gzip/brotli.
+# Fără build (sau cu ASSETS_MANIFEST=false, util în dezvoltare) se servesc fișierele originale.
+asset_manifest = assets.Manifest(enabled=os.getenv('ASSETS_MANIFEST', 'true').lower() == 'true')
+app.wsgi_app = assets.StaticFilesMiddleware(app.wsgi_app, static_dir=app.static_folder)
+
+# În spatele unui proxy (Render) `request.remote_addr` e adresa proxy-ului; cu TRUSTED_PROXY_COUNT=n
+# se folosește adresa clientului din X-Forwarded-For (limitarea login-urilor per IP depinde de ea)
+TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', '0'))
+if TRUSTED_PROXY_COUNT:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT)
+startup_phase('flask')
+
+
+@app.template_global()
+def asset_url(filename):
+    """URL-ul unui fișier static după numele logic (`js/base.js`), cu hash dacă există build."""
+    return url_for('static', filename=asset_manifest.resolve(filename))
+
+
 # Expune tokenul CSRF în cookie și în template pentru formulare
+# Lazy (implicit): tokenul se semnează doar când un template îl afișează sau sesiunea nu are încă unul,
+# iar cookie-ul se atașează doar răspunsurilor HTML; fișierele statice și JSON-ul nu ating sesiunea
+# (deci nici `Set-Cookie`, nici `Vary: Cookie`). CSRF_LAZY=false revine la tokenul pe fiecare răspuns.
+CSRF_LAZY = os.getenv('CSRF_LAZY', 'true').lower() == 'true'
+CSRF_FIELD_NAME = 'csrf_token'
+
+
+class LazyCsrfToken:
+    """Tokenul CSRF pentru template-uri, generat abia când e afișat (`{{ csrf_token }}`)."""
+    __slots__ = ('_token',)
+
+    def __init__(self):
+        self._token = None
+
+    def __str__(self):
+        # Galeria îl afișează în fiecare formular de ștergere: se generează o singură dată
+        if self._token is None:
+            try:
+                self._token = generate_csrf()
+            except Exception:
+                self._token = ''
+        return self._token
+
+    __html__ = __str__
+
+
 # Middleware: atașează un cookie cu token CSRF pentru a putea fi folosit din JS (header X-CSRFToken)
 @app.after_request
 def set_csrf_cookie(response):
+    if CSRF_LAZY:
+        if request.endpoint == 'static' or response.mimetype != 'text/html':
+            return response
+        # Tokenul e deja semnat dacă template-ul l-a folosit; altfel îl creăm doar pentru o sesiune nouă
+        if CSRF_FIELD_NAME not in g and CSRF_FIELD_NAME in session:
+            return response
     try:
         csrf_token = generate_csrf()
         response.set_cookie(
@@ -87,6 +176,8 @@ def set_csrf_cookie(response):
 @app.context_processor
 # Injectează tokenul CSRF în contextul Jinja pentru a-l include ușor în formulare
 def inject_csrf_token():
+    if CSRF_LAZY:
+        return dict(csrf_token=LazyCsrfToken())
     try:
         return dict(csrf_token=generate_csrf())
     except Exception:
@@ -100,78 +191,235 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Metrici de performanță în format Prometheus (`/metrics`), agregate între workerii Gunicorn:
+# fiecare worker scrie periodic un fișier în METRICS_DIR (implicit un director per proces master)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+# Dacă e setat, `/metrics` cere antetul `Authorization: Bearer <token>`
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+metrics = MetricsRegistry(
+    directory=os.getenv('METRICS_DIR') or os.path.join(tempfile.gettempdir(), f'recipe-metrics-{os.getppid()}'),
+    flush_interval=float(os.getenv('METRICS_FLUSH_INTERVAL', '5')),
+    enabled=METRICS_ENABLED,
+)
+GEMINI_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+metrics.histogram('recipe_http_request_duration_seconds', 'Durata request-urilor HTTP', ('endpoint', 'method'))
+metrics.counter('recipe_http_requests_total', 'Request-uri HTTP după status', ('endpoint', 'method', 'status'))
+metrics.counter('recipe_db_queries_total', 'Interogări SQLite executate în request-uri', ('endpoint',))
+metrics.counter('recipe_db_query_seconds_total', 'Timp petrecut în interogări SQLite în request-uri', ('endpoint',))
+metrics.counter('recipe_gemini_attempts_total', 'Încercări HTTP către Gemini după status', ('status',))
+metrics.histogram('recipe_gemini_attempt_duration_seconds', 'Durata unei încercări HTTP către Gemini', ('status',), buckets=GEMINI_BUCKETS)
+metrics.histogram('recipe_gemini_call_duration_seconds', 'Durata unei generări Gemini, cu reîncercări și parsare', ('mode', 'outcome'), buckets=GEMINI_BUCKETS)
+metrics.counter('recipe_gemini_tokens_total', 'Tokeni Gemini raportați în usageMetadata', ('kind',))
+metrics.histogram('recipe_gemini_output_tokens', 'Tokenii unui răspuns Gemini după finishReason', ('finish_reason',),
+                  buckets=(128, 256, 512, 768, 1024, 1536, 2048, 4096, 8192))
+metrics.counter('recipe_gemini_calls_total', 'Apeluri Gemini (inclusiv cele refuzate de circuit breaker)')
+metrics.counter('recipe_gemini_call_failures_total', 'Apeluri Gemini eșuate după reîncercări')
+metrics.counter('recipe_gemini_calls_rejected_total', 'Apeluri Gemini refuzate de circuit breaker')
+metrics.counter('recipe_generation_cache_lookups_total', 'Căutări în cache-ul de generări după rezultat', ('result',))
+metrics.gauge('recipe_generation_in_flight', 'Job-uri de generare acceptate și neterminate')
+metrics.counter('recipe_fragment_cache_lookups_total', 'Căutări în cache-ul de fragmente HTML după rezultat', ('result',))
+metrics.counter('recipe_near_duplicates_total', 'Rețete aproape identice găsite (la salvare / înaintea generării)', ('path',))
+metrics.counter('recipe_login_attempts_total', 'Încercări de autentificare după rezultat', ('result',))
+metrics.histogram('recipe_password_hash_seconds', 'Durata calculului de hash al parolei', ('operation',),
+                  buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1))
+
+
+startup_phase('metrics')
+
+
+def _record_gemini_attempt(status, elapsed):
+    metrics.inc('recipe_gemini_attempts_total', (status,))
+    metrics.observe('recipe_gemini_attempt_duration_seconds', elapsed, (status,))
+
 # Cheie Gemini
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 
+# Client Gemini partajat (pool keep-alive, reîncercări cu backoff, circuit breaker)
+GEMINI_CLIENT_OPTIONS = dict(
+    base_url=os.getenv('GEMINI_BASE_URL', DEFAULT_BASE_URL),
+    model=os.getenv('GEMINI_MODEL', DEFAULT_MODEL),
+    connect_timeout=float(os.getenv('GEMINI_CONNECT_TIMEOUT', '5')),
+    read_timeout=float(os.getenv('GEMINI_READ_TIMEOUT', '25')),
+    max_retries=int(os.getenv('GEMINI_MAX_RETRIES', '2')),
+    breaker_threshold=int(os.getenv('GEMINI_BREAKER_THRESHOLD', '5')),
+    breaker_cooldown=float(os.getenv('GEMINI_BREAKER_COOLDOWN', '30')),
+    on_attempt=_record_gemini_attempt,
+)
+gemini_client = GeminiClient(GEMINI_API_KEY, pool_size=int(os.getenv('GEMINI_POOL_SIZE', '8')), **GEMINI_CLIENT_OPTIONS)
+# Clientul async (httpx), creat doar în modul ASGI (`enable_async_generation`)
+async_gemini_client = None
+
+# Prompt și generationConfig precompilate (prompts.py): răspuns JSON după responseSchema, limita de
+# tokeni a răspunsului și numărul de pași cerut (detaliu vs. latență)
+recipe_prompt = prompts.RecipePrompt(
+    min_steps=int(os.getenv('GEMINI_MIN_STEPS', '10')),
+    max_steps=int(os.getenv('GEMINI_MAX_STEPS', '0')) or None,
+    max_output_tokens=int(os.getenv('GEMINI_MAX_OUTPUT_TOKENS', '2048')),
+    structured_output=os.getenv('GEMINI_STRUCTURED_OUTPUT', 'true').lower() == 'true',
+)
+startup_phase('gemini')
+
 # Configurare bază de date
 # Fișierul SQLite pentru persistența utilizatorilor și rețetelor
-DATABASE = 'recipes.db'
+DATABASE = db.DATABASE
+
+
+# True dacă SQLite-ul are FTS5 și tabelul `recipes_fts` a fost creat (vezi search.py)
+FTS_ENABLED = False
 
 
 def init_db():
     """
-    Inițializează baza de date cu tabelele necesare.
-    
-    Creează tabelele (dacă nu există):
-    - recipes: stochează rețetele salvate
+    Aduce baza de date la ultima versiune a schemei (migrări versionate, vezi migrations.py).
+
+    Tabele principale:
+    - recipes (+ recipe_ingredients, recipe_steps): rețetele salvate, structurat
     - users: utilizatori (email + hash parolă)
     - usage_limits: contorizează generările pe zi pentru limitare
+    - generation_cache: rețete generate, indexate după ingredientele normalizate
+    - generation_jobs: job-urile de generare rulate în fundal (status + rezultat)
+    - recipes_fts: index full-text (FTS5) peste rețete, sincronizat prin triggere
+    - ingredient_terms / recipe_ingredient_terms: index inversat de ingrediente (vezi ingredient_index.py)
     """
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS recipes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            ingredients TEXT NOT NULL,
-            instructions TEXT NOT NULL,
-            difficulty_rating INTEGER NOT NULL,
-            wine_pairing TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT NOT NULL UNIQUE,
-            password_hash TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS usage_limits (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            day DATE NOT NULL,
-            count INTEGER NOT NULL DEFAULT 0,
-            UNIQUE(user_id, day)
-        )
-    ''')
+    global FTS_ENABLED
+    version, FTS_ENABLED = migrations.migrate_database(DATABASE)
+    logger.info("Database ready | schema_version=%s fts=%s", version, FTS_ENABLED)
 
-    conn.commit()
-    conn.close()
 
+def get_db():
+    """Conexiunea SQLite a thread-ului curent (reutilizată între request-uri, vezi db.py)."""
+    return db.get_connection(DATABASE)
 
-# Asigură existența tabelelor și sub Gunicorn/Render (la importul aplicației)
-# La import (inclusiv sub Gunicorn) ne asigurăm că tabelele necesare există
-try:
-    init_db()
-except Exception:
-    logger.exception("DB init failed at import time")
+
+@app.teardown_request
+def release_db(exc):
+    """Nu lăsăm tranzacții deschise pe conexiunea reutilizată de thread."""
+    db.release(DATABASE)
+
+
+# Sub Gunicorn schema e adusă la zi o singură dată, în master, înaintea fork-ului (gunicorn.conf.py),
+# care transmite rezultatul workerilor prin mediu. Altfel (python app.py, uvicorn, tool-uri) la import.
+if os.getenv('DB_SCHEMA_READY') == '1':
+    FTS_ENABLED = os.getenv('DB_FTS_ENABLED') == '1'
+else:
+    try:
+        init_db()
+    except Exception:
+        logger.exception("DB init failed at import time")
+startup_phase('database')
+
+# Cache pentru generări: aceleași ingrediente (normalizate) -> aceeași rețetă, fără apel Gemini
+generation_cache = GenerationCache(
+    DATABASE,
+    max_entries=int(os.getenv('GENERATION_CACHE_SIZE', '256')),
+    ttl_seconds=int(os.getenv('GENERATION_CACHE_TTL', str(6 * 3600))),
+    enabled=os.getenv('GENERATION_CACHE_ENABLED', 'true').lower() == 'true',
+)
+
+# Pagini de rețete / galerie: ETag + 304 și cache de fragmente randate (vezi page_cache.py)
+PAGE_CACHE_ENABLED = os.getenv('PAGE_CACHE_ENABLED', 'true').lower() == 'true'
+fragment_cache = page_cache.FragmentCache(
+    max_entries=int(os.getenv('FRAGMENT_CACHE_SIZE', '2000')),
+    enabled=PAGE_CACHE_ENABLED,
+)
+# Versiunea deploy-ului în ETag-uri (Render setează RENDER_GIT_COMMIT); altfel amprenta template-urilor
+RENDER_VERSION = os.getenv('RENDER_GIT_COMMIT') or page_cache.templates_fingerprint(
+    os.path.join(app.root_path, app.template_folder), asset_manifest.entries)
+startup_phase('caches')
+
+
+def _parse_generated_text(text, ingredients_text):
+    """Rețeta parsată din textul generat de Gemini sau None."""
+    parsed = parse_recipe_response(text, ingredients_text, strict=recipe_prompt.structured_output)
+    if parsed:
+        logger.info("Gemini parse OK | title='%s'", (parsed.get('title') or '')[:80])
+        return parsed
+    logger.warning("Gemini parse failed")
+    return None
 
 
-def get_gemini_response(ingredients_text):
+def _log_usage(data, mode):
+    """Tokenii cererii și ai răspunsului (usageMetadata) și motivul opririi, pentru reglarea limitelor."""
+    prompt_tokens, output_tokens, finish_reason = prompts.response_usage(data)
+    logger.info("Gemini usage | mode=%s prompt_tokens=%s output_tokens=%s finish_reason=%s",
+                mode, prompt_tokens, output_tokens, finish_reason)
+    if output_tokens is not None:
+        metrics.observe('recipe_gemini_output_tokens', output_tokens, (finish_reason or 'unknown',))
+    if finish_reason == 'MAX_TOKENS':
+        logger.warning("Gemini response truncated | max_output_tokens=%s", recipe_prompt.max_output_tokens)
+
+
+def _recipe_from_gemini_data(data, ingredients_text):
+    """Rețeta din JSON-ul întors de `generateContent` (textul primului candidat)."""
+    text = None
+    try:
+        text = data['candidates'][0]['content']['parts'][0]['text']
+    except Exception:
+        text = json.dumps(data)
+    return _parse_generated_text(text or '', ingredients_text)
+
+
+class _StreamedRecipe:
+    """
+    Textul primit până acum din `streamGenerateContent` și rețeta parțială extrasă din el
+    (titlul, fiecare ingredient și fiecare pas complet, în formatele de afișare).
+    """
+
+    def __init__(self):
+        self.parser = IncrementalJSONParser()
+        self.text_parts = []
+        self.title = None
+        self.ingredients = []
+        self.instructions = []
+        # Ultima bucată cu usageMetadata (și finishReason), pentru `_log_usage`
+        self.final_chunk = None
+
+    def feed(self, text, chunk=None):
+        """Adaugă textul unei bucăți; True dacă rețeta parțială s-a schimbat."""
+        if isinstance(chunk, dict) and 'usageMetadata' in chunk:
+            self.final_chunk = chunk
+        if not text:
+            return False
+        self.text_parts.append(text)
+        changed = False
+        for kind, key, value in self.parser.feed(text):
+            if kind == 'field' and key == 'title' and isinstance(value, str):
+                self.title = value.strip() or None
+                changed = True
+            elif kind == 'item' and key == 'ingredients':
+                self.ingredients.extend(ingredients_to_strings([value]))
+                changed = True
+            elif kind == 'item' and key == 'instructions':
+                self.instructions.append(instruction_to_string(value))
+                changed = True
+        return changed
+
+    def partial(self):
+        return {'title': self.title, 'ingredients': list(self.ingredients), 'instructions': list(self.instructions)}
+
+    @property
+    def text(self):
+        return ''.join(self.text_parts)
+
+
+def _attempt_client(attempt, default_client):
+    """(client, model) ai încercării trimise de `gemini_router` sau clientul implicit."""
+    if attempt is None:
+        return default_client, default_client.model
+    return attempt.client, attempt.model
+
+
+def get_gemini_response(ingredients_text, attempt=None):
     """
     Generează rețeta folosind Google Gemini API.
     
-    Trimite un prompt structurat către Gemini pentru a obține JSON cu rețeta completă:
+    Trimite prompt-ul precompilat (`recipe_prompt`, vezi prompts.py) pentru a obține JSON cu rețeta completă:
     - titlu, porții, timpi de preparare și gătit
     - ingrediente (cu cantități și unități)
-    - instrucțiuni detaliate (minim 10 pași, cu timp și temperatură)
+    - instrucțiuni detaliate (minim GEMINI_MIN_STEPS pași, cu timp și temperatură)
     - dificultate (1-5) și recomandare de vin
+
+    `attempt` (model_router.Attempt) alege modelul și clientul când generarea trece prin `gemini_router`.
     
     Returns:
         dict sau None: rețeta parsată, sau None la eroare
@@ -179,107 +427,178 @@ def get_gemini_response(ingredients_text):
     if not GEMINI_API_KEY:
         return None
 
-    prompt = (
-        f"Ești un chef profesionist român. Creează o rețetă completă și realistă folosind DOAR ingredientele principale: {ingredients_text}. "
-        "Poți adăuga în mod implicit doar ingrediente de bază (sare, piper, ulei de măsline, apă) dacă sunt necesare. "
-        "RĂSPUNDE DOAR CU JSON VALID (fără explicații, fără text în afara JSON). Folosește exact această schemă:\n"
-        "{\n"
-        "  \"title\": string,\n"
-        "  \"servings\": integer,\n"
-        "  \"prep_time_minutes\": integer,\n"
-        "  \"cook_time_minutes\": integer,\n"
-        "  \"ingredients\": [ { \"item\": string, \"quantity\": number, \"unit\": string, \"notes\": string } ],\n"
-        "  \"instructions\": [ { \"step\": integer, \"text\": string, \"time_minutes\": integer, \"temperature_c\": integer|null } ],\n"
-        "  \"difficulty\": integer,\n"
-        "  \"wine_pairing\": string\n"
-        "}\n"
-        "Cerințe stricte: \n"
-        "- Minim 10 pași detaliați, fiecare cu durată estimată. \n"
-        "- Fiecare ingredient trebuie să aibă cantitate numerică și unitate (g, ml, lingurițe, linguri, buc). \n"
-        "- Cantitățile să fie realiste. \n"
-        "- Include temperatură (°C) dacă se coace sau se prăjește. \n"
-        "- \"servings\" între 2 și 6. \n"
-        "- \"difficulty\" între 1 și 5. \n"
-        "- Textul în română, clar și natural."
-    )
+    body = recipe_prompt.body(ingredients_text)
+    client, model = _attempt_client(attempt, gemini_client)
+
+    try:
+        logger.info("Gemini call start | model=%s", model)
+        t0 = time.time()
+        data = client.generate_content(body, model=model)
+        logger.info("Gemini response | model=%s elapsed=%.2fs stats=%s", model, time.time() - t0, client.stats())
+        _log_usage(data, 'sync')
+        return _recipe_from_gemini_data(data, ingredients_text)
+    except CircuitOpenError:
+        logger.warning("Gemini call skipped | model=%s circuit breaker open", model)
+        return None
+    except GeminiError as e:
+        logger.warning("Gemini call failed | model=%s status=%s body_preview=%s", model, e.status_code, e.body_preview)
+        return None
+    except Exception as e:
+        logger.exception("Gemini call error: %s", str(e))
+        return None
+
+
+def get_gemini_response_streaming(ingredients_text, on_partial=None, attempt=None):
+    """
+    Ca `get_gemini_response`, dar prin `streamGenerateContent`.
+
+    Pe măsură ce sosesc bucățile, parserul incremental detectează titlul, fiecare
+    ingredient și fiecare pas complet, iar `on_partial(partial)` primește rețeta
+    parțială (aceleași formate de afișare ca rezultatul final). Rezultatul final e
+    `parse_recipe_response` pe textul complet, deci identic cu varianta fără streaming.
+    Dacă stream-ul eșuează înainte de primul conținut, se revine la apelul normal.
+
+    Cu `attempt`, rețeta parțială e trimisă doar dacă routerul o afișează pe a acestei
+    încercări (`progress()`), iar stream-ul se închide când încercarea e anulată.
+    """
+    if not GEMINI_API_KEY:
+        return None
 
-    url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
-    headers = {
-        'Content-Type': 'application/json',
-        'X-goog-api-key': GEMINI_API_KEY
-    }
-    body = {
-        "contents": [
-            {
-                "parts": [
-                    {"text": prompt}
-                ]
-            }
-        ]
-    }
+    body = recipe_prompt.body(ingredients_text)
+    client, model = _attempt_client(attempt, gemini_client)
+    stream = _StreamedRecipe()
 
     try:
-        logger.info("Gemini call start | model=gemini-2.0-flash")
+        logger.info("Gemini stream start | model=%s", model)
         t0 = time.time()
-        response = requests.post(url, headers=headers, json=body, timeout=25)
-        elapsed = time.time() - t0
-        logger.info("Gemini response | status=%s elapsed=%.2fs", response.status_code, elapsed)
-        if response.status_code != 200:
-            logger.warning("Gemini call failed | body_preview=%s", (response.text or '')[:200].replace('\n', ' '))
-            return None
-
-        data = response.json()
-        # Extrage textul răspunsului
-        text = None
+        first_content_at = None
+        chunks = client.stream_generate_content(body, model=model)
         try:
-            text = data['candidates'][0]['content']['parts'][0]['text']
-        except Exception:
-            text = response.text
+            for text, chunk in iter_stream_text(chunks):
+                if attempt is not None and attempt.cancelled.is_set():
+                    logger.info("Gemini stream cancelled | model=%s elapsed=%.2fs", model, time.time() - t0)
+                    return None
+                if stream.feed(text, chunk):
+                    if first_content_at is None:
+                        first_content_at = time.time() - t0
+                        logger.info("Gemini stream first content | model=%s elapsed=%.2fs", model, first_content_at)
+                    if (attempt is None or attempt.progress()) and on_partial:
+                        on_partial(stream.partial())
+        finally:
+            chunks.close()
+        logger.info("Gemini stream done | model=%s elapsed=%.2fs", model, time.time() - t0)
+        _log_usage(stream.final_chunk, 'stream')
+    except CircuitOpenError:
+        logger.warning("Gemini stream skipped | model=%s circuit breaker open", model)
+        return None
+    except GeminiError as e:
+        logger.warning("Gemini stream failed | model=%s status=%s body_preview=%s", model, e.status_code, e.body_preview)
+        if not stream.text_parts:
+            return get_gemini_response(ingredients_text, attempt)
+        return None
+    except Exception as e:
+        logger.exception("Gemini stream error: %s", str(e))
+        return None
 
-        parsed = parse_recipe_response(text or '', ingredients_text)
-        if parsed:
-            logger.info("Gemini parse OK | title='%s'", (parsed.get('title') or '')[:80])
-            return parsed
-        logger.warning("Gemini parse failed")
+    return _parse_generated_text(stream.text, ingredients_text)
+
+
+async def get_gemini_response_async(ingredients_text, attempt=None):
+    """Ca `get_gemini_response`, cu clientul async (modul ASGI, vezi asgi.py)."""
+    if not GEMINI_API_KEY:
+        return None
+
+    body = recipe_prompt.body(ingredients_text)
+    client, model = _attempt_client(attempt, async_gemini_client)
+
+    try:
+        logger.info("Gemini call start | model=%s mode=async", model)
+        t0 = time.time()
+        data = await client.generate_content(body, model=model)
+        logger.info("Gemini response | model=%s elapsed=%.2fs mode=async", model, time.time() - t0)
+        _log_usage(data, 'async')
+        return _recipe_from_gemini_data(data, ingredients_text)
+    except CircuitOpenError:
+        logger.warning("Gemini call skipped | model=%s circuit breaker open", model)
+        return None
+    except GeminiError as e:
+        logger.warning("Gemini call failed | model=%s status=%s body_preview=%s", model, e.status_code, e.body_preview)
         return None
     except Exception as e:
         logger.exception("Gemini call error: %s", str(e))
         return None
 
-def _ingredients_to_strings(ingredients):
+
+async def get_gemini_response_streaming_async(ingredients_text, on_partial=None, attempt=None):
     """
-    Normalizează lista de ingrediente (din obiecte sau șiruri) în șiruri; nu inventează cantități.
-    
-    Converteste ingredientele din format JSON (dict cu item, quantity, unit, notes)
-    în linii text formatate (ex: "• 200 g roșii (coapte)").
-    """
-    normalized = []
-    if isinstance(ingredients, list):
-        for ing in ingredients:
-            if isinstance(ing, dict):
-                item = (ing.get('item') or '').strip()
-                quantity = ing.get('quantity')
-                unit = (ing.get('unit') or '').strip()
-                notes = (ing.get('notes') or '').strip()
-                qty_parts = []
-                if quantity not in (None, ''):
-                    try:
-                        qty_parts.append(str(int(quantity)) if float(quantity) == int(float(quantity)) else str(quantity))
-                    except Exception:
-                        qty_parts.append(str(quantity))
-                if unit:
-                    qty_parts.append(unit)
-                qty_str = ' '.join(qty_parts).strip()
-                line = ('• ' + (f"{qty_str} " if qty_str else '') + item).strip()
-                if notes:
-                    line += f" ({notes})"
-                normalized.append(line)
-            elif isinstance(ing, str):
-                normalized.append(f"• {ing.strip()}")
-    return normalized
+    Ca `get_gemini_response_streaming`, cu clientul async; `on_partial` e o corutină.
+    O încercare pierdută e oprită de router prin anularea task-ului (stream-ul se închide).
+    """
+    if not GEMINI_API_KEY:
+        return None
+
+    body = recipe_prompt.body(ingredients_text)
+    client, model = _attempt_client(attempt, async_gemini_client)
+    stream = _StreamedRecipe()
+
+    try:
+        logger.info("Gemini stream start | model=%s mode=async", model)
+        t0 = time.time()
+        async for chunk in client.stream_generate_content(body, model=model):
+            if stream.feed(chunk_text(chunk), chunk) and (attempt is None or attempt.progress()) and on_partial:
+                await on_partial(stream.partial())
+        logger.info("Gemini stream done | model=%s elapsed=%.2fs mode=async", model, time.time() - t0)
+        _log_usage(stream.final_chunk, 'async_stream')
+    except CircuitOpenError:
+        logger.warning("Gemini stream skipped | model=%s circuit breaker open", model)
+        return None
+    except GeminiError as e:
+        logger.warning("Gemini stream failed | model=%s status=%s body_preview=%s", model, e.status_code, e.body_preview)
+        if not stream.text_parts:
+            return await get_gemini_response_async(ingredients_text, attempt)
+        return None
+    except Exception as e:
+        logger.exception("Gemini stream error: %s", str(e))
+        return None
+
+    return _parse_generated_text(stream.text, ingredients_text)
+
+
+@app.before_request
+def start_request_metrics():
+    """Pornește cronometrul request-ului și contoarele de interogări SQLite ale thread-ului."""
+    g.request_started = time.perf_counter()
+    db.reset_query_stats()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Latența per endpoint, interogările SQLite ale request-ului și antetul `Server-Timing`."""
+    started = g.get('request_started')
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    queries, query_seconds = db.query_stats()
+    endpoint = request.endpoint or 'unmatched'
+    metrics.observe('recipe_http_request_duration_seconds', elapsed, (endpoint, request.method))
+    metrics.inc('recipe_http_requests_total', (endpoint, request.method, response.status_code))
+    if queries:
+        metrics.inc('recipe_db_queries_total', (endpoint,), queries)
+        metrics.inc('recipe_db_query_seconds_total', (endpoint,), query_seconds)
+    response.headers['Server-Timing'] = (
+        f'app;dur={elapsed * 1000:.1f}, db;dur={query_seconds * 1000:.1f};desc="{queries} queries"'
+    )
+    metrics.maybe_flush()
+    return response
+
+
 @app.before_request
 def load_current_user():
     """Atașează utilizatorul autentificat (dacă există) în `g.user` pentru a fi accesibil în request și templates."""
+    if request.endpoint == 'static':
+        # Fișierele statice nu depind de utilizator; fără acces la sesiune nu primesc `Vary: Cookie`
+        g.user = None
+        return
     user_id = session.get('user_id')
     user_email = session.get('user_email')
     g.user = {'id': user_id, 'email': user_email} if user_id and user_email else None
@@ -296,112 +615,293 @@ def login_required(view_func):
     return _wrapped
 
 
-def _get_today_count(user_id):
-    """Returnează numărul de generări făcute azi de utilizator (pentru limitare la 10/zi)."""
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    today = datetime.utcnow().date().isoformat()
-    cursor.execute('SELECT count FROM usage_limits WHERE user_id = ? AND day = ?', (user_id, today))
-    row = cursor.fetchone()
-    conn.close()
-    return (row[0] if row else 0)
-
-
-def _inc_today_count(user_id):
-    """Incrementează contorul de generări pentru ziua curentă, pentru utilizatorul dat."""
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    today = datetime.utcnow().date().isoformat()
-    cursor.execute('SELECT id, count FROM usage_limits WHERE user_id = ? AND day = ?', (user_id, today))
-    row = cursor.fetchone()
-    if row:
-        cursor.execute('UPDATE usage_limits SET count = ? WHERE id = ?', (row[1] + 1, row[0]))
+# Limite zilnice de generări: per utilizator și (opțional) globală, pentru bugetul Gemini
+usage_quota = UsageQuota(
+    DATABASE,
+    user_limit=int(os.getenv('QUOTA_USER_DAILY_LIMIT', '10')),
+    global_limit=int(os.getenv('QUOTA_GLOBAL_DAILY_LIMIT', '0')),
+    cache_ttl=float(os.getenv('QUOTA_CACHE_TTL', '30')),
+)
+
+
+# Parole: metoda werkzeug cu algoritmul și costul per mediu (ex: `scrypt:32768:8:1`, `pbkdf2:sha256:600000`);
+# hash-urile calculate cu altă metodă se recalculează la următorul login reușit
+password_policy = auth.PasswordPolicy(os.getenv('PASSWORD_HASH_METHOD', auth.DEFAULT_HASH_METHOD))
+# Încercări de login per email și per IP într-o fereastră glisantă, refuzate înainte de hash
+login_throttle = auth.LoginThrottle(
+    DATABASE,
+    window=int(os.getenv('LOGIN_THROTTLE_WINDOW', '900')),
+    enabled=os.getenv('LOGIN_THROTTLE_ENABLED', 'true').lower() == 'true',
+)
+LOGIN_MAX_ATTEMPTS_PER_EMAIL = int(os.getenv('LOGIN_MAX_ATTEMPTS_PER_EMAIL', '5'))
+LOGIN_MAX_ATTEMPTS_PER_IP = int(os.getenv('LOGIN_MAX_ATTEMPTS_PER_IP', '100'))
+
+
+def _timed_password_hash(operation, compute, *args):
+    started = time.perf_counter()
+    try:
+        return compute(*args)
+    finally:
+        metrics.observe('recipe_password_hash_seconds', time.perf_counter() - started, (operation,))
+
+
+def _throttled(template, error):
+    """Răspunsul 429 (cu `Retry-After`) pentru o încercare de autentificare refuzată."""
+    metrics.inc('recipe_login_attempts_total', ('throttled',))
+    logger.info("Login throttled | key=%s retry_after=%s", error.key.split(':', 1)[0], error.retry_after)
+    minutes = max(1, round(error.retry_after / 60))
+    flash(f'Prea multe încercări. Încearcă din nou în {minutes} min.', 'error')
+    response = make_response(render_template(template), 429)
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def _quota_exceeded_message(error):
+    """Mesajul afișat utilizatorului când rezervarea de cotă e refuzată."""
+    if error.scope == 'global':
+        return 'Limita zilnică de generări a aplicației a fost atinsă. Revino mâine!'
+    return f'Ai atins limita de {error.limit} rețete pe zi. Revino mâine!'
+
+
+def _is_complete_recipe(recipe_data):
+    """O rețetă e utilizabilă doar dacă are titlu, ingrediente și instrucțiuni."""
+    return bool(recipe_data and recipe_data.get('title') and recipe_data.get('ingredients') and recipe_data.get('instructions'))
+
+
+def _run_generation_job(job_id, ingredients, user_id, reservation):
+    """
+    Rulează în fundal, pe executorul cozii de job-uri.
+
+    Cache -> Gemini (streaming, cu rețeta parțială salvată pe job) -> parsare.
+    Rezervarea de cotă o decontează coada (`_settle_generation_job`), la orice final al job-ului.
+    Erorile pentru utilizator se semnalează cu `GenerationError`.
+    """
+    recipe_data = _generate_recipe_data(job_id, ingredients, reservation)
+    logger.info("Recipe generated successfully | job=%s title='%s'", job_id, (recipe_data.get('title') or '')[:80])
+    return recipe_data
+
+
+def _generate_recipe_data(job_id, ingredients, reservation=None):
+    """
+    Cache -> Gemini -> parsare; aruncă `GenerationError` dacă nu se obține o rețetă completă.
+
+    O rețetă ajunsă în cache după request (alt job cu aceleași ingrediente) nu costă un apel
+    Gemini, deci rezervarea e restituită (confirmarea de la final nu mai schimbă contorul).
+    """
+    recipe_data = generation_cache.get(ingredients)
+    if recipe_data and reservation is not None:
+        usage_quota.refund(reservation)
+    if not recipe_data:
+        if not GEMINI_API_KEY:
+            raise GenerationError('Nu este configurată cheia GEMINI_API_KEY. Adaug-o în .env și reîncearcă.')
+        started = time.perf_counter()
+        if GEMINI_STREAMING:
+            recipe_data = gemini_router.generate(lambda attempt: get_gemini_response_streaming(
+                ingredients, on_partial=lambda partial: generation_jobs.update_partial(job_id, partial), attempt=attempt))
+        else:
+            recipe_data = gemini_router.generate(lambda attempt: get_gemini_response(ingredients, attempt))
+        _check_generated(job_id, recipe_data, started, 'stream' if GEMINI_STREAMING else 'sync')
+        generation_cache.set(ingredients, recipe_data)
+    return recipe_data
+
+
+def _check_generated(job_id, recipe_data, started, mode):
+    """Durata apelului în metrici; `GenerationError` dacă rețeta nu e completă."""
+    outcome = 'ok' if _is_complete_recipe(recipe_data) else 'failed'
+    metrics.observe('recipe_gemini_call_duration_seconds', time.perf_counter() - started, (mode, outcome))
+    if outcome != 'ok':
+        logger.warning("Recipe generation failed | job=%s recipe_data=%s", job_id, bool(recipe_data))
+        raise GenerationError('Nu se poate genera rețeta în acest moment. Te rugăm încearcă din nou.')
+
+
+async def _run_generation_job_async(job_id, ingredients, user_id, reservation):
+    """Ca `_run_generation_job`, ca și corutină (modul ASGI); accesul la SQLite rulează în thread-uri."""
+    recipe_data = await _generate_recipe_data_async(job_id, ingredients, reservation)
+    logger.info("Recipe generated successfully | job=%s title='%s'", job_id, (recipe_data.get('title') or '')[:80])
+    return recipe_data
+
+
+async def _generate_recipe_data_async(job_id, ingredients, reservation=None):
+    """Ca `_generate_recipe_data`, cu clientul Gemini async."""
+    recipe_data = await asyncio.to_thread(generation_cache.get, ingredients)
+    if recipe_data and reservation is not None:
+        await asyncio.to_thread(usage_quota.refund, reservation)
+    if not recipe_data:
+        if not GEMINI_API_KEY:
+            raise GenerationError('Nu este configurată cheia GEMINI_API_KEY. Adaug-o în .env și reîncearcă.')
+        started = time.perf_counter()
+        if GEMINI_STREAMING:
+            recipe_data = await async_gemini_router.generate_async(lambda attempt: get_gemini_response_streaming_async(
+                ingredients, on_partial=lambda partial: asyncio.to_thread(generation_jobs.update_partial, job_id, partial),
+                attempt=attempt))
+        else:
+            recipe_data = await async_gemini_router.generate_async(lambda attempt: get_gemini_response_async(ingredients, attempt))
+        _check_generated(job_id, recipe_data, started, 'async_stream' if GEMINI_STREAMING else 'async')
+        await asyncio.to_thread(generation_cache.set, ingredients, recipe_data)
+    return recipe_data
+
+
+def _settle_generation_job(job, context, succeeded):
+    """
+    Rezervarea de cotă făcută în request se confirmă la succes și se restituie la orice eșec
+    (inclusiv job-urile expirate după `GENERATION_JOB_TIMEOUT`). Pentru un job expirat după
+    repornirea workerului care îl primise, rezervarea se reface din utilizator și ziua creării.
+    """
+    reservation = context.get('reservation') or usage_quota.reservation_for(job['user_id'], job['created_at'])
+    if succeeded:
+        usage_quota.commit(reservation)
     else:
-        cursor.execute('INSERT INTO usage_limits (user_id, day, count) VALUES (?, ?, ?)', (user_id, today, 1))
-    conn.commit()
-    conn.close()
+        usage_quota.refund(reservation)
+
 
+# Coada de generare: limitează apelurile Gemini concurente independent de thread-urile web
+generation_jobs = GenerationJobQueue(
+    DATABASE,
+    _run_generation_job,
+    max_workers=int(os.getenv('GENERATION_MAX_CONCURRENCY', '4')),
+    max_pending=int(os.getenv('GENERATION_MAX_PENDING', '32')),
+    job_timeout=int(os.getenv('GENERATION_JOB_TIMEOUT', '180')),
+    settle=_settle_generation_job,
+)
+# Planuri de mese (`/generate_batch`): executor separat, ca un plan să nu ocupe coada generărilor individuale
+generation_batch_jobs = GenerationJobQueue(
+    DATABASE,
+    _run_generation_job,
+    max_workers=int(os.getenv('GENERATION_BATCH_CONCURRENCY', '7')),
+    max_pending=int(os.getenv('GENERATION_BATCH_MAX_PENDING', '28')),
+    job_timeout=int(os.getenv('GENERATION_JOB_TIMEOUT', '180')),
+    settle=_settle_generation_job,
+)
+GENERATION_BATCH_MAX_ITEMS = int(os.getenv('GENERATION_BATCH_MAX_ITEMS', '7'))
+# Modul ASGI: câte generări rulează simultan ca și corutine (fără thread per apel)
+GENERATION_ASYNC_CONCURRENCY = int(os.getenv('GENERATION_ASYNC_CONCURRENCY', '256'))
+GENERATION_ASYNC_MAX_PENDING = int(os.getenv('GENERATION_ASYNC_MAX_PENDING', '1024'))
+
+
+# Rutare între modele (model_router.py): cu GEMINI_FALLBACK_MODEL și/sau GEMINI_FALLBACK_BASE_URL,
+# o generare care nu a răspuns după p90 al latențelor recente ale modelului principal se trimite
+# și pe ruta de rezervă; câștigă primul răspuns valid, cealaltă încercare e anulată
+GEMINI_FALLBACK_MODEL = os.getenv('GEMINI_FALLBACK_MODEL')
+GEMINI_FALLBACK_BASE_URL = os.getenv('GEMINI_FALLBACK_BASE_URL')
+GEMINI_FALLBACK_API_KEY = os.getenv('GEMINI_FALLBACK_API_KEY') or GEMINI_API_KEY
+GEMINI_ROUTER_OPTIONS = dict(
+    quantile=float(os.getenv('GEMINI_HEDGE_QUANTILE', '0.9')),
+    initial_delay=float(os.getenv('GEMINI_HEDGE_DELAY', '10')),
+    min_delay=float(os.getenv('GEMINI_HEDGE_MIN_DELAY', '0.25')),
+    max_delay=float(os.getenv('GEMINI_HEDGE_MAX_DELAY', '20')),
+    min_samples=int(os.getenv('GEMINI_HEDGE_MIN_SAMPLES', '20')),
+)
+metrics.histogram('recipe_gemini_route_duration_seconds', 'Durata unei încercări pe o rută Gemini (model) după rezultat',
+                  ('route', 'outcome'), buckets=GEMINI_BUCKETS)
+metrics.counter('recipe_gemini_route_attempts_total', 'Încercări pe o rută Gemini după rezultat', ('route', 'outcome'))
+metrics.counter('recipe_gemini_route_wins_total', 'Generări câștigate de o rută Gemini', ('route',))
+metrics.counter('recipe_gemini_hedged_total', 'Generări dublate pe ruta de rezervă', ('reason',))
+metrics.gauge('recipe_gemini_hedge_delay_seconds', 'Întârzierea curentă după care o generare se dublează')
+
+
+def _record_route_result(route, outcome, elapsed):
+    metrics.observe('recipe_gemini_route_duration_seconds', elapsed, (route, outcome))
 
-def parse_recipe_response(response_text, original_ingredients):
+
+def _build_gemini_router(primary_client, client_class, max_workers, **client_options):
     """
-    Parsează STRICT JSON-ul din răspunsul AI.
-    
-    Extrage JSON din răspunsul Gemini (care poate conține markdown ```json```),
-    validează structura și formatează ingredientele/instrucțiunile pentru afișare.
-    
-    Returns:
-        dict sau None: rețeta structurată cu toate câmpurile, sau None la eroare de parsare
+    Routerul peste clientul principal; ruta de rezervă are clientul ei (pool, circuit breaker),
+    ca un model lent sau căzut să nu blocheze celălalt.
     """
-    try:
-        json_text = response_text.strip()
-        if json_text.startswith('```'):
-            json_text = re.sub(r"^```[a-zA-Z]*", "", json_text).strip()
-            if json_text.endswith('```'):
-                json_text = json_text[:-3].strip()
+    primary = model_router.Route('primary', primary_client)
+    fallback = None
+    if GEMINI_FALLBACK_MODEL or GEMINI_FALLBACK_BASE_URL:
+        options = dict(GEMINI_CLIENT_OPTIONS, **client_options)
+        options['model'] = GEMINI_FALLBACK_MODEL or options['model']
+        options['base_url'] = GEMINI_FALLBACK_BASE_URL or options['base_url']
+        fallback = model_router.Route('fallback', client_class(GEMINI_FALLBACK_API_KEY, **options))
+        logger.info("Gemini fallback route | model=%s base_url=%s", options['model'], options['base_url'])
+    return model_router.HedgedRouter(primary, fallback, is_valid=_is_complete_recipe, on_result=_record_route_result,
+                                     max_workers=max_workers, **GEMINI_ROUTER_OPTIONS)
+
+
+# Încercările pe ruta de rezervă rulează pe thread-urile routerului: cel mult două per job
+gemini_router = _build_gemini_router(gemini_client, GeminiClient, 2 * (generation_jobs.max_workers + generation_batch_jobs.max_workers),
+                                     pool_size=int(os.getenv('GEMINI_POOL_SIZE', '8')))
+# Routerul peste clientul async, creat în `enable_async_generation`
+async_gemini_router = None
+startup_phase('generation')
+
+def enable_async_generation(loop):
+    """
+    Modul ASGI (asgi.py): generările rulează ca corutine pe bucla de evenimente `loop`.
 
-        try:
-            data = json.loads(json_text)
-        except Exception:
-            start = json_text.find('{')
-            end = json_text.rfind('}')
-            if start != -1 and end != -1 and end > start:
-                possible_json = json_text[start:end + 1]
-                data = json.loads(possible_json)
-            else:
-                logger.warning("JSON not found in AI response preview=%s", json_text[:200].replace('\n', ' '))
-                return None
-
-        if not isinstance(data, dict):
-            logger.warning("AI response is not a JSON object")
-            return None
-
-        def _fmt_step(step_obj):
-            if isinstance(step_obj, dict):
-                # Nu adăugăm prefix numeric; UI-ul se ocupă de numerotare
-                text = (step_obj.get('text') or '').strip()
-                time_val = step_obj.get('time_minutes')
-                temp_val = step_obj.get('temperature_c')
-                extras = []
-                if isinstance(time_val, (int, float)):
-                    extras.append(f"~{int(time_val) if float(time_val).is_integer() else time_val} min")
-                if isinstance(temp_val, (int, float)):
-                    extras.append(f"{int(temp_val) if float(temp_val).is_integer() else temp_val}°C")
-                suffix = f" ({' | '.join(extras)})" if extras else ''
-                return f"{text}{suffix}".strip()
-            return str(step_obj)
-
-        servings = data.get('servings')
-        prep_time = data.get('prep_time_minutes')
-        cook_time = data.get('cook_time_minutes')
-        try:
-            servings = int(servings) if servings is not None else None
-        except Exception:
-            servings = None
-        try:
-            prep_time = int(prep_time) if prep_time is not None else None
-        except Exception:
-            prep_time = None
-        try:
-            cook_time = int(cook_time) if cook_time is not None else None
-        except Exception:
-            cook_time = None
-
-        parsed = {
-            'title': (data.get('title') or '').strip() or None,
-            'ingredients': _ingredients_to_strings(data.get('ingredients') or []),
-            'instructions': [_fmt_step(step) for step in (data.get('instructions') or [])],
-            'difficulty': int(data.get('difficulty') or 3),
-            'wine_pairing': (data.get('wine_pairing') or '').strip(),
-            'servings': servings,
-            'prep_time_minutes': prep_time,
-            'cook_time_minutes': cook_time,
-            'total_time_minutes': (prep_time or 0) + (cook_time or 0) if (prep_time or cook_time) else None
-        }
-        logger.debug("Parsed recipe keys: %s", list(parsed.keys()))
-        return parsed
-    except Exception:
-        logger.exception("Error while parsing AI response")
-        return None
+    Cozile de job-uri (generări individuale și planuri) devin o singură coadă async, cu
+    clientul Gemini pe httpx; rutele, tabelul `generation_jobs` și paginile rămân aceleași.
+    """
+    global async_gemini_client, async_gemini_router, generation_jobs, generation_batch_jobs
+    async_gemini_client = AsyncGeminiClient(GEMINI_API_KEY, pool_size=GENERATION_ASYNC_CONCURRENCY, **GEMINI_CLIENT_OPTIONS)
+    async_gemini_router = _build_gemini_router(async_gemini_client, AsyncGeminiClient, GENERATION_ASYNC_CONCURRENCY,
+                                               pool_size=GENERATION_ASYNC_CONCURRENCY)
+    generation_jobs = generation_batch_jobs = AsyncGenerationJobQueue(
+        DATABASE,
+        _run_generation_job_async,
+        loop,
+        max_workers=GENERATION_ASYNC_CONCURRENCY,
+        max_pending=GENERATION_ASYNC_MAX_PENDING,
+        job_timeout=int(os.getenv('GENERATION_JOB_TIMEOUT', '180')),
+        settle=_settle_generation_job,
+    )
+    logger.info("Async generation enabled | concurrency=%s max_pending=%s", GENERATION_ASYNC_CONCURRENCY, GENERATION_ASYNC_MAX_PENDING)
+# SSE ține o conexiune (și un thread sync) deschisă; implicit pagina folosește polling
+GENERATION_SSE = os.getenv('GENERATION_SSE', 'false').lower() == 'true'
+# Streaming: titlul, ingredientele și pașii apar în pagina job-ului pe măsură ce sunt generați
+GEMINI_STREAMING = os.getenv('GEMINI_STREAMING', 'true').lower() == 'true'
+# Rețete salvate oferite înaintea unei generări noi (cele care acoperă cel puțin MIN_COVERAGE din ingrediente)
+INGREDIENT_MATCHES_ENABLED = os.getenv('INGREDIENT_MATCHES_ENABLED', 'true').lower() == 'true'
+INGREDIENT_MATCHES_LIMIT = int(os.getenv('INGREDIENT_MATCHES_LIMIT', '5'))
+INGREDIENT_MATCHES_MIN_COVERAGE = float(os.getenv('INGREDIENT_MATCHES_MIN_COVERAGE', '0.6'))
+# Rețete aproape identice (MinHash + LSH, vezi near_duplicates.py): `save_recipe` cere confirmare
+# înainte de a salva un duplicat, iar generarea oferă întâi rețeta salvată cu aceleași ingrediente
+NEAR_DUPLICATES_ENABLED = os.getenv('NEAR_DUPLICATES_ENABLED', 'true').lower() == 'true'
+NEAR_DUPLICATES_THRESHOLD = float(os.getenv('NEAR_DUPLICATES_THRESHOLD', '0.7'))
+
+
+def _collect_component_metrics():
+    """
+    Contoarele ținute de clienții Gemini (însumate pe rute), router, cache-uri și coada de job-uri
+    (citite la flush-ul metricilor).
+    """
+    gemini_routes = async_gemini_router or gemini_router
+    router = gemini_routes.stats()
+    gemini = {}
+    for route in gemini_routes.routes:
+        for key, value in route.client.stats().items():
+            if isinstance(value, (int, float)):
+                gemini[key] = gemini.get(key, 0) + value
+    cache = generation_cache.stats()
+    fragments = fragment_cache.stats()
+    return [
+        ('recipe_gemini_tokens_total', ('prompt',), gemini['prompt_tokens']),
+        ('recipe_gemini_tokens_total', ('output',), gemini['output_tokens']),
+        ('recipe_gemini_tokens_total', ('total',), gemini['total_tokens']),
+        ('recipe_gemini_calls_total', (), gemini['calls']),
+        ('recipe_gemini_call_failures_total', (), gemini['failures']),
+        ('recipe_gemini_calls_rejected_total', (), gemini['rejected']),
+        ('recipe_generation_cache_lookups_total', ('memory_hit',), cache['memory_hits']),
+        ('recipe_generation_cache_lookups_total', ('db_hit',), cache['db_hits']),
+        ('recipe_generation_cache_lookups_total', ('miss',), cache['misses']),
+        # În modul ASGI cele două nume indică aceeași coadă
+        ('recipe_generation_in_flight', (), sum(queue.in_flight for queue in {generation_jobs, generation_batch_jobs})),
+        ('recipe_fragment_cache_lookups_total', ('hit',), fragments['hits']),
+        ('recipe_fragment_cache_lookups_total', ('miss',), fragments['misses']),
+        ('recipe_gemini_hedged_total', ('slow',), router['hedged']),
+        ('recipe_gemini_hedged_total', ('failed',), router['failovers']),
+        ('recipe_gemini_hedge_delay_seconds', (), router['hedge_delay']),
+    ] + [
+        ('recipe_gemini_route_wins_total', (name,), route['wins']) for name, route in router['routes'].items()
+    ] + [
+        ('recipe_gemini_route_attempts_total', (name, outcome), route[outcome])
+        for name, route in router['routes'].items() for outcome in model_router.OUTCOMES
+    ]
+
+
+metrics.add_collector(_collect_component_metrics)
 
 
 @app.route('/')
@@ -409,7 +909,7 @@ def index():
     """Pagina principală"""
     if not g.get('user'):
         return redirect(url_for('login'))
-    remaining = max(0, 10 - _get_today_count(g.user['id']))
+    remaining = usage_quota.remaining(g.user['id'])
     return render_template('index.html', remaining=remaining)
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -420,14 +920,24 @@ def login():
         if not email or not password:
             flash('Email și parolă necesare', 'error')
             return redirect(url_for('login'))
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, password_hash FROM users WHERE email = ?', (email,))
-        row = cursor.fetchone()
-        conn.close()
-        if not row or not check_password_hash(row[1], password):
+        try:
+            login_throttle.hit([(f'email:{email}', LOGIN_MAX_ATTEMPTS_PER_EMAIL),
+                                (f'ip:{request.remote_addr}', LOGIN_MAX_ATTEMPTS_PER_IP)])
+        except auth.LoginThrottled as e:
+            return _throttled('login.html', e)
+        conn = get_db()
+        row = conn.execute('SELECT id, password_hash FROM users WHERE email = ?', (email,)).fetchone()
+        if not row or not _timed_password_hash('verify', password_policy.verify, row[1], password):
+            metrics.inc('recipe_login_attempts_total', ('invalid',))
             flash('Credențiale invalide', 'error')
             return redirect(url_for('login'))
+        metrics.inc('recipe_login_attempts_total', ('ok',))
+        login_throttle.reset(f'email:{email}')
+        if password_policy.needs_rehash(row[1]):
+            new_hash = _timed_password_hash('hash', password_policy.hash, password)
+            with conn:
+                conn.execute('UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?', (new_hash, row[0], row[1]))
+            logger.info("Password rehashed | user_id=%s method=%s", row[0], password_policy.prefix)
         session['user_id'] = row[0]
         session['user_email'] = email
         flash('Bun venit!', 'success')
@@ -445,19 +955,20 @@ def register():
         if not email or not password:
             flash('Email și parolă necesare', 'error')
             return redirect(url_for('register'))
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
         try:
-            cursor.execute('INSERT INTO users (email, password_hash) VALUES (?, ?)', (email, generate_password_hash(password)))
-            conn.commit()
+            # Și înregistrarea calculează un hash: aceeași limită per IP ca login-ul
+            login_throttle.hit([(f'ip:{request.remote_addr}', LOGIN_MAX_ATTEMPTS_PER_IP)])
+        except auth.LoginThrottled as e:
+            return _throttled('register.html', e)
+        password_hash = _timed_password_hash('hash', password_policy.hash, password)
+        conn = get_db()
+        try:
+            with conn:
+                cursor = conn.execute('INSERT INTO users (email, password_hash) VALUES (?, ?)', (email, password_hash))
         except Exception:
-            conn.close()
             flash('Email deja folosit', 'error')
             return redirect(url_for('register'))
-        cursor.execute('SELECT id FROM users WHERE email = ?', (email,))
-        row = cursor.fetchone()
-        conn.close()
-        session['user_id'] = row[0]
+        session['user_id'] = cursor.lastrowid
         session['user_email'] = email
         flash('Cont creat!', 'success')
         return redirect(url_for('index'))
@@ -477,9 +988,12 @@ def generate_recipe():
     """
     Generează rețeta bazată pe ingrediente introduse de utilizator.
     
-    - Verifică limita de 10 generări/zi per utilizator
-    - Apelează Gemini pentru generarea rețetei
-    - Incrementează contorul zilnic și afișează rezultatul
+    - Dacă în galerie există rețete care se pot găti cu ingredientele date, le oferă
+      întâi (fără apel Gemini și fără a consuma din limită); `generate_anyway=1` sare peste
+    - Dacă rețeta e în cache (ingrediente normalizate) o afișează imediat, fără apel Gemini
+      și fără a consuma din limită
+    - Altfel rezervă o generare din limita zilnică (atomic; restituită dacă generarea eșuează),
+      creează un job de generare și redirecționează la pagina job-ului
     """
     ingredients = request.form.get('ingredients', '').strip()
 
@@ -487,31 +1001,251 @@ def generate_recipe():
         flash('Te rog să introduci cel puțin un ingredient!', 'error')
         return redirect(url_for('index'))
 
-    # Limita: 10 generări/zi per utilizator
-    user = g.get('user')
-    if _get_today_count(user['id']) >= 10:
-        flash('Ai atins limita de 10 rețete pe zi. Revino mâine!', 'error')
-        return redirect(url_for('index'))
-
-    # Generează rețeta folosind Gemini
     logger.info("Generate recipe requested | ingredients='%s'", ingredients)
+    user = g.get('user')
+    if request.form.get('generate_anyway') != '1':
+        matches = _near_duplicate_matches(ingredients)
+        if INGREDIENT_MATCHES_ENABLED:
+            offered = {match['id'] for match in matches}
+            matches += [match for match in _ingredient_matches(ingredients) if match['id'] not in offered]
+        if matches:
+            logger.info("Saved recipe matches offered | count=%s near_duplicates=%s",
+                        len(matches), sum(1 for match in matches if match.get('near_duplicate')))
+            return render_template('recipe_matches.html', matches=matches, original_ingredients=ingredients)
+    recipe_data = generation_cache.get(ingredients)
+    if recipe_data:
+        logger.info("Generation cache hit | stats=%s", generation_cache.stats())
+        return render_template('recipe_result.html',
+                               recipe=recipe_data,
+                               original_ingredients=ingredients)
     if not GEMINI_API_KEY:
         logger.warning("GEMINI_API_KEY lipsește")
         flash('Nu este configurată cheia GEMINI_API_KEY. Adaug-o în .env și reîncearcă.', 'error')
         return redirect(url_for('index'))
 
-    recipe_data = get_gemini_response(ingredients)
+    # Limita zilnică: rezervarea se face înaintea apelului Gemini
+    try:
+        reservation = usage_quota.reserve(user['id'])
+    except QuotaExceeded as e:
+        flash(_quota_exceeded_message(e), 'error')
+        return redirect(url_for('index'))
+
+    # Apelul Gemini rulează în fundal; thread-ul web se eliberează imediat
+    try:
+        job_id = generation_jobs.submit(user['id'], ingredients, reservation=reservation)
+    except QueueFullError:
+        usage_quota.refund(reservation)
+        logger.warning("Generation queue full | in_flight=%s", generation_jobs.in_flight)
+        flash('Sunt prea multe rețete în lucru acum. Te rugăm încearcă din nou în câteva secunde.', 'error')
+        return redirect(url_for('index'))
+    logger.info("Generation job queued | job=%s", job_id)
+    return redirect(url_for('generation_job', job_id=job_id))
+
+
+@app.route('/generate_batch', methods=['POST'])
+@login_required
+def generate_batch():
+    """
+    Generează mai multe rețete deodată (ex: planul de mese pe o săptămână), în JSON.
+
+    Corp: `{"ingredients": ["pui, cartofi", "linte, morcovi", ...], "stream": true}`.
+    - Seturile identice după normalizare se generează o singură dată (`index` = pozițiile din cerere)
+    - Cele din cache-ul de generări se întorc imediat, fără apel Gemini și fără cotă
+    - Cota zilnică se rezervă pentru restul planului într-o singură tranzacție (tot sau nimic);
+      generările eșuate se restituie individual
+    - Restul rulează concurent pe `generation_batch_jobs` (GENERATION_BATCH_CONCURRENCY)
+
+    Cu `stream` (implicit) răspunsul e NDJSON: o linie `batch`, apoi câte o linie `item`
+    pe măsură ce rețetele sunt gata și o linie `end`. Fără `stream` răspunsul vine imediat,
+    cu job-urile de urmărit prin `/jobs/<id>/status`.
+    """
+    data = request.get_json(silent=True) or {}
+    ingredient_sets = data.get('ingredients')
+    if not isinstance(ingredient_sets, list) or not ingredient_sets \
+            or not all(isinstance(item, str) and item.strip() for item in ingredient_sets):
+        return jsonify({'error': 'Trimite `ingredients`: o listă de seturi de ingrediente (text).'}), 400
+    if len(ingredient_sets) > GENERATION_BATCH_MAX_ITEMS:
+        return jsonify({'error': f'Cel mult {GENERATION_BATCH_MAX_ITEMS} rețete într-un plan.'}), 400
+
+    # Deduplicare după forma canonică (aceeași cheie ca în cache-ul de generări)
+    items = {}
+    for index, ingredients in enumerate(ingredient_sets):
+        key = cache_key(ingredients)
+        if key in items:
+            items[key]['index'].append(index)
+        else:
+            items[key] = {'index': [index], 'ingredients': ingredients.strip()}
+    items = list(items.values())
+
+    cached = [generation_cache.get(item['ingredients']) for item in items]
+    if not GEMINI_API_KEY and not all(cached):
+        return jsonify({'error': 'Nu este configurată cheia GEMINI_API_KEY. Adaug-o în .env și reîncearcă.'}), 503
+
+    user_id = g.user['id']
+    misses = [item for item, recipe_data in zip(items, cached) if not recipe_data]
+    try:
+        reservations = usage_quota.reserve_many(user_id, len(misses)) if misses else []
+    except QuotaExceeded as e:
+        remaining = usage_quota.remaining(user_id)
+        message = _quota_exceeded_message(e)
+        if e.scope == 'user' and remaining:
+            message = f'Planul are {len(misses)} rețete de generat, dar mai poți genera doar {remaining} azi.'
+        return jsonify({'error': message, 'remaining': remaining}), 429
+
+    for item, recipe_data in zip(items, cached):
+        if recipe_data:
+            item.update(status='done', source='cache', recipe=recipe_data)
+    job_ids = {}
+    for item, reservation in zip(misses, reservations):
+        try:
+            job_id = generation_batch_jobs.submit(user_id, item['ingredients'], reservation=reservation)
+        except QueueFullError:
+            usage_quota.refund(reservation)
+            item.update(status='failed', error='Sunt prea multe rețete în lucru acum. Te rugăm încearcă din nou în câteva secunde.')
+            continue
+        item.update(status='queued', job_id=job_id, status_url=url_for('generation_job_status', job_id=job_id))
+        job_ids[job_id] = item
+    logger.info("Generation batch accepted | requested=%s unique=%s cached=%s queued=%s",
+                len(ingredient_sets), len(items), sum(1 for recipe in cached if recipe), len(job_ids))
+
+    if not data.get('stream', True):
+        return jsonify({'items': items, 'remaining': usage_quota.remaining(user_id)}), 202 if job_ids else 200
+
+    def _stream():
+        started = time.perf_counter()
+        yield json.dumps({'type': 'batch', 'requested': len(ingredient_sets), 'unique': len(items)}, ensure_ascii=False) + '\n'
+        for item in items:
+            if item['status'] != 'queued':
+                yield json.dumps(dict(item, type='item'), ensure_ascii=False) + '\n'
+        for job_id in generation_batch_jobs.as_completed(list(job_ids), timeout=generation_batch_jobs.job_timeout):
+            job = generation_batch_jobs.get(job_id)
+            item = job_ids.pop(job_id)
+            if job['status'] == 'done':
+                item.update(status='done', source='gemini', recipe=job['result'])
+            else:
+                item.update(status='failed', error=job['error'] or 'Nu se poate genera rețeta în acest moment. Te rugăm încearcă din nou.')
+            yield json.dumps(dict(item, type='item'), ensure_ascii=False) + '\n'
+        # Job-urile rămase după timeout se pot urmări în continuare prin `status_url`
+        for item in job_ids.values():
+            yield json.dumps(dict(item, type='item'), ensure_ascii=False) + '\n'
+        yield json.dumps({'type': 'end', 'elapsed_ms': round((time.perf_counter() - started) * 1000)}) + '\n'
+
+    response = Response(stream_with_context(_stream()), mimetype='application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _ingredient_matches(ingredients_text, limit=None):
+    """Rețetele salvate potrivite pentru ingredientele date (vezi ingredient_index.find_matches)."""
+    started = time.perf_counter()
+    matches = ingredient_index.find_matches(
+        get_db(), ingredients_text,
+        limit=limit or INGREDIENT_MATCHES_LIMIT,
+        min_coverage=INGREDIENT_MATCHES_MIN_COVERAGE,
+    )
+    for match in matches:
+        match['url'] = url_for('view_recipe', recipe_id=match['id'])
+    logger.debug("Ingredient matches | count=%s ms=%.2f", len(matches), (time.perf_counter() - started) * 1000)
+    return matches
+
+
+def _near_duplicate_matches(ingredients_text):
+    """Rețetele salvate cu aproape aceleași ingrediente ca lista dată (oferite înaintea generării)."""
+    if not NEAR_DUPLICATES_ENABLED:
+        return []
+    matches = near_duplicates.find_by_ingredients(
+        get_db(), ingredients_text, threshold=NEAR_DUPLICATES_THRESHOLD, limit=INGREDIENT_MATCHES_LIMIT,
+    )
+    for match in matches:
+        match['near_duplicate'] = True
+        match['url'] = url_for('view_recipe', recipe_id=match['id'])
+    if matches:
+        metrics.inc('recipe_near_duplicates_total', ('generate',))
+    return matches
+
+
+@app.route('/api/matches')
+@login_required
+def ingredient_matches_api():
+    """
+    Rețetele din galerie care se pot găti cu ingredientele din `ingredients`, în JSON.
+
+    Ordonate după coverage (cât din rețetă acoperă ingredientele date), apoi Jaccard.
+    """
+    ingredients = (request.args.get('ingredients') or '').strip()
+    limit = min(max(1, request.args.get('limit', INGREDIENT_MATCHES_LIMIT, type=int)), ingredient_index.MAX_MATCHES)
+    return jsonify({'matches': _ingredient_matches(ingredients, limit) if ingredients else []})
+
+
+def _get_own_job(job_id):
+    """Încarcă job-ul și verifică că aparține utilizatorului curent (altfel 404)."""
+    job = generation_jobs.get(job_id)
+    if not job or job['user_id'] != g.user['id']:
+        abort(404)
+    return job
 
-    if not recipe_data or not recipe_data.get('title') or not recipe_data.get('ingredients') or not recipe_data.get('instructions'):
-        logger.warning("Recipe generation failed | recipe_data=%s", bool(recipe_data))
-        flash('Nu se poate genera rețeta în acest moment. Te rugăm încearcă din nou.', 'error')
+
+@app.route('/jobs/<job_id>')
+@login_required
+def generation_job(job_id):
+    """
+    Pagina unui job de generare.
+
+    În lucru -> pagină de așteptare (polling/SSE); gata -> rețeta randată cu
+    `recipe_result.html`; eșuat -> mesaj de eroare și întoarcere la generator.
+    """
+    job = _get_own_job(job_id)
+    if job['status'] == 'done':
+        return render_template('recipe_result.html',
+                               recipe=job['result'],
+                               original_ingredients=job['ingredients'])
+    if job['status'] == 'failed':
+        flash(job['error'] or 'Nu se poate genera rețeta în acest moment. Te rugăm încearcă din nou.', 'error')
         return redirect(url_for('index'))
+    return render_template('generation_pending.html', job=job, use_sse=GENERATION_SSE)
+
+
+@app.route('/jobs/<job_id>/status')
+@login_required
+def generation_job_status(job_id):
+    """Statusul job-ului în JSON (pentru polling din pagina de așteptare), cu rețeta parțială."""
+    job = _get_own_job(job_id)
+    return jsonify({'id': job['id'], 'status': job['status'], 'error': job['error'], 'partial': job['partial']})
+
 
-    _inc_today_count(user['id'])
-    logger.info("Recipe generated successfully | title='%s'", (recipe_data.get('title') or '')[:80])
-    return render_template('recipe_result.html',
-                           recipe=recipe_data,
-                           original_ingredients=ingredients)
+@app.route('/jobs/<job_id>/events')
+@login_required
+def generation_job_events(job_id):
+    """
+    Server-Sent Events: trimite `status` la fiecare schimbare, `partial` când rețeta
+    parțială (streaming) avansează și `done` la final.
+
+    Statusul se citește din SQLite, deci funcționează indiferent de workerul care rulează job-ul.
+    """
+    job = _get_own_job(job_id)
+
+    def _stream(job):
+        last_status = None
+        last_partial = None
+        deadline = time.time() + generation_jobs.job_timeout
+        while True:
+            if job['status'] != last_status:
+                last_status = job['status']
+                yield f"event: status\ndata: {json.dumps({'status': last_status})}\n\n"
+            if job['partial'] and job['partial'] != last_partial:
+                last_partial = job['partial']
+                yield f"event: partial\ndata: {json.dumps(last_partial, ensure_ascii=False)}\n\n"
+            if job['status'] in FINISHED_STATUSES or time.time() > deadline:
+                yield f"event: done\ndata: {json.dumps({'status': job['status']})}\n\n"
+                return
+            time.sleep(0.25)
+            job = generation_jobs.get(job_id) or job
+
+    response = Response(stream_with_context(_stream(job)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @app.route('/save_recipe', methods=['POST'])
@@ -520,27 +1254,36 @@ def save_recipe():
     """
     Salvează rețeta în baza de date (apelat din JS cu fetch).
     
-    Primește JSON cu datele rețetei și le stochează în tabelul `recipes`.
+    Primește JSON cu datele rețetei (liniile afișate plus, dacă există, ingredientele și
+    pașii structurați) și le stochează în `recipes`, `recipe_ingredients`, `recipe_steps`
+    și indexul de ingrediente, într-o singură tranzacție (vezi recipe_store.py).
+
+    Dacă în galerie există deja o rețetă aproape identică răspunde cu 409 și rețeta
+    găsită (`duplicate`); `save_anyway: true` salvează oricum.
     """
     try:
         data = request.get_json()
 
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            INSERT INTO recipes (title, ingredients, instructions, difficulty_rating, wine_pairing)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (
-            data['title'],
-            '\n'.join(data['ingredients']),
-            '\n'.join(data['instructions']),
-            data['difficulty'],
-            data['wine_pairing']
-        ))
-
-        conn.commit()
-        conn.close()
+        conn = get_db()
+        if NEAR_DUPLICATES_ENABLED and not data.get('save_anyway'):
+            duplicates = near_duplicates.find_duplicates(
+                conn, data['title'], recipe_store.ingredient_items(data), threshold=NEAR_DUPLICATES_THRESHOLD, limit=1,
+            )
+            if duplicates:
+                duplicate = duplicates[0]
+                duplicate['url'] = url_for('view_recipe', recipe_id=duplicate['id'])
+                metrics.inc('recipe_near_duplicates_total', ('save',))
+                logger.info("Near-duplicate recipe on save | existing=%s similarity=%.2f", duplicate['id'], duplicate['similarity'])
+                return jsonify({
+                    'success': False,
+                    'duplicate': duplicate,
+                    'message': f'Există deja în galerie o rețetă aproape identică: „{duplicate["title"]}".',
+                }), 409
+
+        with conn:
+            recipe_store.insert_recipe(conn.cursor(), data, user_id=g.user['id'])
+        # Versiunea galeriei a crescut (trigger); fragmentele vechi ale galeriei nu mai sunt folosite
+        fragment_cache.invalidate(page_cache.GALLERY)
 
         return jsonify({'success': True, 'message': 'Rețeta a fost salvată cu succes!'})
 
@@ -548,36 +1291,216 @@ def save_recipe():
         return jsonify({'success': False, 'message': f'Eroare la salvare: {str(e)}'})
 
 
+def _csrf_window():
+    """
+    Ce determină tokenul CSRF din pagină: secretul din sesiune și fereastra de timp a semnăturii.
+
+    Fereastra e jumătate din WTF_CSRF_TIME_LIMIT: o pagină revalidată cu 304 are un token
+    căruia îi rămâne cel puțin jumătate din durata de viață.
+    """
+    limit = app.config.get('WTF_CSRF_TIME_LIMIT')
+    return session.get(CSRF_FIELD_NAME), int(time.time() // max(1, limit // 2)) if limit else 0
+
+
+def _page_etag(*parts):
+    """ETag-ul unei pagini HTML: conținutul (`parts`), utilizatorul din antet, tokenul CSRF și deploy-ul."""
+    return page_cache.make_etag(RENDER_VERSION, g.user['id'], *_csrf_window(), *parts)
+
+
+def _cacheable(response, etag):
+    """Răspuns privat, revalidat la fiecare vizită (`no-cache`) cu ETag-ul dat."""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _not_modified(etag):
+    """Răspunsul 304 dacă browserul are deja versiunea `etag`, altfel None."""
+    # Mesajele flash în așteptare trebuie afișate, deci pagina se randează
+    if not PAGE_CACHE_ENABLED or '_flashes' in session or not request.if_none_match.contains(etag):
+        return None
+    return _cacheable(Response(status=304), etag)
+
+
+@app.template_global()
+def recipe_card(recipe):
+    """Cardul unei rețete din galerie, randat o dată per (id, updated_at)."""
+    return fragment_cache.get_or_render(
+        ('card', recipe['id'], recipe['updated_at']),
+        lambda: Markup(render_template('recipe_card.html', recipe=recipe))
+    )
+
+
+GALLERY_PAGE_SIZE = int(os.getenv('GALLERY_PAGE_SIZE', '24'))
+
+
+def _encode_gallery_cursor(created_at, recipe_id):
+    """Cursor opac pentru paginarea keyset: poziția ultimei rețete afișate."""
+    return base64.urlsafe_b64encode(f"{created_at}|{recipe_id}".encode('utf-8')).decode('ascii')
+
+
+def _decode_gallery_cursor(cursor):
+    """Returnează (created_at, id) sau None pentru un cursor lipsă/invalid."""
+    if not cursor:
+        return None
+    try:
+        created_at, recipe_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').rsplit('|', 1)
+        return created_at, int(recipe_id)
+    except Exception:
+        return None
+
+
+def _gallery_filters():
+    """Filtrele din query string: (text căutat, dificultate 1-5 sau None)."""
+    search = (request.args.get('q') or '').strip()
+    difficulty = request.args.get('difficulty', type=int)
+    if difficulty not in (1, 2, 3, 4, 5):
+        difficulty = None
+    return search, difficulty
+
+
+def _gallery_page(search='', difficulty=None, cursor=None, limit=GALLERY_PAGE_SIZE):
+    """
+    O pagină din galerie, ordonată după (created_at, id) descrescător.
+
+    Paginare keyset: pagina următoare începe strict după ultima rețetă din pagina
+    curentă, deci costul nu crește cu numărul paginii (spre deosebire de OFFSET).
+    Citește doar coloanele necesare cardurilor (preview, nu textul complet).
+
+    Returns:
+        (listă de rețete, cursor pentru pagina următoare sau None)
+    """
+    where = []
+    params = []
+    if difficulty:
+        where.append('difficulty_rating = ?')
+        params.append(difficulty)
+    match = search_module.build_match_query(search) if FTS_ENABLED else ''
+    if match:
+        # Full-text (titlu, ingrediente, instrucțiuni), păstrând ordinea cronologică a galeriei
+        where.append('id IN (SELECT rowid FROM recipes_fts WHERE recipes_fts MATCH ?)')
+        params.append(match)
+    elif search:
+        where.append("title_norm LIKE ? ESCAPE '\\'")
+        escaped = recipe_store.normalize_title(search).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        params.append(f"%{escaped}%")
+    position = _decode_gallery_cursor(cursor)
+    if position:
+        where.append('(created_at, id) < (?, ?)')
+        params.extend(position)
+
+    sql = 'SELECT id, title, ingredients_preview, difficulty_rating, created_at, updated_at FROM recipes'
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY created_at DESC, id DESC LIMIT ?'
+    params.append(limit + 1)
+
+    rows = get_db().execute(sql, params).fetchall()
+    recipes = [{
+        'id': row[0],
+        'title': row[1],
+        'ingredients': (row[2] or '').split('\n') if row[2] else [],
+        'difficulty': row[3],
+        'created_at': row[4],
+        'updated_at': row[5] or row[4]
+    } for row in rows[:limit]]
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = recipes[-1]
+        next_cursor = _encode_gallery_cursor(last['created_at'], last['id'])
+    return recipes, next_cursor
+
+
+def _gallery_stats(version):
+    """Statisticile din antetul galeriei (număr, dificultate medie, ultima rețetă), calculate o dată per versiune."""
+    def compute():
+        row = get_db().execute('SELECT COUNT(*), AVG(difficulty_rating), MAX(created_at) FROM recipes').fetchone()
+        return {'count': row[0], 'avg_difficulty': row[1] or 0, 'last_created_at': row[2]}
+    return fragment_cache.get_or_render((page_cache.GALLERY, version, 'stats'), compute)
+
+
 @app.route('/gallery')
 @login_required
 def gallery():
     """
     Afișează galeria de rețete salvate.
     
-    Listează toate rețetele din baza de date, cu preview de ingrediente și date de creare.
+    Randează prima pagină (filtrată pe server după titlu / dificultate);
+    paginile următoare vin din `/api/gallery` (infinite scroll în gallery.js).
+    Cât timp versiunea galeriei nu se schimbă, revizitele primesc 304.
     """
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
+    search, difficulty = _gallery_filters()
+    version = page_cache.gallery_version(get_db())
+    not_modified = _not_modified(_page_etag(page_cache.GALLERY, version, search, difficulty))
+    if not_modified is not None:
+        return not_modified
+
+    recipes, next_cursor = _gallery_page(search, difficulty)
+    response = make_response(render_template('gallery.html',
+                                             recipes=recipes,
+                                             next_cursor=next_cursor,
+                                             stats=_gallery_stats(version),
+                                             search=search,
+                                             difficulty=difficulty))
+    # Recalculat după randare: o sesiune nouă primește abia acum secretul CSRF
+    return _cacheable(response, _page_etag(page_cache.GALLERY, version, search, difficulty))
+
+
+@app.route('/api/gallery')
+@login_required
+def gallery_api():
+    """
+    O pagină din galerie în JSON: datele rețetelor, cardurile randate (HTML) și cursorul următor.
+
+    Parametri: `cursor` (din răspunsul anterior), `q` (titlu), `difficulty` (1-5).
+    """
+    search, difficulty = _gallery_filters()
+    cursor = request.args.get('cursor')
+    version = page_cache.gallery_version(get_db())
+    etag = page_cache.make_etag(RENDER_VERSION, 'api', version, search, difficulty, cursor)
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    recipes, next_cursor = _gallery_page(search, difficulty, cursor)
+    return _cacheable(jsonify({
+        'recipes': recipes,
+        'html': render_template('gallery_cards.html', recipes=recipes),
+        'next_cursor': next_cursor,
+    }), etag)
+
+
+SEARCH_PAGE_SIZE = 20
 
-    cursor.execute('''
-        SELECT id, title, ingredients, difficulty_rating, created_at 
-        FROM recipes 
-        ORDER BY created_at DESC
-    ''')
 
-    recipes = []
-    for row in cursor.fetchall():
-        recipes.append({
-            'id': row[0],
-            'title': row[1],
-            'ingredients': row[2].split('\n')[:3],  # Primele 3 ingrediente
-            'difficulty': row[3],
-            'created_at': row[4]
-        })
+@app.route('/metrics')
+def metrics_endpoint():
+    """Metricile tuturor workerilor în format text Prometheus (vezi metrics.py)."""
+    if not METRICS_ENABLED:
+        abort(404)
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        abort(401)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
-    conn.close()
 
-    return render_template('gallery.html', recipes=recipes)
+@app.route('/search')
+@login_required
+def search_recipes():
+    """
+    Căutare full-text (FTS5, BM25) în titlu, ingrediente, instrucțiuni și băutură.
+
+    Parametri: `q` (fără diacritice funcționează: "ciorba" găsește "ciorbă"), `page` (de la 1).
+    Răspuns JSON cu rezultatele paginii (snippet HTML cu termenii marcați) și `has_more`.
+    """
+    query = (request.args.get('q') or '').strip()
+    page = max(1, request.args.get('page', 1, type=int))
+    if not FTS_ENABLED:
+        return jsonify({'results': [], 'page': page, 'has_more': False, 'error': 'Căutarea full-text nu este disponibilă.'}), 503
+    results, has_more = search_module.search_recipes(get_db(), query, page, SEARCH_PAGE_SIZE)
+    for result in results:
+        result['url'] = url_for('view_recipe', recipe_id=result['id'])
+    return jsonify({'results': results, 'page': page, 'has_more': has_more})
 
 
 @app.route('/recipe/<int:recipe_id>')
@@ -586,31 +1509,35 @@ def view_recipe(recipe_id):
     """
     Afișează o rețetă completă din galerie.
     
-    Citește din baza de date toate detaliile rețetei (ingrediente, instrucțiuni, vin)
-    și le pasează către template pentru vizualizare cu funcții interactive (timer, mod gătit, etc.).
+    Citește detaliile rețetei (ingrediente și pași din tabelele structurate, cu duratele
+    pașilor ca numere pentru timere) și le pasează către template. Corpul paginii se
+    randează o dată per (id, updated_at); revizitele cu `If-None-Match` primesc 304
+    după o singură interogare.
     """
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-
-    cursor.execute('SELECT * FROM recipes WHERE id = ?', (recipe_id,))
-    row = cursor.fetchone()
-    conn.close()
-
-    if not row:
+    updated_at = page_cache.recipe_version(get_db(), recipe_id)
+    fragment = None
+    if updated_at is not None:
+        etag = _page_etag('recipe', recipe_id, updated_at)
+        not_modified = _not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+        fragment = fragment_cache.get_or_render(('detail', recipe_id, updated_at), lambda: _render_recipe_body(recipe_id))
+
+    if not fragment:
         flash('Rețeta nu a fost găsită!', 'error')
         return redirect(url_for('gallery'))
 
-    recipe = {
-        'id': row[0],
-        'title': row[1],
-        'ingredients': row[2].split('\n'),
-        'instructions': row[3].split('\n'),
-        'difficulty': row[4],
-        'wine_pairing': row[5],
-        'created_at': row[6]
-    }
+    title, body = fragment
+    response = make_response(render_template('recipe_detail.html', recipe={'id': recipe_id, 'title': title}, body=body))
+    return _cacheable(response, _page_etag('recipe', recipe_id, updated_at))
+
 
-    return render_template('recipe_detail.html', recipe=recipe)
+def _render_recipe_body(recipe_id):
+    """(titlu, corpul HTML al paginii de detalii) sau None dacă rețeta nu există."""
+    recipe = recipe_store.load_recipe(get_db(), recipe_id)
+    if not recipe:
+        return None
+    return recipe['title'], Markup(render_template('recipe_detail_body.html', recipe=recipe))
 
 
 @app.route('/delete_recipe/<int:recipe_id>', methods=['POST'])
@@ -621,17 +1548,120 @@ def delete_recipe(recipe_id):
     
     Elimină rețeta din baza de date și redirecționează la galerie.
     """
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-
-    cursor.execute('DELETE FROM recipes WHERE id = ?', (recipe_id,))
-    conn.commit()
-    conn.close()
+    conn = get_db()
+    with conn:
+        conn.execute('DELETE FROM recipes WHERE id = ?', (recipe_id,))
+    fragment_cache.invalidate_recipe(recipe_id)
 
     flash('Rețeta a fost ștearsă cu succes!', 'success')
     return redirect(url_for('gallery'))
 
 
+# Export / import al bibliotecii (library.py): `flask --app app export-recipes backup.ndjson.gz`,
+# `flask --app app import-recipes backup.ndjson.gz`, sau prin HTTP cu `Authorization: Bearer <LIBRARY_TOKEN>`
+# (fără LIBRARY_TOKEN endpoint-urile nu există)
+LIBRARY_TOKEN = os.getenv('LIBRARY_TOKEN')
+
+
+def _require_library_token():
+    if not LIBRARY_TOKEN:
+        abort(404)
+    if request.headers.get('Authorization') != f'Bearer {LIBRARY_TOKEN}':
+        abort(401)
+
+
+@app.route('/library/export')
+def export_library():
+    """
+    Toată biblioteca în streaming (memorie constantă): `layout=ndjson|columnar`, `gzip=1|0` (implicit 1).
+    """
+    _require_library_token()
+    layout = request.args.get('layout', 'ndjson')
+    if layout not in library.LAYOUTS:
+        abort(400)
+    compress = request.args.get('gzip', '1') != '0'
+    filename = f"recipes-{datetime.utcnow():%Y%m%d-%H%M%S}.{layout}{'.gz' if compress else ''}"
+
+    def generate():
+        # Conexiune proprie: tranzacția de citire ține cât durează descărcarea
+        conn = db.connect(DATABASE)
+        try:
+            yield from library.export_chunks(conn, layout, compress=compress)
+        finally:
+            conn.close()
+
+    return Response(generate(), mimetype='application/gzip' if compress else 'application/x-ndjson', headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-store',
+    })
+
+
+@app.route('/library/import', methods=['POST'])
+@csrf.exempt
+def import_library():
+    """Adaugă rețetele dintr-un export (corpul request-ului, gzip sau nu); răspuns JSON cu numărul lor."""
+    _require_library_token()
+    conn = db.connect(DATABASE)
+    try:
+        header, records = library.read_export(library.open_text(request.stream))
+        result = library.import_recipes(conn, header, records)
+    except library.LibraryFormatError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    finally:
+        conn.close()
+    fragment_cache.invalidate(page_cache.GALLERY)
+    return jsonify({'success': True, **result})
+
+
+@app.cli.command('export-recipes')
+@click.argument('path')
+@click.option('--layout', type=click.Choice(library.LAYOUTS), default='ndjson', show_default=True)
+@click.option('--gzip/--no-gzip', 'compress', default=None, help='Implicit: după extensia .gz a fișierului.')
+def export_recipes_command(path, layout, compress):
+    """Exportă toate rețetele în PATH ('-' pentru stdout)."""
+    if compress is None:
+        compress = path.endswith('.gz')
+    conn = db.connect(DATABASE)
+    output = click.get_binary_stream('stdout') if path == '-' else open(path, 'wb')
+    try:
+        for chunk in library.export_chunks(conn, layout, compress=compress):
+            output.write(chunk)
+    finally:
+        conn.close()
+        if path != '-':
+            output.close()
+
+
+@app.cli.command('import-recipes')
+@click.argument('path')
+@click.option('--batch-size', type=int, default=library.IMPORT_BATCH, show_default=True)
+def import_recipes_command(path, batch_size):
+    """Importă rețetele dintr-un export (PATH sau '-' pentru stdin; gzip detectat automat)."""
+    conn = db.connect(DATABASE)
+    source = click.get_binary_stream('stdin') if path == '-' else open(path, 'rb')
+    try:
+        header, records = library.read_export(library.open_text(source))
+        result = library.import_recipes(conn, header, records, batch_size=batch_size)
+    except library.LibraryFormatError as e:
+        raise click.ClickException(str(e))
+    finally:
+        conn.close()
+        if path != '-':
+            source.close()
+    click.echo(f"{result['imported']} rețete importate în {result['seconds']:.1f}s")
+
+
+startup_phase('routes')
+
+# Warm-up-ul combinațiilor populare în serviciul web, pe același disc cu recipes.db (vezi warmup.py)
+if os.getenv('WARMUP_IN_PROCESS', 'false').lower() == 'true' and GEMINI_API_KEY:
+    import warmup
+    warmup.start_in_background(sys.modules[__name__])
+
+logger.info("Startup | total=%.3fs %s", sum(seconds for _, seconds in STARTUP_PHASES),
+            ' '.join(f'{name}={seconds * 1000:.1f}ms' for name, seconds in STARTUP_PHASES))
+
+
 if __name__ == '__main__':
     # Inițializează baza de date (în caz de rulare directă cu python app.py)
     init_db()
@@ -0,0 +1,54 @@
+"""
+asgi.py - Mod de servire ASGI (opțional) pentru calea de generare
+
+Aplicația Flask rămâne WSGI și rulează neschimbată într-un pool de thread-uri
+(`a2wsgi`, ASGI_WSGI_THREADS). Diferența e în generare: la pornire
+(`lifespan.startup`) job-urile de generare trec pe bucla de evenimente a
+serverului (`app.enable_async_generation`), cu clientul Gemini pe `httpx`, deci
+un apel Gemini în așteptare nu mai ține un thread și un singur worker poate avea
+sute de generări în curs (GENERATION_ASYNC_CONCURRENCY).
+
+Rulare:
+    uvicorn asgi:application --host 0.0.0.0 --port $PORT --workers 1
+
+Comparația cu `gunicorn app:app --workers 2 --threads 4`: tools/bench_asgi.py.
+"""
+import asyncio
+import logging
+import os
+
+from a2wsgi import WSGIMiddleware
+
+import app as flask_app
+
+logger = logging.getLogger(__name__)
+
+WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', '8'))
+
+wsgi_application = WSGIMiddleware(flask_app.app, workers=WSGI_THREADS)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                flask_app.enable_async_generation(asyncio.get_running_loop())
+            except Exception as e:
+                logger.exception("ASGI startup failed")
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            logger.info("ASGI mode ready | wsgi_threads=%s", WSGI_THREADS)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if flask_app.async_gemini_client is not None:
+                await flask_app.async_gemini_client.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    await wsgi_application(scope, receive, send)
@@ -0,0 +1,291 @@
+"""
+assets.py - Build-ul fișierelor statice și servirea lor cu cache de lungă durată
+
+Build (`python assets.py`, rulat la deploy):
+- concatenează fișierele din `BUNDLES`, le minifică și le scrie în `static/dist/`
+  cu hash-ul conținutului în nume (`js/base.3f2a9c1d7e04.js`)
+- pentru fiecare fișier generează variantele `.gz` și (dacă pachetul `brotli`
+  e instalat) `.br`
+- scrie `static/dist/manifest.json`: numele logic -> numele cu hash
+
+În aplicație:
+- `Manifest.url(...)` (helper-ul `asset_url` din template-uri) întoarce URL-ul
+  fișierului cu hash, sau fișierul original dacă build-ul nu a fost rulat
+- `StaticFilesMiddleware` (WSGI, în fața Flask) servește tot ce e sub `/static/`:
+  fișierele cu hash cu `Cache-Control: immutable` pe un an, celelalte cu ETag și
+  revalidare; alege varianta br/gzip după `Accept-Encoding`. Cererile statice nu
+  mai ajung la Flask (hook-uri, sesiune, Talisman).
+
+Minificarea e conservatoare (fără redenumiri sau unirea liniilor): comentarii,
+indentare și linii goale. Dacă `rjsmin` / `rcssmin` sunt instalate se folosesc ele.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import sys
+import threading
+from email.utils import formatdate
+
+try:
+    import brotli
+except ImportError:  # opțional: fără el se generează doar .gz
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIRNAME = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# Fișier logic (folosit în template-uri) -> fișierele sursă concatenate, în ordine
+BUNDLES = {
+    'js/base.js': ['js/base.js', 'js/main.js'],
+    'js/index.js': ['js/index.js'],
+    'js/gallery.js': ['js/gallery.js'],
+    'js/generation_pending.js': ['js/generation_pending.js'],
+    'js/recipe_result.js': ['js/recipe_result.js'],
+    'js/recipe_detail.js': ['js/recipe_detail.js'],
+    'css/custom.css': ['css/custom.css'],
+}
+
+HASH_LENGTH = 12
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, max-age=0, must-revalidate'
+# Sub această dimensiune compresia nu merită
+MIN_COMPRESS_SIZE = 256
+
+_JS_TOKEN_RE = re.compile(
+    r"(?P<string>'(?:\\.|[^'\\\n])*'|\"(?:\\.|[^\"\\\n])*\"|`(?:\\.|[^`\\])*`)"
+    r"|(?P<block>/\*[\s\S]*?\*/)"
+    r"|(?P<line>(?<![:\\])//[^\n]*)"
+)
+_CSS_COMMENT_RE = re.compile(r"/\*[\s\S]*?\*/")
+_CSS_SPACE_RE = re.compile(r"\s+")
+_CSS_PUNCTUATION_RE = re.compile(r"\s*([{};,>])\s*")
+_HASHED_NAME_RE = re.compile(r"\.[0-9a-f]{%d}\.[a-z0-9]+$" % HASH_LENGTH)
+
+
+# ==================== MINIFICARE ====================
+def _strip_js_comment(match):
+    return match.group('string') or ''
+
+
+def minify_js(source):
+    """Fără comentarii, indentare și linii goale; liniile rămân separate (ASI neschimbat)."""
+    if rjsmin is not None:
+        return rjsmin.jsmin(source)
+    source = _JS_TOKEN_RE.sub(_strip_js_comment, source)
+    lines = (line.strip() for line in source.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def minify_css(source):
+    if rcssmin is not None:
+        return rcssmin.cssmin(source)
+    source = _CSS_COMMENT_RE.sub('', source)
+    source = _CSS_SPACE_RE.sub(' ', source)
+    source = _CSS_PUNCTUATION_RE.sub(r'\1', source)
+    return source.replace(';}', '}').strip()
+
+
+def _minify(logical_name, source):
+    if logical_name.endswith('.js'):
+        return minify_js(source)
+    if logical_name.endswith('.css'):
+        return minify_css(source)
+    return source
+
+
+# ==================== BUILD ====================
+def _hashed_name(logical_name, content):
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    root, ext = os.path.splitext(logical_name)
+    return f"{root}.{digest}{ext}"
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as handle:
+        handle.write(content)
+
+
+def _write_compressed(path, content):
+    """Variantele .gz (deterministă: mtime=0) și .br lângă fișier."""
+    if len(content) < MIN_COMPRESS_SIZE:
+        return
+    _write(path + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _write(path + '.br', brotli.compress(content, quality=11))
+
+
+def build(static_dir=STATIC_DIR, bundles=None):
+    """
+    Generează `static/dist/` (bundle-uri minificate, cu hash, precomprimate) și manifestul.
+
+    Returns:
+        dict: manifestul (nume logic -> cale relativă la `static/`)
+    """
+    bundles = bundles or BUNDLES
+    dist_dir = os.path.join(static_dir, DIST_DIRNAME)
+    shutil.rmtree(dist_dir, ignore_errors=True)
+    manifest = {}
+    for logical_name, sources in bundles.items():
+        parts = []
+        for source in sources:
+            with open(os.path.join(static_dir, source), encoding='utf-8') as handle:
+                parts.append(handle.read())
+        content = _minify(logical_name, '\n'.join(parts)).encode('utf-8')
+        hashed = _hashed_name(logical_name, content)
+        path = os.path.join(dist_dir, hashed)
+        _write(path, content)
+        _write_compressed(path, content)
+        manifest[logical_name] = f"{DIST_DIRNAME}/{hashed}"
+    _write(os.path.join(dist_dir, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+# ==================== MANIFEST ====================
+class Manifest:
+    """Numele logice -> fișierele cu hash din `static/dist/manifest.json` (citit o dată)."""
+
+    def __init__(self, static_dir=STATIC_DIR, enabled=True):
+        self.entries = {}
+        path = os.path.join(static_dir, DIST_DIRNAME, MANIFEST_NAME)
+        if enabled and os.path.exists(path):
+            with open(path, encoding='utf-8') as handle:
+                self.entries = json.load(handle)
+
+    def resolve(self, filename):
+        """Calea relativă la `static/` a fișierului de servit (cu hash dacă există build)."""
+        return self.entries.get(filename, filename)
+
+
+# ==================== SERVIRE ====================
+class _StaticFile:
+    __slots__ = ('variants', 'etag', 'last_modified', 'mimetype', 'cache_control', 'signature')
+
+    def __init__(self, path, cache_control):
+        stat = os.stat(path)
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if self.mimetype.startswith('text/') or self.mimetype in ('application/javascript', 'application/json'):
+            self.mimetype += '; charset=utf-8'
+        self.cache_control = cache_control
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        with open(path, 'rb') as handle:
+            content = handle.read()
+        self.etag = '"%s"' % hashlib.sha256(content).hexdigest()[:20]
+        self.variants = {None: content}
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if os.path.exists(path + suffix):
+                with open(path + suffix, 'rb') as handle:
+                    self.variants[encoding] = handle.read()
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if name and not re.search(r"q=0(?:\.0*)?\s*$", params):
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class StaticFilesMiddleware:
+    """
+    Middleware WSGI care servește `/static/...` înaintea aplicației Flask.
+
+    Fișierele din `static/dist/` (cu hash în nume) sunt imutabile; celelalte se
+    recitesc dacă s-au modificat pe disc (dezvoltare) și se revalidează cu ETag.
+    Orice altă cale (sau un fișier inexistent) ajunge la aplicație.
+    """
+
+    def __init__(self, wsgi_app, static_dir=STATIC_DIR, url_prefix='/static/'):
+        self.wsgi_app = wsgi_app
+        self.static_dir = os.path.realpath(static_dir)
+        self.url_prefix = url_prefix
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, relative):
+        path = os.path.realpath(os.path.join(self.static_dir, relative))
+        if not path.startswith(self.static_dir + os.sep) or path.endswith(('.gz', '.br')) or not os.path.isfile(path):
+            return None
+        immutable = relative.startswith(DIST_DIRNAME + '/') and _HASHED_NAME_RE.search(relative)
+        cached = self._files.get(relative)
+        if cached is not None and (immutable or cached.signature == self._signature(path)):
+            return cached
+        static_file = _StaticFile(path, IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL)
+        with self._lock:
+            self._files[relative] = static_file
+        return static_file
+
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        method = environ.get('REQUEST_METHOD', 'GET')
+        if not path.startswith(self.url_prefix) or method not in ('GET', 'HEAD'):
+            return self.wsgi_app(environ, start_response)
+        static_file = self._lookup(path[len(self.url_prefix):])
+        if static_file is None:
+            return self.wsgi_app(environ, start_response)
+
+        headers = [
+            ('Cache-Control', static_file.cache_control),
+            ('ETag', static_file.etag),
+            ('Last-Modified', static_file.last_modified),
+            ('Vary', 'Accept-Encoding'),
+            ('X-Content-Type-Options', 'nosniff'),
+        ]
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH', '')
+        if if_none_match and (if_none_match.strip() == '*' or static_file.etag in if_none_match):
+            start_response('304 Not Modified', headers)
+            return [b'']
+
+        accepted = _accepted_encodings(environ.get('HTTP_ACCEPT_ENCODING'))
+        encoding = next((name for name in ('br', 'gzip') if name in accepted and name in static_file.variants), None)
+        body = static_file.variants[encoding]
+        headers.append(('Content-Type', static_file.mimetype))
+        headers.append(('Content-Length', str(len(body))))
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        start_response('200 OK', headers)
+        return [b''] if method == 'HEAD' else [body]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build fișiere statice (bundle, minificare, hash, gzip/brotli)')
+    parser.add_argument('--static-dir', default=STATIC_DIR)
+    args = parser.parse_args(argv)
+    manifest = build(args.static_dir)
+    dist_dir = os.path.join(args.static_dir, DIST_DIRNAME)
+    for logical_name, hashed in sorted(manifest.items()):
+        sizes = []
+        for suffix in ('', '.gz', '.br'):
+            path = os.path.join(args.static_dir, hashed + suffix)
+            if os.path.exists(path):
+                sizes.append(f"{suffix or 'raw'}={os.path.getsize(path)}")
+        print(f"{logical_name:28} -> {hashed}  ({' '.join(sizes)})")
+    print(f"Manifest: {os.path.join(dist_dir, MANIFEST_NAME)}{'' if brotli else ' (fără brotli: pip install Brotli)'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+auth.py - Politica de hash-uire a parolelor și limitarea încercărilor de autentificare
+
+- `PasswordPolicy`: algoritmul și costul hash-ului (metoda werkzeug, ex:
+  `scrypt:32768:8:1` sau `pbkdf2:sha256:600000`) configurabile per mediu. Un hash
+  stocat cu altă metodă e recalculat transparent la următorul login reușit
+  (`needs_rehash`), deci schimbarea costului nu cere resetarea parolelor.
+- `LoginThrottle`: fereastră glisantă per cheie (`email:...`, `ip:...`) în tabelul
+  `login_attempts`, comun tuturor workerilor. Încercările peste limită sunt
+  refuzate înainte de orice calcul de hash; o cheie blocată e ținută și în
+  memoria workerului până expiră, deci un atac în rafală nu mai atinge nici SQLite.
+"""
+import functools
+import hashlib
+import threading
+import time
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+import db
+
+DEFAULT_HASH_METHOD = 'scrypt'
+HASH_ALGORITHMS = ('scrypt', 'pbkdf2')
+
+
+class LoginThrottled(Exception):
+    """Prea multe încercări pentru `key` în fereastra curentă; se poate reîncerca după `retry_after` secunde."""
+
+    def __init__(self, key, retry_after):
+        super().__init__(f'too many attempts for {key}')
+        self.key = key
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+
+def validate_hash_method(method):
+    """
+    Verifică metoda ca `generate_password_hash` din werkzeug, fără să calculeze hash-ul:
+    `scrypt[:n:r:p]` (întregi pozitivi) sau `pbkdf2[:digest[:iterații]]` (digest disponibil în hashlib).
+    """
+    algorithm, *args = method.split(':')
+    if algorithm not in HASH_ALGORITHMS:
+        raise ValueError(f'Metodă de hash necunoscută: {method!r}')
+    if algorithm == 'scrypt':
+        if not hasattr(hashlib, 'scrypt'):
+            raise ValueError('scrypt nu e disponibil în hashlib (OpenSSL); folosește pbkdf2')
+        if args and len(args) != 3:
+            raise ValueError(f"'scrypt' are 3 parametri (n:r:p): {method!r}")
+        numbers = args
+    else:
+        if len(args) > 2:
+            raise ValueError(f"'pbkdf2' are cel mult 2 parametri (digest:iterații): {method!r}")
+        if args:
+            try:
+                hashlib.new(args[0])
+            except ValueError:
+                raise ValueError(f'Digest necunoscut pentru pbkdf2: {args[0]!r}') from None
+        numbers = args[1:]
+    for value in numbers:
+        if not value.isdigit() or int(value) < 1:
+            raise ValueError(f'Parametru invalid în metoda de hash {method!r}: {value!r}')
+    if algorithm == 'scrypt' and args and (int(args[0]) < 2 or int(args[0]) & (int(args[0]) - 1)):
+        raise ValueError(f'scrypt: n trebuie să fie o putere a lui 2 mai mare ca 1: {method!r}')
+
+
+class PasswordPolicy:
+    """Hash-uirea parolelor cu metoda configurată (vezi `werkzeug.security.generate_password_hash`)."""
+
+    def __init__(self, method=DEFAULT_HASH_METHOD):
+        # O metodă invalidă (algoritm, număr de parametri, întregi, digest) aruncă ValueError la pornire,
+        # nu la primul login; validarea nu calculează niciun hash
+        validate_hash_method(method)
+        self.method = method
+
+    @functools.cached_property
+    def prefix(self):
+        """
+        Prefixul complet al metodei (parametrii impliciți expliciți, ex: 'scrypt' -> 'scrypt:32768:8:1').
+
+        Se calculează cu un hash complet, deci la primul login, nu la importul aplicației în fiecare worker.
+        """
+        return generate_password_hash('', self.method).split('$', 1)[0]
+
+    def hash(self, password):
+        return generate_password_hash(password, self.method)
+
+    def verify(self, stored_hash, password):
+        return check_password_hash(stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        """True dacă hash-ul stocat a fost calculat cu altă metodă sau alți parametri decât politica curentă."""
+        return stored_hash.split('$', 1)[0] != self.prefix
+
+
+class LoginThrottle:
+    """
+    Limită de încercări per cheie într-o fereastră glisantă de `window` secunde.
+
+    `hit(limits)` primește perechi (cheie, limită) și înregistrează încercarea pentru
+    toate cheile sau pentru niciuna: dacă o cheie și-a atins limita aruncă
+    `LoginThrottled`. Încercările refuzate nu se înregistrează.
+    """
+
+    def __init__(self, db_path, window=900, enabled=True, purge_interval=300):
+        self.db_path = db_path
+        self.window = window
+        self.enabled = enabled
+        self.purge_interval = purge_interval
+        self._blocked = {}  # cheie -> momentul (monotonic) până la care e refuzată fără SQLite
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+
+    def _connect(self):
+        return db.get_connection(self.db_path)
+
+    def _blocked_for(self, key):
+        with self._lock:
+            until = self._blocked.get(key)
+        if until is None:
+            return 0
+        remaining = until - time.monotonic()
+        if remaining <= 0:
+            with self._lock:
+                self._blocked.pop(key, None)
+            return 0
+        return remaining
+
+    def _block(self, key, retry_after):
+        with self._lock:
+            if len(self._blocked) > 10000:
+                self._blocked.clear()
+            self._blocked[key] = time.monotonic() + retry_after
+
+    def hit(self, limits):
+        if not self.enabled:
+            return
+        for key, _ in limits:
+            remaining = self._blocked_for(key)
+            if remaining:
+                raise LoginThrottled(key, remaining)
+
+        now = time.time()
+        since = now - self.window
+        conn = self._connect()
+        try:
+            with conn:
+                for key, limit in limits:
+                    # Verificarea și inserarea într-un singur statement; după primul INSERT tranzacția
+                    # ține lock-ul de scriere, deci cererile concurente nu pot depăși limita
+                    inserted = conn.execute('''
+                        INSERT INTO login_attempts (key, attempted_at)
+                        SELECT ?, ? WHERE (SELECT COUNT(*) FROM login_attempts WHERE key = ? AND attempted_at > ?) < ?
+                    ''', (key, now, key, since, limit)).rowcount
+                    if not inserted:
+                        # Excepția anulează și încercările deja înregistrate pentru celelalte chei
+                        raise LoginThrottled(key, 0)
+        except LoginThrottled as e:
+            retry_after = self._retry_after(conn, e.key, dict(limits)[e.key], now)
+            self._block(e.key, retry_after)
+            raise LoginThrottled(e.key, retry_after) from None
+        self._maybe_purge(conn, now)
+
+    def _retry_after(self, conn, key, limit, now):
+        """Secundele până când a `limit`-a cea mai recentă încercare iese din fereastră."""
+        row = conn.execute('''
+            SELECT attempted_at FROM login_attempts WHERE key = ? AND attempted_at > ?
+            ORDER BY attempted_at DESC LIMIT 1 OFFSET ?
+        ''', (key, now - self.window, limit - 1)).fetchone()
+        return (row[0] + self.window - now) if row else 1
+
+    def reset(self, key):
+        """Șterge încercările cheii (ex: după un login reușit pentru email)."""
+        if not self.enabled:
+            return
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM login_attempts WHERE key = ?', (key,))
+        with self._lock:
+            self._blocked.pop(key, None)
+
+    def _maybe_purge(self, conn, now):
+        # Fiecare worker curăță periodic încercările ieșite din fereastră (toate cheile)
+        if time.monotonic() < self._next_purge:
+            return
+        self._next_purge = time.monotonic() + self.purge_interval
+        with conn:
+            conn.execute('DELETE FROM login_attempts WHERE attempted_at <= ?', (now - self.window,))
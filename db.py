@@ -0,0 +1,133 @@
+"""
+db.py - Conexiuni SQLite reutilizate per thread
+
+În loc de `sqlite3.connect()` + `close()` la fiecare rută, fiecare thread
+(thread-urile Gunicorn, executorul de job-uri) păstrează o conexiune deschisă,
+configurată o singură dată:
+- WAL: cititorii nu mai blochează scriitorii (și invers) între workeri
+- synchronous=NORMAL, cache_size / mmap_size mărite, temp_store în memorie
+- busy_timeout: așteaptă lock-ul în loc de "database is locked"
+- cache de statement-uri pregătite (`cached_statements`) reutilizat între request-uri
+
+Conexiunile numără interogările și timpul petrecut în `execute` per thread
+(`query_stats()`), pentru metricile per request (vezi metrics.py).
+"""
+import os
+import sqlite3
+import threading
+import time
+
+# Fișierul bazei de date a aplicației (relativ la directorul de lucru)
+DATABASE = 'recipes.db'
+BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+CACHE_SIZE_KIB = int(os.getenv('SQLITE_CACHE_SIZE_KIB', '16384'))
+MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024)))
+CACHED_STATEMENTS = 256
+
+_local = threading.local()
+
+
+def _record_query(elapsed):
+    _local.queries = getattr(_local, 'queries', 0) + 1
+    _local.query_seconds = getattr(_local, 'query_seconds', 0.0) + elapsed
+
+
+def reset_query_stats():
+    """Începutul unui request: contoarele de interogări ale thread-ului curent pornesc de la zero."""
+    _local.queries = 0
+    _local.query_seconds = 0.0
+
+
+def query_stats():
+    """(număr de interogări, secunde în execute) pe thread-ul curent de la ultimul reset."""
+    return getattr(_local, 'queries', 0), getattr(_local, 'query_seconds', 0.0)
+
+
+class TimedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_query(time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_query(time.perf_counter() - started)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Conexiune ale cărei interogări (prin `execute` sau prin cursoare) sunt contorizate."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(db_path):
+    """Deschide o conexiune nouă cu pragma-urile aplicației (rânduri accesibile și după nume)."""
+    conn = sqlite3.connect(
+        db_path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=CACHED_STATEMENTS,
+        check_same_thread=False,
+        factory=TimedConnection,
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+    conn.execute(f'PRAGMA cache_size=-{CACHE_SIZE_KIB}')
+    conn.execute(f'PRAGMA mmap_size={MMAP_SIZE}')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    return conn
+
+
+def get_connection(db_path):
+    """
+    Conexiunea thread-ului curent pentru `db_path` (creată la prima utilizare).
+
+    Conexiunile nu se partajează între procese: după fork (workerii Gunicorn)
+    se deschide automat una nouă.
+    """
+    pid = os.getpid()
+    connections = getattr(_local, 'connections', None)
+    if connections is None or getattr(_local, 'pid', None) != pid:
+        connections = _local.connections = {}
+        _local.pid = pid
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = connections[db_path] = connect(db_path)
+    return conn
+
+
+def release(db_path):
+    """
+    Sfârșit de request: anulează o tranzacție rămasă deschisă din greșeală,
+    astfel încât conexiunea reutilizată să nu țină lock-uri.
+    """
+    connections = getattr(_local, 'connections', None)
+    if not connections or getattr(_local, 'pid', None) != os.getpid():
+        return
+    conn = connections.get(db_path)
+    if conn is not None and conn.in_transaction:
+        conn.rollback()
+
+
+def close_all():
+    """Închide conexiunile thread-ului curent (ex: la oprirea unui thread de fundal)."""
+    connections = getattr(_local, 'connections', None) or {}
+    for conn in connections.values():
+        try:
+            conn.close()
+        except Exception:
+            pass
+    _local.connections = {}
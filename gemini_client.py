@@ -0,0 +1,513 @@
+"""
+gemini_client.py - Client HTTP dedicat pentru API-ul Gemini
+
+- `requests.Session` partajat (pool de conexiuni keep-alive per worker), deci
+  fără handshake TCP + TLS nou la fiecare generare; `requests` / `httpx` se importă
+  abia la primul apel, deci workerii care nu generează nu plătesc importul la pornire
+- timeout-uri separate pentru conectare și citire
+- reîncercări cu backoff exponențial + jitter pe 429/5xx, respectând `Retry-After`
+- streaming (`streamGenerateContent` cu `alt=sse`) pentru afișare incrementală
+- circuit breaker: după N eșecuri consecutive apelurile eșuează imediat
+  pentru o perioadă, în loc să țină thread-uri ocupate până la timeout
+- contoare de tokeni din `usageMetadata` și un callback opțional per încercare
+  (status, durată) pentru metrici
+
+`AsyncGeminiClient` face aceleași apeluri cu `httpx.AsyncClient`, pentru modul
+ASGI (asgi.py): un apel în așteptare nu mai ține un thread ocupat.
+"""
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = 'https://generativelanguage.googleapis.com/v1beta'
+DEFAULT_MODEL = 'gemini-2.0-flash'
+
+# Status-uri pentru care merită reîncercat (rate limit / indisponibilitate temporară)
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+
+def _requests():
+    """Modulul `requests`, importat la primul apel (nu la importul aplicației)."""
+    import requests
+    return requests
+
+
+def _httpx():
+    """Modulul `httpx` (opțional: doar pentru modul ASGI, `AsyncGeminiClient`)."""
+    try:
+        import httpx
+    except ImportError:
+        raise RuntimeError('Modul async cere pachetul httpx (pip install httpx)') from None
+    return httpx
+
+
+class GeminiError(Exception):
+    """Apelul Gemini a eșuat definitiv (după reîncercări)."""
+
+    def __init__(self, message, status_code=None, body_preview=''):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body_preview = body_preview
+
+
+class CircuitOpenError(GeminiError):
+    """Circuit breaker deschis: upstream-ul e considerat căzut, apelul nu se mai trimite."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker simplu (closed -> open -> half-open).
+
+    - closed: apelurile trec; eșecurile consecutive se numără
+    - open: după `failure_threshold` eșecuri, apelurile sunt refuzate `cooldown` secunde
+    - half-open: după cooldown trece un singur apel de probă; succes -> closed, eșec -> open
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, cooldown=30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        """True dacă apelul poate fi trimis acum."""
+        return self.acquire()[0]
+
+    def acquire(self):
+        """(apelul poate fi trimis, apelul e proba din half-open); proba se încheie cu `record_*` sau `release_probe`."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True, False
+            if time.monotonic() - self._opened_at < self.cooldown or self._probe_in_flight:
+                return False, False
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = True
+            return True, True
+
+    def release_probe(self):
+        """
+        Proba s-a oprit fără rezultat (anulată, ex: încercarea care a pierdut în model_router.py):
+        nu contează ca eșec, iar următorul apel poate fi din nou probă.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning("Gemini circuit breaker opened | failures=%s", self._failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+def _retry_after_seconds(response):
+    """Interpretează antetul `Retry-After` (secunde sau dată HTTP); None dacă lipsește."""
+    value = (response.headers.get('Retry-After') or '').strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+class GeminiClient:
+    """
+    Client pentru `models/<model>:generateContent`, cu pool de conexiuni, reîncercări și circuit breaker.
+
+    O instanță per proces; sesiunea HTTP se creează leneș la primul apel
+    (după fork-ul workerilor Gunicorn).
+    """
+
+    def __init__(self, api_key, base_url=DEFAULT_BASE_URL, model=DEFAULT_MODEL,
+                 connect_timeout=5.0, read_timeout=25.0, max_retries=2,
+                 backoff_base=0.5, backoff_max=8.0, pool_size=8,
+                 breaker_threshold=5, breaker_cooldown=30.0, on_attempt=None):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pool_size = pool_size
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        # on_attempt(status, elapsed): status HTTP sau 'error' (conexiune / timeout)
+        self.on_attempt = on_attempt
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=500)
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.total_tokens = 0
+
+    @property
+    def session(self):
+        with self._session_lock:
+            if self._session is None:
+                requests = _requests()
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({'Content-Type': 'application/json'})
+                self._session = session
+            return self._session
+
+    def url(self, method='generateContent', model=None):
+        return f"{self.base_url}/models/{model or self.model}:{method}"
+
+    def _backoff(self, attempt, response=None):
+        """Întârzierea înaintea reîncercării `attempt` (1, 2, ...): Retry-After sau backoff exponențial cu jitter."""
+        if response is not None:
+            retry_after = _retry_after_seconds(response)
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+
+    def _record_attempt(self, elapsed, status='error'):
+        with self._stats_lock:
+            self.attempts += 1
+            self._latencies.append(elapsed)
+        if self.on_attempt:
+            self.on_attempt(status, elapsed)
+
+    def record_usage(self, data):
+        """Adună tokenii din `usageMetadata` (răspunsul complet sau ultima bucată din stream)."""
+        usage = data.get('usageMetadata') if isinstance(data, dict) else None
+        if not isinstance(usage, dict):
+            return
+        with self._stats_lock:
+            self.prompt_tokens += usage.get('promptTokenCount') or 0
+            self.output_tokens += usage.get('candidatesTokenCount') or 0
+            self.total_tokens += usage.get('totalTokenCount') or 0
+
+    def _start_attempt(self, attempt, last_error):
+        """Întârzierea înaintea încercării `attempt` (0 pentru prima); contorizează reîncercarea."""
+        if not attempt:
+            return 0.0
+        delay = self._backoff(attempt, last_error if not isinstance(last_error, Exception) else None)
+        with self._stats_lock:
+            self.retries += 1
+        logger.info("Gemini retry | attempt=%s delay=%.2fs", attempt, delay)
+        return delay
+
+    def _begin_call(self):
+        """
+        Contorizează apelul; aruncă `CircuitOpenError` dacă breaker-ul e deschis.
+        True dacă apelul e proba din half-open.
+        """
+        with self._stats_lock:
+            self.calls += 1
+        allowed, probe = self.breaker.acquire()
+        if not allowed:
+            with self._stats_lock:
+                self.rejected += 1
+            raise CircuitOpenError('Gemini circuit breaker open')
+        return probe
+
+    def post(self, body, method='generateContent', stream=False, model=None):
+        """
+        Trimite cererea cu reîncercări și întoarce `requests.Response` (status 200).
+
+        Aruncă `CircuitOpenError` dacă breaker-ul e deschis și `GeminiError` după epuizarea reîncercărilor.
+        """
+        probe = self._begin_call()
+        try:
+            return self._post(body, method, stream, model)
+        except GeminiError:
+            raise
+        except BaseException:
+            # Excepție neprevăzută / întrerupere: proba nu are rezultat, breaker-ul nu rămâne blocat
+            if probe:
+                self.breaker.release_probe()
+            raise
+
+    def _post(self, body, method, stream, model):
+        requests = _requests()
+        url = self.url(method, model)
+        headers = {'X-goog-api-key': self.api_key or ''}
+        params = {'alt': 'sse'} if stream else None
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            delay = self._start_attempt(attempt, last_error)
+            if delay:
+                time.sleep(delay)
+
+            t0 = time.perf_counter()
+            try:
+                response = self.session.post(url, headers=headers, params=params, json=body, stream=stream,
+                                             timeout=(self.connect_timeout, self.read_timeout))
+            except requests.ConnectionError as e:
+                # Inclusiv ConnectTimeout: cererea nu a ajuns la server, se poate reîncerca
+                self._record_attempt(time.perf_counter() - t0)
+                last_error = e
+                continue
+            except requests.RequestException as e:
+                # ReadTimeout etc.: nu reîncercăm (ar dubla latența percepută)
+                self._record_attempt(time.perf_counter() - t0)
+                self._fail()
+                raise GeminiError(f'Gemini request error: {e}') from e
+
+            elapsed = time.perf_counter() - t0
+            self._record_attempt(elapsed, response.status_code)
+            logger.info("Gemini attempt | status=%s attempt=%s elapsed=%.2fs", response.status_code, attempt, elapsed)
+            if response.status_code == 200:
+                self.breaker.record_success()
+                return response
+            if response.status_code in RETRY_STATUSES:
+                last_error = response
+                continue
+            # 4xx (cerere invalidă, cheie greșită) - nu are sens să reîncercăm
+            self.breaker.record_success()
+            raise GeminiError('Gemini call failed', response.status_code, self._preview(response))
+
+        self._fail()
+        if isinstance(last_error, requests.Response):
+            raise GeminiError('Gemini call failed after retries', last_error.status_code, self._preview(last_error))
+        raise GeminiError(f'Gemini connection failed after retries: {last_error}')
+
+    def generate_content(self, body, model=None):
+        """Apelează `generateContent` și întoarce JSON-ul răspunsului."""
+        data = self.post(body, model=model).json()
+        self.record_usage(data)
+        return data
+
+    def stream_generate_content(self, body, model=None):
+        """
+        Apelează `streamGenerateContent` (SSE) și produce fiecare bucată JSON pe măsură ce sosește.
+
+        Reîncercările și circuit breaker-ul se aplică doar până la primirea răspunsului (status 200).
+        """
+        response = self.post(body, method='streamGenerateContent', stream=True, model=model)
+        requests = _requests()
+        # usageMetadata vine cumulat pe bucăți; contează ultima primită
+        usage_chunk = None
+        # SSE e mereu UTF-8; fără charset în Content-Type requests ar decoda ca ISO-8859-1
+        response.encoding = 'utf-8'
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                payload = line[5:].strip()
+                if not payload or payload == '[DONE]':
+                    continue
+                try:
+                    chunk = json.loads(payload)
+                except ValueError:
+                    logger.warning("Gemini stream: invalid chunk preview=%s", payload[:200])
+                    continue
+                if isinstance(chunk, dict) and 'usageMetadata' in chunk:
+                    usage_chunk = chunk
+                yield chunk
+        except requests.RequestException as e:
+            self._fail()
+            raise GeminiError(f'Gemini stream interrupted: {e}') from e
+        finally:
+            response.close()
+            if usage_chunk is not None:
+                self.record_usage(usage_chunk)
+
+    def _fail(self):
+        with self._stats_lock:
+            self.failures += 1
+        self.breaker.record_failure()
+
+    @staticmethod
+    def _preview(response):
+        return (response.text or '')[:200].replace('\n', ' ')
+
+    def stats(self):
+        """Contoare și latențe pe încercare, pentru monitorizare."""
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                'calls': self.calls,
+                'attempts': self.attempts,
+                'retries': self.retries,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'prompt_tokens': self.prompt_tokens,
+                'output_tokens': self.output_tokens,
+                'total_tokens': self.total_tokens,
+                'circuit_state': self.breaker.state,
+            }
+        if latencies:
+            stats['latency_p50'] = latencies[len(latencies) // 2]
+            stats['latency_p95'] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return stats
+
+    def close(self):
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+class AsyncGeminiClient(GeminiClient):
+    """
+    Aceleași apeluri ca `GeminiClient` (reîncercări, circuit breaker, contoare), prin `httpx.AsyncClient`.
+
+    Folosit în modul ASGI: corutinele așteaptă răspunsul fără să țină un thread, deci
+    un singur worker poate avea sute de apeluri în curs (`pool_size` conexiuni).
+    Clientul HTTP se creează la primul apel, în bucla de evenimente a serverului.
+    """
+
+    def __init__(self, *args, **kwargs):
+        _httpx()
+        super().__init__(*args, **kwargs)
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            httpx = _httpx()
+            self._client = httpx.AsyncClient(
+                headers={'Content-Type': 'application/json'},
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            )
+        return self._client
+
+    async def post(self, body, method='generateContent', stream=False, model=None):
+        """
+        Ca `GeminiClient.post`, dar async; întoarce `httpx.Response` (status 200).
+
+        Cu `stream=True` corpul nu e citit încă: apelantul îl consumă și îl închide (`aclose`).
+        """
+        probe = self._begin_call()
+        try:
+            return await self._post(body, method, stream, model)
+        except GeminiError:
+            raise
+        except BaseException:
+            # Inclusiv CancelledError: routerul anulează încercarea care a pierdut
+            if probe:
+                self.breaker.release_probe()
+            raise
+
+    async def _post(self, body, method, stream, model):
+        httpx = _httpx()
+        request = self.client.build_request(
+            'POST', self.url(method, model), json=body,
+            headers={'X-goog-api-key': self.api_key or ''},
+            params={'alt': 'sse'} if stream else None,
+        )
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            delay = self._start_attempt(attempt, last_error)
+            if delay:
+                await asyncio.sleep(delay)
+
+            t0 = time.perf_counter()
+            try:
+                response = await self.client.send(request, stream=stream)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                self._record_attempt(time.perf_counter() - t0)
+                last_error = e
+                continue
+            except httpx.HTTPError as e:
+                self._record_attempt(time.perf_counter() - t0)
+                self._fail()
+                raise GeminiError(f'Gemini request error: {e!r}') from e
+
+            elapsed = time.perf_counter() - t0
+            self._record_attempt(elapsed, response.status_code)
+            logger.info("Gemini attempt | status=%s attempt=%s elapsed=%.2fs", response.status_code, attempt, elapsed)
+            if response.status_code == 200:
+                self.breaker.record_success()
+                return response
+            # Corpul erorii se citește (pentru preview) și conexiunea se eliberează
+            await response.aread()
+            await response.aclose()
+            if response.status_code in RETRY_STATUSES:
+                last_error = response
+                continue
+            self.breaker.record_success()
+            raise GeminiError('Gemini call failed', response.status_code, self._preview(response))
+
+        self._fail()
+        if isinstance(last_error, httpx.Response):
+            raise GeminiError('Gemini call failed after retries', last_error.status_code, self._preview(last_error))
+        raise GeminiError(f'Gemini connection failed after retries: {last_error!r}')
+
+    async def generate_content(self, body, model=None):
+        response = await self.post(body, model=model)
+        data = response.json()
+        self.record_usage(data)
+        return data
+
+    async def stream_generate_content(self, body, model=None):
+        """Async generator cu bucățile JSON din `streamGenerateContent` (SSE), ca varianta sync."""
+        response = await self.post(body, method='streamGenerateContent', stream=True, model=model)
+        httpx = _httpx()
+        usage_chunk = None
+        try:
+            async for line in response.aiter_lines():
+                if not line or not line.startswith('data:'):
+                    continue
+                payload = line[5:].strip()
+                if not payload or payload == '[DONE]':
+                    continue
+                try:
+                    chunk = json.loads(payload)
+                except ValueError:
+                    logger.warning("Gemini stream: invalid chunk preview=%s", payload[:200])
+                    continue
+                if isinstance(chunk, dict) and 'usageMetadata' in chunk:
+                    usage_chunk = chunk
+                yield chunk
+        except httpx.HTTPError as e:
+            self._fail()
+            raise GeminiError(f'Gemini stream interrupted: {e!r}') from e
+        finally:
+            await response.aclose()
+            if usage_chunk is not None:
+                self.record_usage(usage_chunk)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,207 @@
+"""
+generation_cache.py - Cache pentru rețetele generate de Gemini
+
+Cheia cache-ului este forma canonică a listei de ingrediente (litere mici,
+fără diacritice, separate, sortate, fără duplicate), astfel încât
+"Pui, cartofi, usturoi" și "usturoi,  cartofi, pui" folosesc aceeași intrare.
+
+Două niveluri:
+- memorie (LRU limitat ca dimensiune, cu TTL) - per proces/worker
+- SQLite (tabelul `generation_cache`) - partajat între workerii Gunicorn
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+
+import db
+
+# Separatori acceptați între ingrediente: virgulă, punct și virgulă, linie nouă, " si "
+_SPLIT_RE = re.compile(r"[,;\n]+|\s+si\s+")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def strip_diacritics(text):
+    """Elimină diacriticele (ă, â, î, ș/ş, ț/ţ -> a, a, i, s, t)."""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def normalize_ingredients(ingredients_text):
+    """
+    Returnează forma canonică a listei de ingrediente.
+
+    Ex: "Pui, cartofi și Usturoi, pui" -> "cartofi,pui,usturoi"
+    """
+    text = strip_diacritics((ingredients_text or '').lower())
+    items = set()
+    for part in _SPLIT_RE.split(text):
+        item = _SPACES_RE.sub(' ', part).strip(' .-•')
+        if item:
+            items.add(item)
+    return ','.join(sorted(items))
+
+
+def cache_key(ingredients_text):
+    """Cheie content-addressed (SHA-256 peste forma canonică)."""
+    return hashlib.sha256(normalize_ingredients(ingredients_text).encode('utf-8')).hexdigest()
+
+
+class GenerationCache:
+    """
+    Cache în două niveluri pentru rețetele parsate (dict-ul din `parse_recipe_response`).
+
+    `get()` caută întâi în memorie, apoi în SQLite (și promovează intrarea în memorie);
+    `set()` scrie în ambele niveluri. Contoarele hit/miss sunt per proces.
+    """
+
+    def __init__(self, db_path, max_entries=256, ttl_seconds=6 * 3600, enabled=True, hit_flush_interval=60.0):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries = OrderedDict()  # key -> (expires_at, recipe)
+        self._lock = threading.Lock()
+        # Hit-urile din memorie, adunate în `generation_cache.hits` cel mult o dată la `hit_flush_interval`
+        self.hit_flush_interval = hit_flush_interval
+        self._pending_hits = Counter()
+        self._flushed_at = time.time()
+        self.hits = 0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        return db.get_connection(self.db_path)
+
+    def get(self, ingredients_text):
+        """Returnează rețeta din cache sau None (miss / expirată)."""
+        if not self.enabled:
+            return None
+        key = cache_key(ingredients_text)
+        now = time.time()
+
+        recipe = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, cached = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    self._pending_hits[key] += 1
+                    pending = self._take_pending_hits(now)
+                    recipe = dict(cached)
+                else:
+                    del self._entries[key]
+        if recipe is not None:
+            self._flush_hits(pending)
+            return recipe
+
+        recipe = None
+        expires_at = None
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                'SELECT recipe_json, expires_at FROM generation_cache WHERE key = ? AND expires_at > ?',
+                (key, now)
+            ).fetchone()
+            if row:
+                with conn:
+                    conn.execute('UPDATE generation_cache SET hits = hits + 1 WHERE key = ?', (key,))
+                recipe = json.loads(row[0])
+                expires_at = row[1]
+        except Exception:
+            recipe = None
+
+        with self._lock:
+            if recipe is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.db_hits += 1
+            self._remember(key, expires_at, recipe)
+        return dict(recipe)
+
+    def set(self, ingredients_text, recipe, ttl_seconds=None):
+        """Stochează rețeta parsată în ambele niveluri (`ttl_seconds` implicit: cel al cache-ului)."""
+        if not self.enabled or not recipe:
+            return
+        key = cache_key(ingredients_text)
+        now = time.time()
+        expires_at = now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+
+        with self._lock:
+            self._remember(key, expires_at, dict(recipe))
+
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute('DELETE FROM generation_cache WHERE expires_at <= ?', (now,))
+                conn.execute('''
+                    INSERT OR REPLACE INTO generation_cache (key, canonical, recipe_json, created_at, expires_at, hits)
+                    VALUES (?, ?, ?, ?, ?, 0)
+                ''', (key, normalize_ingredients(ingredients_text), json.dumps(recipe, ensure_ascii=False), now, expires_at))
+        except Exception:
+            # Nivelul persistent e best-effort; nivelul din memorie rămâne valid
+            pass
+
+    def _take_pending_hits(self, now):
+        """Hit-urile din memorie de scris, dacă a trecut intervalul (apelat sub lock)."""
+        if now - self._flushed_at < self.hit_flush_interval or not self._pending_hits:
+            return None
+        pending, self._pending_hits = self._pending_hits, Counter()
+        self._flushed_at = now
+        return pending
+
+    def _flush_hits(self, pending):
+        """Contoarele `hits` din SQLite (popularitatea combinațiilor, vezi warmup.py); best-effort."""
+        if not pending:
+            return
+        try:
+            conn = self._connect()
+            with conn:
+                conn.executemany('UPDATE generation_cache SET hits = hits + ? WHERE key = ?',
+                                 [(count, key) for key, count in pending.items()])
+        except Exception:
+            pass
+
+    def expires_at(self, ingredients_text):
+        """Momentul expirării intrării din SQLite sau None (lipsă/expirată); nu contează ca hit."""
+        try:
+            row = self._connect().execute(
+                'SELECT expires_at FROM generation_cache WHERE key = ? AND expires_at > ?',
+                (cache_key(ingredients_text), time.time())
+            ).fetchone()
+        except Exception:
+            return None
+        return row[0] if row else None
+
+    def _remember(self, key, expires_at, recipe):
+        """Inserează în LRU și elimină cele mai vechi intrări peste limită (apelat sub lock)."""
+        self._entries[key] = (expires_at, recipe)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Golește nivelul din memorie (nivelul SQLite expiră prin TTL)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Contoarele hit/miss pentru monitorizare."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'memory_hits': self.memory_hits,
+                'db_hits': self.db_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+                'size': len(self._entries),
+            }
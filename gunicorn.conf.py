@@ -0,0 +1,19 @@
+"""
+gunicorn.conf.py - Hook-urile Gunicorn (fișierul e citit automat din directorul curent)
+
+Migrările schemei rulează o singură dată, în procesul master, înaintea fork-ului
+workerilor. Rezultatul ajunge la workeri prin mediu (`DB_SCHEMA_READY`,
+`DB_FTS_ENABLED`), deci importul `app` în fiecare worker nu mai deschide o
+conexiune de migrare (vezi `tools/profile_startup.py`).
+"""
+import os
+
+import db
+import migrations
+
+
+def on_starting(server):
+    version, fts = migrations.migrate_database(db.DATABASE)
+    os.environ['DB_SCHEMA_READY'] = '1'
+    os.environ['DB_FTS_ENABLED'] = '1' if fts else '0'
+    server.log.info("Database ready (pre-fork) | schema_version=%s fts=%s", version, fts)
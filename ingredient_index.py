@@ -0,0 +1,210 @@
+"""
+ingredient_index.py - Index inversat de ingrediente pentru "ce pot găti cu ce am"
+
+Fiecare rețetă salvată are ingredientele (câmpul `item` din JSON-ul modelului)
+normalizate în termeni: litere mici, fără diacritice, fără cantități/unități/note,
+fără cuvinte de legătură și cu o formă redusă a pluralului ("Roșii coapte" și
+"roșie" -> "ros").
+
+Tabele:
+- ingredient_terms: dicționarul de termeni (id, term)
+- ingredient_term_words: cuvânt -> termen (un termen al utilizatorului ca "pui"
+  acoperă și "piept de pui")
+- recipe_ingredient_terms: termen -> rețete (index inversat), cu numărul de
+  termeni ai rețetei în cheie
+- recipes.ingredient_count: numărul de termeni distincți ai rețetei (numitorul scorului)
+
+Potrivirea se face integral în SQLite, pe indecși: o rețetă cu n termeni poate
+atinge acoperirea minimă doar dacă n <= potriviri_posibile / min_coverage, deci
+rețetele lungi sunt excluse din range scan fără să fie citite. Condimentele de
+bază (sare, piper, ulei, apă) sunt ignorate ca să nu potrivească orice rețetă.
+"""
+import re
+
+from generation_cache import strip_diacritics
+
+# Cuvinte care nu identifică ingredientul
+_STOPWORDS = frozenset({
+    'de', 'cu', 'si', 'sau', 'la', 'din', 'in', 'pe', 'pentru', 'fara', 'un', 'o', 'a', 'al', 'ale',
+})
+# Unități de măsură care pot apărea în textul liber (nu și în `item`)
+_UNITS = frozenset({
+    'g', 'gr', 'grame', 'kg', 'ml', 'l', 'litru', 'litri', 'dl', 'cl',
+    'lingura', 'linguri', 'lingurita', 'lingurite', 'cana', 'cani', 'pahar', 'pahare',
+    'buc', 'bucata', 'bucati', 'felie', 'felii', 'catel', 'catei', 'legatura', 'legaturi',
+    'varf', 'praf', 'plic', 'plicuri', 'conserva', 'conserve', 'pachet',
+})
+# Ingrediente prezente în aproape orice rețetă; nu contează la potrivire
+STAPLES = frozenset({'sare', 'piper', 'ulei', 'apa'})
+
+# Sufixe de plural/articol eliminate (cel mai lung întâi) din cuvintele de peste 4 litere
+_SUFFIXES = ('urile', 'uri', 'ele', 'ile', 'ii', 'ie', 'le', 'i', 'e', 'a')
+
+_NOTES_RE = re.compile(r"\([^)]*\)")
+_WORD_RE = re.compile(r"[a-z]+")
+_SPLIT_RE = re.compile(r"[,;\n]+|\s+si\s+")
+
+# Numărul maxim de rețete întoarse de `find_matches`
+MAX_MATCHES = 50
+
+
+def _stem(word):
+    if len(word) > 4:
+        for suffix in _SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                return word[:-len(suffix)]
+    return word
+
+
+def normalize_ingredient(text):
+    """
+    Termenul canonic al unui ingredient sau '' dacă nu rămâne nimic util.
+
+    Ex: "• 500 g Piept de pui (dezosat)" -> "piept pui", "Roșii" -> "ros"
+    """
+    text = strip_diacritics(_NOTES_RE.sub(' ', (text or '').lower()))
+    words = [
+        _stem(word) for word in _WORD_RE.findall(text)
+        if word not in _STOPWORDS and word not in _UNITS
+    ]
+    return ' '.join(dict.fromkeys(words))
+
+
+def ingredient_terms(items):
+    """Termenii distincți (în ordinea apariției), fără condimentele de bază."""
+    terms = {}
+    for item in items or []:
+        term = normalize_ingredient(item)
+        if term and term.split(' ', 1)[0] not in STAPLES:
+            terms[term] = None
+    return list(terms)
+
+
+def parse_user_ingredients(ingredients_text):
+    """Lista de ingrediente introdusă de utilizator ("pui, cartofi și usturoi") -> termeni."""
+    text = strip_diacritics((ingredients_text or '').lower())
+    return ingredient_terms(_SPLIT_RE.split(text))
+
+
+def backfill(cursor):
+    """
+    Indexează rețetele neindexate încă (`ingredient_count IS NULL`); apelat de migrări
+    după ce schema e la zi (vezi `migrations.REINDEX`).
+    """
+    # Rețetele vechi au doar liniile formatate ("• 200 g roșii (coapte)"); normalizarea le curăță
+    rows = cursor.execute('SELECT id, ingredients FROM recipes WHERE ingredient_count IS NULL').fetchall()
+    for recipe_id, ingredients in rows:
+        index_recipe(cursor, recipe_id, (ingredients or '').split('\n'))
+
+
+def _term_id(cursor, term):
+    row = cursor.execute(
+        'INSERT INTO ingredient_terms (term) VALUES (?) ON CONFLICT(term) DO NOTHING RETURNING id', (term,)
+    ).fetchone()
+    if row:
+        cursor.executemany(
+            'INSERT OR IGNORE INTO ingredient_term_words (word, term_id) VALUES (?, ?)',
+            [(word, row[0]) for word in term.split(' ')]
+        )
+        return row[0]
+    return cursor.execute('SELECT id FROM ingredient_terms WHERE term = ?', (term,)).fetchone()[0]
+
+
+def index_recipe(cursor, recipe_id, items):
+    """
+    (Re)indexează ingredientele unei rețete; apelat în aceeași tranzacție cu INSERT-ul rețetei.
+
+    `items` sunt numele ingredientelor (câmpul `item`) sau, ca fallback, liniile afișate.
+    """
+    terms = ingredient_terms(items)
+    cursor.execute('DELETE FROM recipe_ingredient_terms WHERE recipe_id = ?', (recipe_id,))
+    cursor.executemany(
+        'INSERT OR IGNORE INTO recipe_ingredient_terms (term_id, term_count, recipe_id) VALUES (?, ?, ?)',
+        [(_term_id(cursor, term), len(terms), recipe_id) for term in terms]
+    )
+    cursor.execute('UPDATE recipes SET ingredient_count = ? WHERE id = ?', (len(terms), recipe_id))
+
+
+def index_recipe_terms(cursor, recipe_terms, term_ids):
+    """
+    Variantă în lot a `index_recipe` pentru rețete noi (importul bibliotecii, vezi library.py).
+
+    `recipe_terms` sunt perechi (recipe_id, termeni din `ingredient_terms`); `ingredient_count`
+    e scris de apelant odată cu rândul rețetei. `term_ids` (termen -> id) e un dicționar ținut
+    de apelant între loturi, ca fiecare termen să fie căutat în SQLite o singură dată.
+    """
+    postings = []
+    for recipe_id, terms in recipe_terms:
+        for term in terms:
+            term_id = term_ids.get(term)
+            if term_id is None:
+                term_id = term_ids[term] = _term_id(cursor, term)
+            postings.append((term_id, len(terms), recipe_id))
+    cursor.executemany(
+        'INSERT OR IGNORE INTO recipe_ingredient_terms (term_id, term_count, recipe_id) VALUES (?, ?, ?)',
+        postings
+    )
+
+
+def _matching_term_ids(conn, user_terms):
+    """Termenii indexați care conțin toate cuvintele unuia dintre termenii utilizatorului ("pui" -> "piept pui")."""
+    matched = set()
+    for term in user_terms:
+        words = term.split(' ')
+        placeholders = ','.join('?' * len(words))
+        rows = conn.execute(f'''
+            SELECT term_id FROM ingredient_term_words
+            WHERE word IN ({placeholders})
+            GROUP BY term_id HAVING COUNT(*) = ?
+        ''', (*words, len(words))).fetchall()
+        matched.update(row[0] for row in rows)
+    return sorted(matched)
+
+
+def find_matches(conn, ingredients_text, limit=5, min_coverage=0.5):
+    """
+    Rețetele salvate care se pot găti (în mare parte) cu ingredientele date.
+
+    Scoruri per rețetă (R = termenii rețetei, U = termenii utilizatorului, M = termenii acoperiți):
+    - coverage = |M| / |R|: cât din rețetă ai deja (criteriul principal)
+    - jaccard = |M| / |R ∪ U|: similaritatea celor două liste (departajare)
+
+    Returns:
+        listă de dict-uri (id, title, difficulty, coverage, jaccard, matched, total), cele mai bune întâi
+    """
+    user_terms = parse_user_ingredients(ingredients_text)
+    if not user_terms:
+        return []
+    term_ids = _matching_term_ids(conn, user_terms)
+    if not term_ids:
+        return []
+
+    # |M| <= len(term_ids), deci coverage >= min_coverage cere |R| <= len(term_ids) / min_coverage
+    max_terms = int(len(term_ids) / max(min_coverage, 0.01) + 1e-9)
+    placeholders = ','.join('?' * len(term_ids))
+    rows = conn.execute(f'''
+        SELECT r.id, r.title, r.difficulty_rating, hits.covered, hits.term_count, hits.coverage, hits.jaccard
+        FROM (
+            SELECT recipe_id, term_count, COUNT(*) AS covered,
+                   CAST(COUNT(*) AS REAL) / term_count AS coverage,
+                   CAST(COUNT(*) AS REAL) / (term_count + MAX(?, COUNT(*)) - COUNT(*)) AS jaccard
+            FROM recipe_ingredient_terms
+            WHERE term_id IN ({placeholders}) AND term_count <= ?
+            GROUP BY recipe_id
+            HAVING COUNT(*) >= term_count * ? - 1e-9
+            ORDER BY coverage DESC, jaccard DESC, recipe_id DESC
+            LIMIT ?
+        ) AS hits
+        JOIN recipes r ON r.id = hits.recipe_id
+        ORDER BY hits.coverage DESC, hits.jaccard DESC, r.id DESC
+    ''', (len(user_terms), *term_ids, max_terms, min_coverage, min(limit, MAX_MATCHES))).fetchall()
+
+    return [{
+        'id': row[0],
+        'title': row[1],
+        'difficulty': row[2],
+        'matched': row[3],
+        'total': row[4],
+        'coverage': round(row[5], 3),
+        'jaccard': round(row[6], 3),
+    } for row in rows]
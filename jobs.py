@@ -0,0 +1,330 @@
+"""
+jobs.py - Coadă de job-uri pentru generarea rețetelor
+
+POST-ul de generare nu mai așteaptă apelul Gemini: creează un job (tabelul
+`generation_jobs`), întoarce imediat ID-ul, iar un executor limitat rulează
+apelul în fundal. Browserul urmărește statusul prin polling sau SSE.
+
+Starea job-urilor e în SQLite, deci orice worker Gunicorn poate răspunde la
+polling, indiferent care dintre ei execută efectiv job-ul.
+
+`AsyncGenerationJobQueue` (modul ASGI) rulează job-urile ca corutine pe bucla
+de evenimente a serverului în loc de thread-uri.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+
+import db
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+FINISHED_STATUSES = (STATUS_DONE, STATUS_FAILED)
+UNFINISHED_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+
+class GenerationError(Exception):
+    """Eroare afișabilă utilizatorului (mesajul ajunge în UI)."""
+
+
+class QueueFullError(Exception):
+    """Prea multe job-uri în așteptare în acest worker."""
+
+
+class GenerationJobQueue:
+    """
+    Executor limitat + persistență pentru job-urile de generare.
+
+    `runner(job_id, ingredients, user_id, **context)` face munca efectivă și întoarce
+    dict-ul rețetei; poate arunca `GenerationError` cu un mesaj pentru utilizator.
+    `context` sunt argumentele suplimentare date la `submit()` (ex: rezervarea de cotă).
+
+    `settle(job, context, succeeded)` decontează `context` (confirmă sau restituie rezervarea)
+    exact o dată per job, oricum s-ar termina: succes, eroare a runner-ului, eroare înainte
+    ca runner-ul să pornească sau expirare după `job_timeout`. Trecerea într-o stare finală e
+    un UPDATE condiționat de statusul curent, deci doar cine o câștigă decontează (ex: un job
+    expirat din alt worker care se termină totuși mai târziu). Pentru job-urile expirate fără
+    context în acest worker (workerul care le-a primit a fost repornit) `context` e gol, iar
+    `job` are `user_id` și `created_at`.
+    """
+
+    def __init__(self, db_path, runner, max_workers=4, max_pending=32, job_timeout=180, settle=None):
+        self.db_path = db_path
+        self.runner = runner
+        self.settle = settle
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.job_timeout = job_timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._futures = {}  # job_id -> Future, cât timp job-ul rulează în acest worker
+        self._contexts = {}  # job_id -> context, până la decontare
+        self._next_sweep = 0.0
+
+    def _connect(self):
+        return db.get_connection(self.db_path)
+
+    def _get_executor(self):
+        # Creat leneș: sub Gunicorn thread-urile trebuie pornite după fork, în fiecare worker
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='gen-job')
+            return self._executor
+
+    @property
+    def in_flight(self):
+        """Numărul de job-uri acceptate de acest worker și încă neterminate."""
+        return self._pending
+
+    def submit(self, user_id, ingredients, **context):
+        """Înregistrează job-ul și îl programează pe executor. Returnează ID-ul job-ului."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError()
+            self._pending += 1
+
+        job_id = uuid.uuid4().hex
+        job = {'id': job_id, 'user_id': user_id, 'created_at': time.time()}
+        self._contexts[job_id] = context
+        inserted = False
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute('''
+                    INSERT INTO generation_jobs (id, user_id, ingredients, status, created_at)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (job_id, user_id, ingredients, STATUS_QUEUED, job['created_at']))
+            inserted = True
+            future = self._schedule(job_id, ingredients, user_id, context)
+            self._futures[job_id] = future
+            # Rulat imediat dacă job-ul s-a terminat deja
+            future.add_done_callback(lambda _: self._futures.pop(job_id, None))
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            if inserted:
+                self._abandon(job)
+            else:
+                self._settle(job, self._contexts.pop(job_id), False)
+            raise
+        self._sweep_stale()
+        return job_id
+
+    def _schedule(self, job_id, ingredients, user_id, context):
+        """Pornește job-ul și întoarce un `concurrent.futures.Future`."""
+        return self._get_executor().submit(self._run, job_id, ingredients, user_id, context)
+
+    def _run(self, job_id, ingredients, user_id, context):
+        job = {'id': job_id, 'user_id': user_id}
+        try:
+            if not self._start(job):
+                return
+            try:
+                recipe = self.runner(job_id, ingredients, user_id, **context)
+            except GenerationError as e:
+                self._finish(job, STATUS_FAILED, error=str(e))
+                return
+            except Exception:
+                logger.exception("Generation job crashed | job=%s", job_id)
+                self._finish(job, STATUS_FAILED, error=None)
+                return
+            self._finish(job, STATUS_DONE, result_json=json.dumps(recipe, ensure_ascii=False))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _start(self, job):
+        """queued -> running. False dacă job-ul nu trebuie rulat (expirat între timp sau eroare la scriere)."""
+        try:
+            return self._transition(job['id'], (STATUS_QUEUED,), status=STATUS_RUNNING, started_at=time.time())
+        except Exception:
+            logger.exception("Generation job could not start | job=%s", job['id'])
+            self._abandon(job)
+            return False
+
+    def _finish(self, job, status, **fields):
+        """Trece job-ul în starea finală `status` și îl decontează, dacă nu l-a terminat deja altcineva."""
+        if not self._transition(job['id'], UNFINISHED_STATUSES, status=status, finished_at=time.time(), **fields):
+            self._contexts.pop(job['id'], None)
+            return False
+        self._settle(job, self._contexts.pop(job['id'], {}), status == STATUS_DONE)
+        return True
+
+    def _abandon(self, job):
+        """Job eșuat înainte ca runner-ul să-l preia: eșuat și rezervarea restituită."""
+        try:
+            self._finish(job, STATUS_FAILED, error=None)
+        except Exception:
+            # Rândul rămâne neterminat, cu contextul păstrat: îl decontează expirarea (`_sweep_stale`)
+            logger.exception("Generation job could not be marked failed | job=%s", job['id'])
+
+    def _settle(self, job, context, succeeded):
+        if self.settle is None:
+            return
+        try:
+            self.settle(job, context, succeeded)
+        except Exception:
+            logger.exception("Generation job settle failed | job=%s", job['id'])
+
+    def _expire(self, job):
+        """Marchează eșuat un job rămas neterminat după `job_timeout`. True dacă l-a expirat acest apel."""
+        if not self._finish(job, STATUS_FAILED, error=None):
+            return False
+        logger.warning("Generation job expired | job=%s", job['id'])
+        return True
+
+    def _sweep_stale(self):
+        """
+        Expiră job-urile neterminate mai vechi de `job_timeout` (cel mult o dată la `job_timeout`
+        secunde per worker), ca rezervările lor să fie restituite și dacă nimeni nu mai cere job-ul.
+        """
+        now = time.time()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.job_timeout
+        try:
+            rows = self._connect().execute(f'''
+                SELECT id, user_id, created_at FROM generation_jobs
+                WHERE created_at < ? AND status IN ({', '.join('?' for _ in UNFINISHED_STATUSES)})
+            ''', (now - self.job_timeout, *UNFINISHED_STATUSES)).fetchall()
+            for job_id, user_id, created_at in rows:
+                self._expire({'id': job_id, 'user_id': user_id, 'created_at': created_at})
+        except Exception:
+            logger.exception("Generation job sweep failed")
+
+    def _transition(self, job_id, statuses, **fields):
+        """UPDATE condiționat de statusul curent (unul din `statuses`). True dacă job-ul a trecut în noua stare."""
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        placeholders = ', '.join('?' for _ in statuses)
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(f'UPDATE generation_jobs SET {columns} WHERE id = ? AND status IN ({placeholders})',
+                                  (*fields.values(), job_id, *statuses))
+        return cursor.rowcount == 1
+
+    def _update(self, job_id, **fields):
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        conn = self._connect()
+        with conn:
+            conn.execute(f'UPDATE generation_jobs SET {columns} WHERE id = ?', (*fields.values(), job_id))
+
+    def as_completed(self, job_ids, timeout=None):
+        """
+        Generează ID-urile job-urilor pe măsură ce se termină (doar job-urile trimise din acest
+        worker; cele deja terminate vin primele). La `timeout` se oprește fără să arunce.
+        """
+        futures = {}
+        for job_id in job_ids:
+            future = self._futures.get(job_id)
+            if future is None:
+                yield job_id
+            else:
+                futures[future] = job_id
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                yield futures[future]
+        except FuturesTimeoutError:
+            return
+
+    def update_partial(self, job_id, partial):
+        """Salvează rețeta parțială (streaming) ca să fie vizibilă din orice worker."""
+        self._update(job_id, partial_json=json.dumps(partial, ensure_ascii=False))
+
+    def get(self, job_id):
+        """
+        Returnează job-ul ca dict (cu `result` deserializat) sau None.
+
+        Job-urile rămase blocate (ex: workerul a fost repornit în timpul apelului)
+        sunt marcate eșuate după `job_timeout` secunde, iar rezervarea lor e restituită.
+        """
+        job = self._load(job_id)
+        if job and job['status'] in UNFINISHED_STATUSES and time.time() - job['created_at'] > self.job_timeout:
+            # Dacă între timp l-a terminat (sau expirat) altcineva, se citește starea finală
+            if self._expire(job):
+                job.update(status=STATUS_FAILED, error=None)
+            else:
+                job = self._load(job_id)
+        return job
+
+    def _load(self, job_id):
+        row = self._connect().execute('''
+            SELECT id, user_id, ingredients, status, result_json, error, created_at, started_at, finished_at,
+                   partial_json
+            FROM generation_jobs WHERE id = ?
+        ''', (job_id,)).fetchone()
+        if not row:
+            return None
+
+        return {
+            'id': row[0],
+            'user_id': row[1],
+            'ingredients': row[2],
+            'status': row[3],
+            'result': json.loads(row[4]) if row[4] else None,
+            'error': row[5],
+            'created_at': row[6],
+            'started_at': row[7],
+            'finished_at': row[8],
+            'partial': json.loads(row[9]) if row[9] else None,
+        }
+
+    def shutdown(self, wait=False):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+class AsyncGenerationJobQueue(GenerationJobQueue):
+    """
+    Aceeași coadă, cu job-urile rulate ca corutine pe bucla `loop` a serverului ASGI.
+
+    `runner` e o funcție async. Un job care așteaptă Gemini nu ține un thread, deci
+    `max_workers` (job-uri rulate simultan, limitate cu un semafor) poate fi de ordinul
+    sutelor. `submit()` se apelează din thread-urile WSGI; scrierile în SQLite ale
+    job-ului rulează în thread-uri (`asyncio.to_thread`), ca bucla să nu se blocheze.
+    """
+
+    def __init__(self, db_path, runner, loop, max_workers=256, max_pending=1024, job_timeout=180, settle=None):
+        super().__init__(db_path, runner, max_workers=max_workers, max_pending=max_pending, job_timeout=job_timeout,
+                         settle=settle)
+        self.loop = loop
+        self._semaphore = None
+
+    def _schedule(self, job_id, ingredients, user_id, context):
+        return asyncio.run_coroutine_threadsafe(self._run_async(job_id, ingredients, user_id, context), self.loop)
+
+    async def _run_async(self, job_id, ingredients, user_id, context):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        try:
+            async with self._semaphore:
+                job = {'id': job_id, 'user_id': user_id}
+                if not await asyncio.to_thread(self._start, job):
+                    return
+                try:
+                    recipe = await self.runner(job_id, ingredients, user_id, **context)
+                except GenerationError as e:
+                    await asyncio.to_thread(self._finish, job, STATUS_FAILED, error=str(e))
+                    return
+                except Exception:
+                    logger.exception("Generation job crashed | job=%s", job_id)
+                    await asyncio.to_thread(self._finish, job, STATUS_FAILED, error=None)
+                    return
+                await asyncio.to_thread(self._finish, job, STATUS_DONE,
+                                        result_json=json.dumps(recipe, ensure_ascii=False))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self, wait=False):
+        pass
@@ -0,0 +1,283 @@
+"""
+library.py - Exportul și importul bibliotecii de rețete (backup, mutare între instanțe)
+
+Formatul e text, câte un obiect JSON pe linie (opțional gzip):
+- prima linie e antetul: {"format": "recipe-library", "version": 1, "layout": ..., ...}
+- `ndjson`: câte o rețetă pe linie (aceleași câmpuri ca JSON-ul trimis la `/save_recipe`,
+  plus `created_at`, `updated_at`, emailul proprietarului și amprentele de similaritate)
+- `columnar`: loturi de `COLUMNAR_BATCH` rețete, câte o listă per câmp; comprimat,
+  e mai mic decât `ndjson` (numele câmpurilor nu se repetă pe fiecare rând)
+
+Exportul parcurge `recipes`, `recipe_ingredients` și `recipe_steps` cu trei cursoare
+ordonate după id, în pas (merge join), într-o singură tranzacție de citire: memoria
+rămâne constantă indiferent de numărul rețetelor, iar ieșirea e emisă în bucăți.
+
+Importul adaugă rețetele (id-uri noi) într-o singură tranzacție, în loturi de
+`IMPORT_BATCH` cu `executemany` per tabel (vezi `recipe_store.insert_recipes`);
+indexul full-text se completează o dată, la final, în loc de un trigger per rând.
+"""
+import base64
+import gzip
+import io
+import itertools
+import json
+import logging
+import time
+import zlib
+
+import near_duplicates
+import recipe_store
+import search
+
+logger = logging.getLogger(__name__)
+
+FORMAT_NAME = 'recipe-library'
+FORMAT_VERSION = 1
+LAYOUTS = ('ndjson', 'columnar')
+COLUMNAR_BATCH = 1000
+IMPORT_BATCH = 5000
+# Dimensiunea bucăților emise de `export_chunks` (înainte de compresie)
+CHUNK_BYTES = 64 * 1024
+
+FIELDS = (
+    'title', 'ingredients', 'instructions', 'difficulty', 'wine_pairing',
+    'servings', 'prep_time_minutes', 'cook_time_minutes', 'created_at', 'updated_at',
+    'user_email', 'ingredient_details', 'steps', 'fingerprints',
+)
+
+
+class LibraryFormatError(ValueError):
+    """Fișierul de import nu e un export al bibliotecii (sau e dintr-o versiune necunoscută)."""
+
+
+class _ChildRows:
+    """Rândurile unui tabel copil (ordonate după recipe_id), livrate per rețetă în pas cu cursorul rețetelor."""
+
+    def __init__(self, rows):
+        self._groups = itertools.groupby(rows, key=lambda row: row[0])
+        self._current = next(self._groups, None)
+
+    def take(self, recipe_id):
+        while self._current is not None and self._current[0] < recipe_id:
+            self._current = next(self._groups, None)
+        if self._current is None or self._current[0] != recipe_id:
+            return []
+        rows = list(self._current[1])
+        self._current = next(self._groups, None)
+        return rows
+
+
+def _b64(blob):
+    return base64.b64encode(blob).decode('ascii') if blob else None
+
+
+def iter_recipes(conn):
+    """Rețetele ca dict-uri de export, în ordinea id-urilor; apelantul ține tranzacția de citire deschisă."""
+    recipes = conn.execute('''
+        SELECT r.id, r.title, r.difficulty_rating, r.wine_pairing, r.servings, r.prep_time_minutes,
+               r.cook_time_minutes, r.created_at, r.updated_at, u.email, f.signature, f.ingredients_signature
+        FROM recipes r
+        LEFT JOIN users u ON u.id = r.user_id
+        LEFT JOIN recipe_fingerprints f ON f.recipe_id = r.id
+        ORDER BY r.id
+    ''')
+    ingredients = _ChildRows(conn.execute(
+        'SELECT recipe_id, item, quantity, unit, notes, display FROM recipe_ingredients ORDER BY recipe_id, position'
+    ))
+    steps = _ChildRows(conn.execute(
+        'SELECT recipe_id, text, time_minutes, temperature_c, display FROM recipe_steps ORDER BY recipe_id, position'
+    ))
+    for row in recipes:
+        recipe_ingredients = ingredients.take(row[0])
+        recipe_steps = steps.take(row[0])
+        yield {
+            'title': row[1],
+            'ingredients': [ingredient[5] for ingredient in recipe_ingredients],
+            'instructions': [step[4] for step in recipe_steps],
+            'difficulty': row[2],
+            'wine_pairing': row[3],
+            'servings': row[4],
+            'prep_time_minutes': row[5],
+            'cook_time_minutes': row[6],
+            'created_at': row[7],
+            'updated_at': row[8] or row[7],
+            'user_email': row[9],
+            'ingredient_details': [
+                {'item': ingredient[1], 'quantity': ingredient[2], 'unit': ingredient[3], 'notes': ingredient[4]}
+                for ingredient in recipe_ingredients
+            ],
+            'steps': [
+                {'text': step[1], 'time_minutes': step[2], 'temperature_c': step[3]}
+                for step in recipe_steps
+            ],
+            'fingerprints': [_b64(row[10]), _b64(row[11])],
+        }
+
+
+def _export_objects(conn, layout):
+    yield {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'layout': layout,
+        'fingerprint_version': near_duplicates.FINGERPRINT_VERSION,
+        'exported_at': time.time(),
+    }
+    records = iter_recipes(conn)
+    if layout == 'ndjson':
+        yield from records
+        return
+    while True:
+        batch = list(itertools.islice(records, COLUMNAR_BATCH))
+        if not batch:
+            return
+        yield {'count': len(batch), **{field: [record[field] for record in batch] for field in FIELDS}}
+
+
+def export_chunks(conn, layout='ndjson', compress=False):
+    """
+    Exportul ca bucăți de bytes (pentru un fișier sau un răspuns HTTP în streaming).
+
+    Deschide o tranzacție de citire pe `conn` (instantaneu consistent al celor trei tabele
+    sub WAL) și o închide la final; conexiunea nu trebuie folosită în paralel.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f'layout necunoscut: {layout}')
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits=31: antet gzip
+    conn.execute('BEGIN')
+    try:
+        buffer, size = [], 0
+        for obj in _export_objects(conn, layout):
+            line = (json.dumps(obj, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+            buffer.append(line)
+            size += len(line)
+            if size >= CHUNK_BYTES:
+                data = b''.join(buffer)
+                buffer, size = [], 0
+                data = compressor.compress(data) if compressor else data
+                if data:
+                    yield data
+        data = b''.join(buffer)
+        if compressor:
+            data = compressor.compress(data) + compressor.flush()
+        if data:
+            yield data
+    finally:
+        conn.rollback()
+
+
+def open_text(raw):
+    """Fișier binar (sau `request.stream`) -> text, cu gzip detectat după primii octeți."""
+    buffered = raw if hasattr(raw, 'peek') else io.BufferedReader(raw)
+    if buffered.peek(2)[:2] == b'\x1f\x8b':
+        buffered = gzip.GzipFile(fileobj=buffered)
+    return io.TextIOWrapper(buffered, encoding='utf-8')
+
+
+def _checked_lines(lines):
+    """Liniile nevide; erorile de decodare (gzip trunchiat, UTF-8 invalid) devin LibraryFormatError."""
+    try:
+        for line in lines:
+            if line.strip():
+                yield line
+    except (OSError, EOFError, zlib.error, UnicodeDecodeError) as e:
+        raise LibraryFormatError(f'fișier corupt sau trunchiat: {e}') from None
+
+
+def read_export(lines):
+    """
+    Citește antetul și întoarce (antet, iterator de rețete); rețetele sunt citite leneș din `lines`.
+
+    Raises:
+        LibraryFormatError: antet lipsă, alt format, o versiune necunoscută sau fișier corupt
+            (și la citirea leneșă a rețetelor)
+    """
+    lines = _checked_lines(lines)
+    try:
+        header = json.loads(next(lines))
+    except LibraryFormatError:
+        raise
+    except (StopIteration, ValueError):
+        raise LibraryFormatError('fișierul nu începe cu antetul exportului') from None
+    if not isinstance(header, dict) or header.get('format') != FORMAT_NAME:
+        raise LibraryFormatError('nu este un export al bibliotecii de rețete')
+    if header.get('version') != FORMAT_VERSION or header.get('layout') not in LAYOUTS:
+        raise LibraryFormatError(f"versiune sau layout nesuportat: {header.get('version')}/{header.get('layout')}")
+
+    def records():
+        for number, line in enumerate(lines, start=2):
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                raise LibraryFormatError(f'linia {number}: JSON invalid') from None
+            if header['layout'] == 'ndjson':
+                yield obj
+            else:
+                columns = [obj.get(field) or [None] * obj['count'] for field in FIELDS]
+                for values in zip(*columns):
+                    yield dict(zip(FIELDS, values))
+
+    return header, records()
+
+
+def _unb64(value):
+    return base64.b64decode(value) if value else None
+
+
+def import_recipes(conn, header, records, batch_size=IMPORT_BATCH):
+    """
+    Adaugă rețetele exportate în baza de date, într-o singură tranzacție (totul sau nimic).
+
+    Proprietarii sunt regăsiți după email (rețetele fără cont corespunzător rămân fără
+    proprietar). Amprentele de similaritate se refolosesc dacă exportul are aceeași versiune.
+
+    Returns:
+        dict: imported (număr de rețete), first_id, seconds
+    """
+    started = time.perf_counter()
+    reuse_fingerprints = header.get('fingerprint_version') == near_duplicates.FINGERPRINT_VERSION
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        cursor = conn.cursor()
+        fts = search.is_available(cursor)
+        if fts:
+            search.suspend_insert_sync(cursor)
+        # Id-uri explicite, după cel mai mare folosit vreodată (AUTOINCREMENT nu refolosește id-urile șterse)
+        first_id = cursor.execute('''
+            SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'recipes'), 0),
+                       COALESCE((SELECT MAX(id) FROM recipes), 0)) + 1
+        ''').fetchone()[0]
+        next_id, term_ids, user_ids = first_id, {}, {}
+        while True:
+            batch = list(itertools.islice(records, batch_size))
+            if not batch:
+                break
+            recipes = []
+            emails = {record.get('user_email') for record in batch} - user_ids.keys() - {None}
+            if emails:
+                user_ids.update(dict.fromkeys(emails))
+                placeholders = ','.join('?' * len(emails))
+                user_ids.update(cursor.execute(
+                    f'SELECT email, id FROM users WHERE email IN ({placeholders})', tuple(emails)
+                ).fetchall())
+            for number, record in enumerate(batch, start=next_id - first_id + 1):
+                if not isinstance(record, dict) or not record.get('title') or record.get('difficulty') is None:
+                    raise LibraryFormatError(f'rețeta {number}: lipsește titlul sau dificultatea')
+                fingerprints = record.get('fingerprints') if reuse_fingerprints else None
+                recipes.append(dict(
+                    record,
+                    ingredients=record.get('ingredients') or [],
+                    instructions=record.get('instructions') or [],
+                    user_id=user_ids.get(record.get('user_email')),
+                    fingerprints=tuple(map(_unb64, fingerprints)) if fingerprints else None,
+                ))
+            next_id = recipe_store.insert_recipes(cursor, recipes, next_id, term_ids)
+        if fts:
+            search.resume_insert_sync(cursor, first_id)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    imported = next_id - first_id
+    elapsed = time.perf_counter() - started
+    logger.info("Library imported | recipes=%s first_id=%s seconds=%.2f", imported, first_id, elapsed)
+    return {'imported': imported, 'first_id': first_id, 'seconds': round(elapsed, 3)}
@@ -0,0 +1,234 @@
+"""
+metrics.py - Metrici de performanță în format text Prometheus, agregate între workeri
+
+Fiecare proces (worker Gunicorn) ține contoarele, gauge-urile și histogramele în
+memorie și le scrie periodic (`flush_interval`) într-un fișier propriu din
+`directory` (`metrics-<pid>.json`, scriere atomică). `/metrics` citește toate
+fișierele și adună valorile:
+- counter / histogram: suma tuturor workerilor, inclusiv a celor opriți (totalurile rămân monotone)
+- gauge: suma workerilor încă în viață (ex: generările în curs)
+
+Valorile care există deja ca stare în alte componente (hit-uri în cache, tokeni
+Gemini, job-uri în curs) se citesc la flush prin colectori (`add_collector`),
+fără cod de instrumentare pe calea request-ului.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricsRegistry:
+    """
+    Registrul metricilor unui proces.
+
+    Metricile se declară o dată (`counter`, `gauge`, `histogram`) cu numele etichetelor;
+    valorile etichetelor se dau ca tuplu, în aceeași ordine. Fără `directory` expune
+    doar procesul curent.
+    """
+
+    def __init__(self, directory=None, flush_interval=5.0, enabled=True):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self._definitions = {}
+        self._values = {}
+        self._histograms = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        if enabled and directory:
+            os.makedirs(directory, exist_ok=True)
+
+    # ==================== DECLARARE ====================
+    def _define(self, name, kind, documentation, labels, buckets=None):
+        self._definitions[name] = {
+            'type': kind,
+            'help': documentation,
+            'labels': tuple(labels),
+            'buckets': tuple(buckets) if buckets else None,
+        }
+
+    def counter(self, name, documentation, labels=()):
+        self._define(name, COUNTER, documentation, labels)
+
+    def gauge(self, name, documentation, labels=()):
+        self._define(name, GAUGE, documentation, labels)
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self._define(name, HISTOGRAM, documentation, labels, sorted(buckets))
+
+    def add_collector(self, collector):
+        """`collector()` întoarce (nume, etichete, valoare) pentru counter-e/gauge-uri ținute în altă parte."""
+        self._collectors.append(collector)
+
+    # ==================== ÎNREGISTRARE ====================
+    def inc(self, name, labels=(), value=1):
+        if not self.enabled:
+            return
+        key = (name, tuple(map(str, labels)))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, name, value, labels=()):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._values[(name, tuple(map(str, labels)))] = value
+
+    def observe(self, name, value, labels=()):
+        if not self.enabled:
+            return
+        buckets = self._definitions[name]['buckets']
+        key = (name, tuple(map(str, labels)))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            index = len(buckets)
+            for position, bound in enumerate(buckets):
+                if value <= bound:
+                    index = position
+                    break
+            histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    # ==================== AGREGARE ÎNTRE PROCESE ====================
+    def _run_collectors(self):
+        for collector in self._collectors:
+            try:
+                for name, labels, value in collector():
+                    self.set(name, value, labels)
+            except Exception:
+                logger.exception("Metrics collector failed | collector=%s", getattr(collector, '__name__', collector))
+
+    def snapshot(self):
+        """Starea procesului curent (după colectori), serializabilă JSON."""
+        self._run_collectors()
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'values': [[name, list(labels), value] for (name, labels), value in self._values.items()],
+                'histograms': [[name, list(labels), list(h[0]), h[1], h[2]] for (name, labels), h in self._histograms.items()],
+            }
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f'metrics-{pid}.json')
+
+    def flush(self):
+        """Scrie starea procesului în fișierul lui (atomic: fișier temporar + rename)."""
+        if not (self.enabled and self.directory):
+            return
+        self._last_flush = time.monotonic()
+        path = self._path(os.getpid())
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as handle:
+                json.dump(self.snapshot(), handle)
+            os.replace(temp_path, path)
+        except OSError:
+            logger.exception("Metrics flush failed | path=%s", path)
+
+    def maybe_flush(self):
+        """Flush doar dacă a trecut `flush_interval` de la ultimul (apelat după fiecare request)."""
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _snapshots(self):
+        if not self.directory:
+            return [self.snapshot()]
+        self.flush()
+        snapshots = []
+        for filename in os.listdir(self.directory):
+            if not (filename.startswith('metrics-') and filename.endswith('.json')):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename), encoding='utf-8') as handle:
+                    snapshots.append(json.load(handle))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def collect(self):
+        """Valorile agregate: ({(nume, etichete): valoare}, {(nume, etichete): [buckets, sum, count]})."""
+        values, histograms = {}, {}
+        for snapshot in self._snapshots():
+            alive = snapshot['pid'] == os.getpid() or _pid_alive(snapshot['pid'])
+            for name, labels, value in snapshot['values']:
+                definition = self._definitions.get(name)
+                if definition is None or (definition['type'] == GAUGE and not alive):
+                    continue
+                key = (name, tuple(labels))
+                values[key] = values.get(key, 0) + value
+            for name, labels, buckets, total, count in snapshot['histograms']:
+                definition = self._definitions.get(name)
+                if definition is None or len(buckets) != len(definition['buckets']) + 1:
+                    continue
+                key = (name, tuple(labels))
+                merged = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+                merged[1] += total
+                merged[2] += count
+        return values, histograms
+
+    def render(self):
+        """Textul pentru `/metrics` (Prometheus text format 0.0.4)."""
+        values, histograms = self.collect()
+        lines = []
+        for name, definition in self._definitions.items():
+            lines.append(f"# HELP {name} {definition['help']}")
+            lines.append(f"# TYPE {name} {definition['type']}")
+            label_names = definition['labels']
+            if definition['type'] == HISTOGRAM:
+                for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, bucket_count in zip(definition['buckets'] + (float('inf'),), buckets):
+                        cumulative += bucket_count
+                        le = f'le="{_format_value(bound) if bound == float("inf") else repr(float(bound))}"'
+                        lines.append(f"{name}_bucket{_format_labels(label_names, labels, le)} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(label_names, labels)} {_format_value(total)}")
+                    lines.append(f"{name}_count{_format_labels(label_names, labels)} {count}")
+            else:
+                for (metric, labels), value in sorted(values.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(label_names, labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
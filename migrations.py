@@ -0,0 +1,476 @@
+"""
+migrations.py - Migrări versionate ale schemei SQLite
+
+Versiunea schemei e ținută în `PRAGMA user_version`. La pornire `migrate()`
+aplică, în ordine, migrările cu versiune mai mare decât cea din baza de date,
+fiecare într-o tranzacție `BEGIN IMMEDIATE` (workerii Gunicorn care pornesc în
+paralel se așteaptă unul pe altul, iar al doilea găsește schema deja la zi).
+
+Sub Gunicorn migrările rulează o singură dată, în master, înaintea fork-ului
+(`gunicorn.conf.py`); manual: `python migrations.py [recipes.db]`.
+
+O migrare nouă se adaugă la finalul listei `MIGRATIONS`; migrările existente
+nu se modifică după ce au ajuns în producție. De aceea migrările nu folosesc
+codul modulelor aplicației: DDL-ul și parsarea textului pentru backfill sunt
+copiate aici așa cum erau la momentul migrării, iar o schimbare ulterioară vine
+ca migrare nouă.
+
+Excepție: indexurile derivate din textul rețetelor (termenii de ingrediente,
+amprentele MinHash) trebuie construite cu același cod care le citește. O migrare
+doar le cere (`_request_reindex`); `migrate()` le construiește după ultima
+migrare, pe schema la zi, cu funcțiile din `REINDEX`.
+"""
+import argparse
+import logging
+import re
+import sqlite3
+import sys
+import unicodedata
+
+import db
+import ingredient_index
+import near_duplicates
+import search
+
+logger = logging.getLogger(__name__)
+
+# Câte rețete se completează per lot în migrările cu backfill
+BACKFILL_BATCH = 500
+
+# Indexurile derivate, construite cu codul curent pentru rețetele neindexate încă
+REINDEX = {
+    'ingredient_terms': ingredient_index.backfill,
+    'fingerprints': near_duplicates.backfill,
+}
+
+
+def _add_column_if_missing(cursor, table, column, declaration):
+    """ALTER TABLE ADD COLUMN doar dacă coloana nu există (bazele create de versiuni mai vechi)."""
+    columns = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+    if column not in columns:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
+
+
+def _request_reindex(cursor, name):
+    """Cere construirea indexului derivat `name` (din `REINDEX`) după ultima migrare."""
+    cursor.execute('CREATE TABLE IF NOT EXISTS schema_reindex (name TEXT PRIMARY KEY) WITHOUT ROWID')
+    cursor.execute('INSERT OR IGNORE INTO schema_reindex (name) VALUES (?)', (name,))
+
+
+def _strip_diacritics(text):
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def _initial_schema(cursor):
+    """
+    Schema de dinainte de migrări (creată până acum de `init_db()`).
+
+    Totul e idempotent: bazele existente (user_version = 0) au deja o parte din tabele.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recipes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            ingredients TEXT NOT NULL,
+            instructions TEXT NOT NULL,
+            difficulty_rating INTEGER NOT NULL,
+            wine_pairing TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Coloane pentru galerie: preview (primele 3 ingrediente) și titlul normalizat pentru filtrare,
+    # ca lista să nu mai citească textul complet al ingredientelor
+    _add_column_if_missing(cursor, 'recipes', 'ingredients_preview', 'TEXT')
+    _add_column_if_missing(cursor, 'recipes', 'title_norm', 'TEXT')
+    rows = cursor.execute('SELECT id, title, ingredients FROM recipes WHERE ingredients_preview IS NULL OR title_norm IS NULL').fetchall()
+    cursor.executemany(
+        'UPDATE recipes SET ingredients_preview = ?, title_norm = ? WHERE id = ?',
+        [('\n'.join(row[2].split('\n')[:3]), _strip_diacritics((row[1] or '').lower()), row[0]) for row in rows]
+    )
+    # Paginare keyset pe (created_at, id), cu și fără filtrul de dificultate
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_recipes_created ON recipes(created_at DESC, id DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_recipes_difficulty_created ON recipes(difficulty_rating, created_at DESC, id DESC)')
+    _recipes_fts(cursor)
+    _ingredient_terms(cursor)
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT NOT NULL UNIQUE,
+            password_hash TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS usage_limits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            day DATE NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            UNIQUE(user_id, day)
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS generation_cache (
+            key TEXT PRIMARY KEY,
+            canonical TEXT NOT NULL,
+            recipe_json TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_generation_cache_expires ON generation_cache(expires_at)')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS generation_jobs (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            ingredients TEXT NOT NULL,
+            status TEXT NOT NULL,
+            result_json TEXT,
+            partial_json TEXT,
+            error TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_generation_jobs_user ON generation_jobs(user_id, created_at)')
+    _add_column_if_missing(cursor, 'generation_jobs', 'partial_json', 'TEXT')
+
+
+def _recipes_fts(cursor):
+    """
+    Indexul full-text `recipes_fts` (external content peste `recipes`, sincronizat prin triggere,
+    ranking BM25 cu ponderile title=10, ingredients=4, instructions=1, wine_pairing=1).
+    Pe un SQLite fără FTS5 se sare peste (căutarea revine la filtrul pe titlu).
+    """
+    existed = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recipes_fts'"
+    ).fetchone() is not None
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5(
+                title, ingredients, instructions, wine_pairing,
+                content='recipes', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS recipes_fts_insert AFTER INSERT ON recipes BEGIN
+                INSERT INTO recipes_fts(rowid, title, ingredients, instructions, wine_pairing)
+                VALUES (new.id, new.title, new.ingredients, new.instructions, new.wine_pairing);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS recipes_fts_delete AFTER DELETE ON recipes BEGIN
+                INSERT INTO recipes_fts(recipes_fts, rowid, title, ingredients, instructions, wine_pairing)
+                VALUES ('delete', old.id, old.title, old.ingredients, old.instructions, old.wine_pairing);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS recipes_fts_update AFTER UPDATE OF title, ingredients, instructions, wine_pairing ON recipes BEGIN
+                INSERT INTO recipes_fts(recipes_fts, rowid, title, ingredients, instructions, wine_pairing)
+                VALUES ('delete', old.id, old.title, old.ingredients, old.instructions, old.wine_pairing);
+                INSERT INTO recipes_fts(rowid, title, ingredients, instructions, wine_pairing)
+                VALUES (new.id, new.title, new.ingredients, new.instructions, new.wine_pairing);
+            END
+        ''')
+    except sqlite3.OperationalError:
+        logger.warning("FTS5 indisponibil - căutarea full-text este dezactivată")
+        return
+    if not existed:
+        cursor.execute("INSERT INTO recipes_fts(recipes_fts, rank) VALUES ('rank', 'bm25(10.0, 4.0, 1.0, 1.0)')")
+        cursor.execute("INSERT INTO recipes_fts(recipes_fts) VALUES ('rebuild')")
+
+
+def _ingredient_terms(cursor):
+    """Tabelele indexului inversat de ingrediente (vezi ingredient_index.py); termenii vin din `REINDEX`."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ingredient_terms (
+            id INTEGER PRIMARY KEY,
+            term TEXT NOT NULL UNIQUE
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ingredient_term_words (
+            word TEXT NOT NULL,
+            term_id INTEGER NOT NULL,
+            PRIMARY KEY (word, term_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recipe_ingredient_terms (
+            term_id INTEGER NOT NULL,
+            term_count INTEGER NOT NULL,
+            recipe_id INTEGER NOT NULL,
+            PRIMARY KEY (term_id, term_count, recipe_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_recipe_ingredient_terms_recipe ON recipe_ingredient_terms(recipe_id)')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS recipes_ingredient_terms_delete AFTER DELETE ON recipes BEGIN
+            DELETE FROM recipe_ingredient_terms WHERE recipe_id = old.id;
+        END
+    ''')
+    _add_column_if_missing(cursor, 'recipes', 'ingredient_count', 'INTEGER')
+    _request_reindex(cursor, 'ingredient_terms')
+
+
+# Parsarea liniilor afișate pentru backfill-ul din migrarea 2: "• 200 g roșii", "Coace (~30 min | 200°C)"
+_BULLET_RE = re.compile(r"^[•\-\*]\s*")
+_STEP_EXTRAS_RE = re.compile(
+    r"\s*\((?:~(?P<time>\d+(?:\.\d+)?) min)?(?: \| )?(?:(?P<temp>\d+(?:\.\d+)?)°C)?\)\s*$"
+)
+
+
+def _number(value):
+    if value is None:
+        return None
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+
+def _step_row(position, line):
+    """Pas afișat -> (position, text, minute, °C, display)."""
+    match = _STEP_EXTRAS_RE.search(line)
+    if not match or not (match.group('time') or match.group('temp')):
+        return position, line.strip(), None, None, line
+    return position, line[:match.start()].strip(), _number(match.group('time')), _number(match.group('temp')), line
+
+
+def _structured_recipes(cursor):
+    """
+    Ingrediente și pași în tabele proprii (cu cantități, durate și temperaturi numerice),
+    porții/timpi și proprietarul rețetei în `recipes`; backfill din textul existent.
+    """
+    _add_column_if_missing(cursor, 'recipes', 'user_id', 'INTEGER REFERENCES users(id)')
+    _add_column_if_missing(cursor, 'recipes', 'servings', 'INTEGER')
+    _add_column_if_missing(cursor, 'recipes', 'prep_time_minutes', 'INTEGER')
+    _add_column_if_missing(cursor, 'recipes', 'cook_time_minutes', 'INTEGER')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_recipes_user_created ON recipes(user_id, created_at DESC, id DESC)')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recipe_ingredients (
+            recipe_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            item TEXT NOT NULL,
+            quantity REAL,
+            unit TEXT,
+            notes TEXT,
+            display TEXT NOT NULL,
+            PRIMARY KEY (recipe_id, position)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recipe_steps (
+            recipe_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            time_minutes REAL,
+            temperature_c REAL,
+            display TEXT NOT NULL,
+            PRIMARY KEY (recipe_id, position)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS recipes_structure_delete AFTER DELETE ON recipes BEGIN
+            DELETE FROM recipe_ingredients WHERE recipe_id = old.id;
+            DELETE FROM recipe_steps WHERE recipe_id = old.id;
+        END
+    ''')
+
+    # Backfill: rețetele vechi au doar liniile afișate; duratele/temperaturile se recuperează
+    # din sufixul pașilor ("(~30 min | 200°C)")
+    last_id = 0
+    while True:
+        rows = cursor.execute(
+            'SELECT id, ingredients, instructions FROM recipes WHERE id > ? ORDER BY id LIMIT ?',
+            (last_id, BACKFILL_BATCH)
+        ).fetchall()
+        if not rows:
+            break
+        ingredient_rows, step_rows = [], []
+        for recipe_id, ingredients, instructions in rows:
+            ingredient_rows.extend(
+                (recipe_id, position, _BULLET_RE.sub('', line).strip(), None, None, None, line)
+                for position, line in enumerate((ingredients or '').split('\n'))
+            )
+            step_rows.extend(
+                (recipe_id, *_step_row(position, line))
+                for position, line in enumerate((instructions or '').split('\n'))
+            )
+        cursor.executemany(
+            'INSERT OR REPLACE INTO recipe_ingredients (recipe_id, position, item, quantity, unit, notes, display) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            ingredient_rows
+        )
+        cursor.executemany(
+            'INSERT OR REPLACE INTO recipe_steps (recipe_id, position, text, time_minutes, temperature_c, display) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            step_rows
+        )
+        last_id = rows[-1][0]
+
+
+def _cache_versions(cursor):
+    """
+    Versiuni pentru ETag-uri și cache-ul de fragmente (vezi page_cache.py): `updated_at`
+    per rețetă și versiunea galeriei, incrementată de trigger-e la orice modificare în `recipes`.
+    """
+    # ADD COLUMN nu acceptă DEFAULT CURRENT_TIMESTAMP; rețetele existente primesc created_at
+    _add_column_if_missing(cursor, 'recipes', 'updated_at', 'TIMESTAMP')
+    cursor.execute('UPDATE recipes SET updated_at = created_at WHERE updated_at IS NULL')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS cache_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO cache_versions (name, version) VALUES ('gallery', 0)")
+    for event in ('INSERT', 'DELETE', 'UPDATE'):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS recipes_gallery_version_{event.lower()} AFTER {event} ON recipes BEGIN
+                UPDATE cache_versions SET version = version + 1 WHERE name = 'gallery';
+            END
+        ''')
+
+
+def _login_attempts(cursor):
+    """Încercările de autentificare pentru limitarea pe fereastră glisantă (vezi auth.py)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS login_attempts (
+            key TEXT NOT NULL,
+            attempted_at REAL NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_login_attempts_key ON login_attempts(key, attempted_at)')
+
+
+def _recipe_fingerprints(cursor):
+    """
+    Amprente MinHash și bucket-uri LSH pentru rețetele aproape identice (vezi near_duplicates.py);
+    amprentele rețetelor existente vin din `REINDEX`.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recipe_fingerprints (
+            recipe_id INTEGER PRIMARY KEY,
+            signature BLOB,
+            ingredients_signature BLOB
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS recipe_lsh_buckets (
+            kind INTEGER NOT NULL,
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            recipe_id INTEGER NOT NULL,
+            PRIMARY KEY (kind, band, bucket, recipe_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_recipe_lsh_buckets_recipe ON recipe_lsh_buckets(recipe_id)')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS recipes_fingerprints_delete AFTER DELETE ON recipes BEGIN
+            DELETE FROM recipe_fingerprints WHERE recipe_id = old.id;
+            DELETE FROM recipe_lsh_buckets WHERE recipe_id = old.id;
+        END
+    ''')
+    _request_reindex(cursor, 'fingerprints')
+
+
+def _generation_jobs_created(cursor):
+    """Index pe `generation_jobs.created_at` pentru combinațiile populare (vezi warmup.py)."""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_generation_jobs_created ON generation_jobs(created_at)')
+
+
+MIGRATIONS = [
+    (1, 'schema inițială', _initial_schema),
+    (2, 'rețete structurate (recipe_ingredients, recipe_steps, user_id)', _structured_recipes),
+    (3, 'versiuni pentru cache (recipes.updated_at, cache_versions)', _cache_versions),
+    (4, 'limitarea încercărilor de autentificare (login_attempts)', _login_attempts),
+    (5, 'amprente pentru rețete aproape identice (recipe_fingerprints, recipe_lsh_buckets)', _recipe_fingerprints),
+    (6, 'index pe generation_jobs.created_at (warm-up)', _generation_jobs_created),
+]
+
+
+def current_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Aduce schema la ultima versiune.
+
+    Returns:
+        int: versiunea schemei după migrare
+    """
+    for version, description, apply in MIGRATIONS:
+        if version <= current_version(conn):
+            continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Alt worker poate să fi aplicat migrarea cât am așteptat lock-ul
+            if version > current_version(conn):
+                apply(conn.cursor())
+                conn.execute(f'PRAGMA user_version = {int(version)}')
+                logger.info("Migration applied | version=%s description=%s", version, description)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.exception("Migration failed | version=%s", version)
+            raise
+    reindex(conn)
+    return current_version(conn)
+
+
+def reindex(conn):
+    """Construiește indexurile derivate cerute de migrări (`_request_reindex`), câte unul per tranzacție."""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_reindex'").fetchone():
+        return
+    for name, build in REINDEX.items():
+        if not conn.execute('SELECT 1 FROM schema_reindex WHERE name = ?', (name,)).fetchone():
+            continue
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Alt worker poate să-l fi construit cât am așteptat lock-ul
+            if conn.execute('SELECT 1 FROM schema_reindex WHERE name = ?', (name,)).fetchone():
+                build(conn.cursor())
+                conn.execute('DELETE FROM schema_reindex WHERE name = ?', (name,))
+                logger.info("Reindex done | index=%s", name)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.exception("Reindex failed | index=%s", name)
+            raise
+
+
+def migrate_database(db_path):
+    """
+    Migrează fișierul `db_path` pe o conexiune proprie (închisă la final).
+
+    Returns:
+        tuple: (versiunea schemei, True dacă indexul FTS5 e disponibil)
+    """
+    conn = db.connect(db_path)
+    try:
+        return migrate(conn), search.is_available(conn)
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Aplică migrările schemei SQLite')
+    parser.add_argument('database', nargs='?', default=db.DATABASE)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    version, fts = migrate_database(args.database)
+    print(f"{args.database}: schema_version={version} fts={fts}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,351 @@
+"""
+model_router.py - Rutarea generărilor între modele Gemini, cu cereri dublate ("hedged")
+
+Fiecare rută e un model la un endpoint, cu clientul ei (pool, reîncercări, circuit
+breaker proprii) și o fereastră cu latențele recente. `HedgedRouter` trimite cererea
+pe ruta principală; dacă aceasta nu a răspuns după `hedge_delay()` (cuantila
+`quantile`, implicit p90, din latențele ei recente), trimite aceeași cerere și pe ruta
+de rezervă. Câștigă prima încercare care întoarce o rețetă validă (`is_valid`), și cu
+streaming: o încercare care a început să trimită conținut dar se întrerupe, e limitată
+(429) sau produce un JSON neparsabil nu câștigă, iar cealaltă încercare continuă.
+Pagina job-ului afișează rețeta parțială a unei singure încercări (prima care trimite
+conținut); dacă aceea eșuează, afișarea trece la cealaltă.
+
+Cealaltă încercare e anulată: în modul async task-ul e oprit (httpx închide conexiunea),
+cu streaming sync bucla se oprește la următoarea bucată; un apel sync fără streaming nu
+poate fi întrerupt, rezultatul lui e doar ignorat. Dacă ruta principală eșuează înainte
+de întârziere, cererea trece imediat pe ruta de rezervă.
+
+Latența unei rute e timpul până la rețeta completă (nu până la primul conținut: un
+stream care pornește și apoi stagnează declanșează dublarea); pentru o încercare anulată
+se înregistrează timpul până la anulare (o limită inferioară), ca întârzierea să nu
+scadă doar pentru că încercările lente sunt oprite.
+"""
+import asyncio
+import contextlib
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+OUTCOMES = ('ok', 'failed', 'cancelled')
+
+
+class RouteStats:
+    """Latențele recente (fereastră glisantă) și contoarele unei rute."""
+
+    def __init__(self, window=200):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.counts = dict.fromkeys(OUTCOMES, 0)
+        self.wins = 0
+
+    def record(self, outcome, latency=None):
+        with self._lock:
+            self.counts[outcome] += 1
+            if latency is not None:
+                self._latencies.append(latency)
+
+    def win(self):
+        with self._lock:
+            self.wins += 1
+
+    def samples(self):
+        with self._lock:
+            return len(self._latencies)
+
+    def quantile(self, q):
+        """Cuantila `q` a latențelor din fereastră sau None fără date."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts, wins=self.wins, samples=len(self._latencies))
+
+
+class Route:
+    """Un model la un endpoint; `client` e un `GeminiClient` / `AsyncGeminiClient` dedicat rutei."""
+
+    def __init__(self, name, client, model=None, window=200):
+        self.name = name
+        self.client = client
+        self.model = model or client.model
+        self.stats = RouteStats(window)
+
+
+class Attempt:
+    """
+    O încercare pe o rută, primită de funcția de generare.
+
+    Funcția folosește `client` / `model`, apelează `progress()` la fiecare conținut nou din
+    stream (întoarce False dacă rețeta parțială a altei încercări e cea afișată) și se
+    oprește când `cancelled` e setat.
+    """
+
+    def __init__(self, route, race=None):
+        self.route = route
+        self.client = route.client
+        self.model = route.model
+        self.cancelled = threading.Event()
+        self.started = time.perf_counter()
+        self.done = False
+        self.result = None
+        self.task = None
+        self._race = race
+
+    def progress(self):
+        return self._race is None or self._race.show(self)
+
+    def cancel(self):
+        self.cancelled.set()
+        if self.task is not None:
+            self.task.cancel()
+
+
+class _Race:
+    """
+    Încercările aceleiași generări, câștigătorul (prima rețetă validă) și încercarea a cărei
+    rețetă parțială e afișată (`display`).
+
+    Sync: `lock` e condiția pe care așteaptă `generate`, `notify` e `notify_all`.
+    """
+
+    def __init__(self, notify, lock=None):
+        self.attempts = []
+        self.winner = None
+        self.display = None
+        self._notify = notify
+        self._lock = lock if lock is not None else contextlib.nullcontext()
+
+    def show(self, attempt):
+        """True dacă rețeta parțială a încercării se afișează (prima care trimite conținut)."""
+        with self._lock:
+            if self.display is None and self.winner is None:
+                self.display = attempt
+            return self.display is attempt
+
+    def settle(self, attempt):
+        with self._lock:
+            if self.winner is None:
+                self.winner = attempt
+                self._notify()
+
+    def finish(self, attempt):
+        with self._lock:
+            attempt.done = True
+            # Încercarea afișată a eșuat: următoarea care trimite conținut preia afișarea
+            if self.display is attempt and self.winner is not attempt:
+                self.display = None
+            self._notify()
+
+    def decided(self):
+        return self.winner is not None or all(attempt.done for attempt in self.attempts)
+
+
+class HedgedRouter:
+    """
+    Ruta principală, opțional una de rezervă pe care cererea se dublează după `hedge_delay()`.
+
+    `is_valid(result)` decide dacă rezultatul unei încercări e o rețetă utilizabilă;
+    `on_result(route, outcome, latency)` e apelat după fiecare încercare (metrici).
+    """
+
+    def __init__(self, primary, fallback=None, quantile=0.9, initial_delay=4.0, min_delay=0.25,
+                 max_delay=20.0, min_samples=20, is_valid=bool, on_result=None, max_workers=16):
+        self.primary = primary
+        self.fallback = fallback
+        self.quantile = quantile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.is_valid = is_valid
+        self.on_result = on_result
+        self.max_workers = max_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.hedged = 0
+        self.failovers = 0
+
+    @property
+    def routes(self):
+        return [self.primary] + ([self.fallback] if self.fallback else [])
+
+    def hedge_delay(self):
+        """Cuantila latențelor recente ale rutei principale (cu `min_samples`), limitată la [min, max]."""
+        latency = self.primary.stats.quantile(self.quantile) \
+            if self.primary.stats.samples() >= self.min_samples else None
+        return min(self.max_delay, max(self.min_delay, latency if latency is not None else self.initial_delay))
+
+    def stats(self):
+        with self._stats_lock:
+            stats = {'hedged': self.hedged, 'failovers': self.failovers}
+        stats['hedge_delay'] = self.hedge_delay()
+        stats['routes'] = {route.name: route.stats.snapshot() for route in self.routes}
+        return stats
+
+    def _count(self, field):
+        with self._stats_lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def _record(self, attempt, result, error=False):
+        """Rezultatul unei încercări: contoare, latență, `on_result`; True dacă rețeta e validă."""
+        elapsed = time.perf_counter() - attempt.started
+        valid = not error and not attempt.cancelled.is_set() and self.is_valid(result)
+        if attempt.cancelled.is_set():
+            outcome, latency = 'cancelled', elapsed
+        elif valid:
+            outcome, latency = 'ok', elapsed
+        else:
+            outcome, latency = 'failed', None
+        attempt.route.stats.record(outcome, latency)
+        if self.on_result:
+            self.on_result(attempt.route.name, outcome, elapsed)
+        return valid
+
+    def _finish(self, race, winner):
+        """Anulează încercările care au pierdut; loghează o generare dublată."""
+        for attempt in race.attempts:
+            if attempt is not winner and not attempt.done:
+                attempt.cancel()
+        if winner is not None:
+            winner.route.stats.win()
+        if len(race.attempts) > 1:
+            logger.info("Gemini hedged | winner=%s attempts=%s",
+                        winner.route.name if winner else None, ','.join(a.route.name for a in race.attempts))
+
+    # ---- sync (thread-uri) ----
+
+    @property
+    def executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='gemini-route')
+            return self._executor
+
+    def close(self):
+        """Așteaptă încercările în curs (inclusiv cele anulate) și oprește thread-urile routerului."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _run(self, attempt, call, race):
+        error = False
+        try:
+            attempt.result = call(attempt)
+        except Exception:
+            logger.exception("Gemini route attempt failed | route=%s", attempt.route.name)
+            error = True
+        if self._record(attempt, attempt.result, error):
+            race.settle(attempt)
+        race.finish(attempt)
+
+    def generate(self, call):
+        """
+        `call(attempt)` -> rețeta sau None, rulat pe rute după regulile de mai sus.
+
+        Fără rută de rezervă rulează direct în thread-ul curent (doar cu statistici).
+        """
+        if self.fallback is None:
+            attempt = Attempt(self.primary)
+            try:
+                attempt.result = call(attempt)
+            except Exception:
+                self._record(attempt, None, error=True)
+                raise
+            self._record(attempt, attempt.result)
+            return attempt.result
+
+        condition = threading.Condition()
+        race = _Race(condition.notify_all, condition)
+
+        def start(route):
+            attempt = Attempt(route, race)
+            with condition:
+                race.attempts.append(attempt)
+            self.executor.submit(self._run, attempt, call, race)
+
+        start(self.primary)
+        with condition:
+            condition.wait_for(race.decided, timeout=self.hedge_delay())
+            winner, primary_done = race.winner, race.attempts[0].done
+        if winner is None:
+            self._count('failovers' if primary_done else 'hedged')
+            start(self.fallback)
+        with condition:
+            condition.wait_for(race.decided)
+            winner = race.winner
+        self._finish(race, winner)
+        return winner.result if winner is not None else None
+
+    # ---- async (modul ASGI) ----
+
+    async def _run_async(self, attempt, call, race, changed):
+        error = False
+        try:
+            attempt.result = await call(attempt)
+        except asyncio.CancelledError:
+            attempt.cancelled.set()
+        except Exception:
+            logger.exception("Gemini route attempt failed | route=%s", attempt.route.name)
+            error = True
+        if self._record(attempt, attempt.result, error):
+            race.settle(attempt)
+        race.finish(attempt)
+        changed.set()
+
+    async def generate_async(self, call):
+        """Ca `generate`, cu `call(attempt)` corutină; încercarea care pierde e anulată (task.cancel)."""
+        if self.fallback is None:
+            attempt = Attempt(self.primary)
+            try:
+                attempt.result = await call(attempt)
+            except Exception:
+                self._record(attempt, None, error=True)
+                raise
+            self._record(attempt, attempt.result)
+            return attempt.result
+
+        changed = asyncio.Event()
+        race = _Race(changed.set)
+
+        def start(route):
+            attempt = Attempt(route, race)
+            race.attempts.append(attempt)
+            attempt.task = asyncio.ensure_future(self._run_async(attempt, call, race, changed))
+
+        async def wait(timeout=None, until=race.decided):
+            deadline = None if timeout is None else time.perf_counter() + timeout
+            while not until():
+                changed.clear()
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    return
+                try:
+                    await asyncio.wait_for(changed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    return
+
+        start(self.primary)
+        try:
+            await wait(self.hedge_delay())
+            if race.winner is None:
+                self._count('failovers' if race.attempts[0].done else 'hedged')
+                start(self.fallback)
+            await wait()
+            winner = race.winner
+            self._finish(race, winner)
+            return winner.result if winner is not None else None
+        except asyncio.CancelledError:
+            for attempt in race.attempts:
+                attempt.cancel()
+            raise
@@ -0,0 +1,182 @@
+"""
+near_duplicates.py - Detectarea rețetelor aproape identice (MinHash + LSH)
+
+Fiecare rețetă salvată primește două amprente MinHash (64 de valori pe 32 de biți):
+- a rețetei: cuvintele titlului și termenii ingredientelor, normalizați ca în
+  ingredient_index.py ("Pui cu cartofi la cuptor" și "Pui la cuptor cu cartofi"
+  au aceleași trăsături)
+- doar a ingredientelor, pentru lista introdusă de utilizator la generare
+
+Fracția de valori egale între două amprente estimează similaritatea Jaccard a
+mulțimilor de trăsături. Pentru căutare, amprenta e împărțită în 16 benzi de câte
+4 valori, fiecare cu un bucket în `recipe_lsh_buckets`; candidații sunt rețetele
+care au cel puțin un bucket comun (16 căutări după cheia primară, indiferent de
+numărul rețetelor), iar similaritatea se verifică apoi pe amprentele lor.
+Cu 16 x 4, o pereche cu Jaccard 0.7 devine candidat în ~99% din cazuri, una cu 0.3 în ~12%.
+"""
+import hashlib
+import random
+import struct
+
+import ingredient_index
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+KIND_RECIPE = 0
+KIND_INGREDIENTS = 1
+
+_MERSENNE_PRIME = (1 << 61) - 1
+# Permutările sunt fixe: amprentele stocate trebuie să rămână comparabile între procese și deploy-uri
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+_SIGNATURE = struct.Struct(f'<{NUM_PERM}I')
+_BAND = struct.Struct(f'<{ROWS}I')
+
+# Crește la orice schimbare a trăsăturilor sau a permutărilor: amprentele exportate cu altă
+# versiune nu mai sunt comparabile și se recalculează la import (vezi library.py)
+FINGERPRINT_VERSION = 1
+
+# Câte rețete se amprentează per lot în `backfill`
+BACKFILL_BATCH = 500
+
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def recipe_features(title, items):
+    """Trăsăturile unei rețete: cuvintele normalizate ale titlului și termenii ingredientelor."""
+    features = {f't:{word}' for word in ingredient_index.normalize_ingredient(title).split()}
+    features.update(f'i:{term}' for term in ingredient_index.ingredient_terms(items))
+    return features
+
+
+def ingredient_features(terms):
+    return {f'i:{term}' for term in terms}
+
+
+def signature(features):
+    """Amprenta MinHash a mulțimii de trăsături sau None pentru o mulțime goală."""
+    if not features:
+        return None
+    hashes = [_hash64(feature) for feature in features]
+    return tuple(
+        min((a * value + b) % _MERSENNE_PRIME for value in hashes) & 0xFFFFFFFF
+        for a, b in _PERMUTATIONS
+    )
+
+
+def similarity(first, second):
+    """Jaccard estimat: fracția pozițiilor egale din cele două amprente."""
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_PERM
+
+
+def _buckets(kind, sig):
+    """(kind, band, bucket) pentru fiecare bandă; bucket-ul e un hash pe 64 de biți cu semn (INTEGER SQLite)."""
+    return [
+        (kind, band, int.from_bytes(
+            hashlib.blake2b(_BAND.pack(*sig[band * ROWS:(band + 1) * ROWS]), digest_size=8).digest(),
+            'little', signed=True))
+        for band in range(BANDS)
+    ]
+
+
+def backfill(cursor):
+    """
+    Amprentează rețetele fără amprentă (ingredientele din `recipe_ingredients`); apelat de
+    migrări după ce schema e la zi (vezi `migrations.REINDEX`).
+    """
+    last_id = 0
+    while True:
+        rows = cursor.execute('''
+            SELECT r.id, r.title FROM recipes r
+            WHERE r.id > ? AND NOT EXISTS (SELECT 1 FROM recipe_fingerprints f WHERE f.recipe_id = r.id)
+            ORDER BY r.id LIMIT ?
+        ''', (last_id, BACKFILL_BATCH)).fetchall()
+        if not rows:
+            break
+        for recipe_id, title in rows:
+            items = [row[0] for row in cursor.execute(
+                'SELECT item FROM recipe_ingredients WHERE recipe_id = ? ORDER BY position', (recipe_id,)
+            )]
+            index_recipe(cursor, recipe_id, title, items)
+        last_id = rows[-1][0]
+
+
+def fingerprints(title, items, terms=None):
+    """(amprenta rețetei, amprenta ingredientelor) ca BLOB-uri, fiecare None pentru o mulțime goală."""
+    if terms is None:
+        terms = ingredient_index.ingredient_terms(items)
+    full = signature(recipe_features(title, items))
+    ingredients = signature(ingredient_features(terms))
+    return full and _SIGNATURE.pack(*full), ingredients and _SIGNATURE.pack(*ingredients)
+
+
+def index_recipe(cursor, recipe_id, title, items):
+    """(Re)scrie amprentele și bucket-urile LSH ale unei rețete; în tranzacția INSERT-ului rețetei."""
+    cursor.execute('DELETE FROM recipe_lsh_buckets WHERE recipe_id = ?', (recipe_id,))
+    index_fingerprints(cursor, [(recipe_id, *fingerprints(title, items))])
+
+
+def index_fingerprints(cursor, rows):
+    """Scrie amprentele (recipe_id, blob rețetă, blob ingrediente) și bucket-urile lor; în lot la import."""
+    cursor.executemany(
+        'INSERT OR REPLACE INTO recipe_fingerprints (recipe_id, signature, ingredients_signature) VALUES (?, ?, ?)',
+        rows
+    )
+    buckets = []
+    for recipe_id, full, ingredients in rows:
+        for kind, blob in ((KIND_RECIPE, full), (KIND_INGREDIENTS, ingredients)):
+            if blob:
+                buckets.extend((*bucket, recipe_id) for bucket in _buckets(kind, _SIGNATURE.unpack(blob)))
+    cursor.executemany(
+        'INSERT OR IGNORE INTO recipe_lsh_buckets (kind, band, bucket, recipe_id) VALUES (?, ?, ?, ?)',
+        buckets
+    )
+
+
+def _find(conn, kind, sig, threshold, limit):
+    if sig is None:
+        return []
+    column = 'signature' if kind == KIND_RECIPE else 'ingredients_signature'
+    buckets = _buckets(kind, sig)
+    placeholders = ','.join('(?, ?, ?)' for _ in buckets)
+    # CROSS JOIN fixează ordinea: câte o căutare după cheia primară per bandă (`IN (VALUES ...)` pe
+    # row-values ar scana tabelul)
+    rows = conn.execute(f'''
+        WITH query(kind, band, bucket) AS (VALUES {placeholders}),
+        candidates AS (
+            SELECT DISTINCT b.recipe_id FROM query CROSS JOIN recipe_lsh_buckets b
+            ON b.kind = query.kind AND b.band = query.band AND b.bucket = query.bucket
+        )
+        SELECT r.id, r.title, r.difficulty_rating, f.{column}
+        FROM candidates c
+        JOIN recipe_fingerprints f ON f.recipe_id = c.recipe_id
+        JOIN recipes r ON r.id = c.recipe_id
+    ''', [value for bucket in buckets for value in bucket]).fetchall()
+
+    found = []
+    for recipe_id, title, difficulty, blob in rows:
+        score = similarity(sig, _SIGNATURE.unpack(blob)) if blob else 0.0
+        if score >= threshold:
+            found.append({'id': recipe_id, 'title': title, 'difficulty': difficulty, 'similarity': round(score, 3)})
+    found.sort(key=lambda match: (-match['similarity'], -match['id']))
+    return found[:limit]
+
+
+def find_duplicates(conn, title, items, threshold=0.7, limit=5):
+    """
+    Rețetele salvate aproape identice cu rețeta dată (titlu + ingrediente), cele mai similare întâi.
+
+    Returns:
+        listă de dict-uri (id, title, difficulty, similarity)
+    """
+    return _find(conn, KIND_RECIPE, signature(recipe_features(title, items)), threshold, limit)
+
+
+def find_by_ingredients(conn, ingredients_text, threshold=0.7, limit=5):
+    """Rețetele salvate cu aproape aceleași ingrediente ca lista utilizatorului ("pui, cartofi, ceapă")."""
+    terms = ingredient_index.parse_user_ingredients(ingredients_text)
+    return _find(conn, KIND_INGREDIENTS, signature(ingredient_features(terms)), threshold, limit)
@@ -0,0 +1,121 @@
+"""
+page_cache.py - ETag-uri pentru paginile de rețete și cache de fragmente randate
+
+Rețetele salvate nu se modifică până la ștergere, deci HTML-ul lor poate fi
+refolosit:
+- ETag tare din conținutul paginii: (id, updated_at) pentru o rețetă și
+  versiunea galeriei (`cache_versions`, incrementată de trigger-e la orice
+  INSERT/DELETE/UPDATE în `recipes`) pentru galerie. Un `If-None-Match`
+  potrivit primește 304 fără interogările și randarea paginii.
+- `FragmentCache`: LRU per proces cu fragmentele randate (cardurile din galerie,
+  corpul paginii de detalii), cu cheile care includ versiunea conținutului.
+
+Cheile conțin versiunea, deci o intrare veche nu poate fi servită nici în alt
+worker Gunicorn; invalidarea explicită din `save_recipe` / `delete_recipe`
+doar eliberează memoria mai devreme.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+GALLERY = 'gallery'
+
+
+def recipe_version(conn, recipe_id):
+    """`updated_at` al rețetei sau None dacă nu există (o căutare după cheia primară)."""
+    row = conn.execute('SELECT updated_at, created_at FROM recipes WHERE id = ?', (recipe_id,)).fetchone()
+    if row is None:
+        return None
+    return row[0] or row[1]
+
+
+def gallery_version(conn):
+    """Versiunea curentă a galeriei (crește la fiecare rețetă salvată sau ștearsă)."""
+    row = conn.execute('SELECT version FROM cache_versions WHERE name = ?', (GALLERY,)).fetchone()
+    return row[0] if row else 0
+
+
+def make_etag(*parts):
+    """ETag tare (fără ghilimele, ca pentru `response.set_etag`) din părțile care determină răspunsul."""
+    return hashlib.sha256('\x1f'.join(map(str, parts)).encode('utf-8')).hexdigest()[:24]
+
+
+def templates_fingerprint(template_folder, extra=None):
+    """
+    Amprenta template-urilor (nume, dimensiune, mtime) și a manifestului de assets.
+
+    Intră în ETag-uri ca un deploy nou să nu fie acoperit de 304-uri vechi; e aceeași
+    în toți workerii (spre deosebire de momentul pornirii procesului).
+    """
+    parts = []
+    for root, _, files in os.walk(template_folder):
+        for filename in sorted(files):
+            stat = os.stat(os.path.join(root, filename))
+            parts.append(f"{os.path.relpath(os.path.join(root, filename), template_folder)}:{stat.st_size}:{stat.st_mtime_ns}")
+    if extra:
+        parts.extend(f"{key}={value}" for key, value in sorted(extra.items()))
+    return make_etag(*sorted(parts))[:12]
+
+
+class FragmentCache:
+    """
+    LRU cu fragmente HTML randate, cheiate după (tip, id/versiune, ...).
+
+    `get_or_render(key, render)` întoarce fragmentul din cache sau apelează `render()`
+    (un rezultat None nu se memorează, ex: rețetă ștearsă între timp).
+    """
+
+    def __init__(self, max_entries=2000, enabled=True):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key, render):
+        if not self.enabled:
+            return render()
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        # Randarea se face în afara lock-ului; două thread-uri pot randa același fragment o dată
+        value = render()
+        if value is not None:
+            with self._lock:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, kind, ident=None):
+        """Elimină intrările de tipul `kind` (toate sau doar cele pentru `ident`)."""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == kind and (ident is None or key[1] == ident)]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def invalidate_recipe(self, recipe_id):
+        """Fragmentele unei rețete (card și detalii) și cele ale galeriei."""
+        return sum(self.invalidate(kind, recipe_id) for kind in ('card', 'detail')) + self.invalidate(GALLERY)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+                'size': len(self._entries),
+            }
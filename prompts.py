@@ -0,0 +1,150 @@
+"""
+prompts.py - Cererea către Gemini pentru generarea unei rețete
+
+Prompt-ul (în română) și `generationConfig` sunt construite o singură dată, la pornire;
+per cerere se inserează doar ingredientele utilizatorului între două bucăți fixe de text.
+
+Schema răspunsului e definită o singură dată (`recipe_schema`) și apare în două forme:
+- în textul prompt-ului, ca schiță compactă (`"title": string, ...`)
+- ca `responseSchema` în `generationConfig`, cu `responseMimeType: application/json`:
+  modelul întoarce doar JSON valid după schemă (fără ```json``` sau text în jur), deci
+  răspunsul se decodează direct (`parse_recipe_response(..., strict=True)`)
+
+`maxOutputTokens` limitează lungimea și deci latența răspunsului; împreună cu numărul
+de pași cerut (`min_steps` / `max_steps`) se reglează detaliul rețetei per deploy.
+"""
+
+_STEP_NOTE = 'fiecare cu durată estimată'
+
+
+def _object(properties, required=None, **extra):
+    """Obiect în subsetul OpenAPI acceptat de Gemini; ordinea proprietăților e cea din dict."""
+    return {
+        'type': 'OBJECT',
+        'properties': properties,
+        'required': list(required if required is not None else properties),
+        'propertyOrdering': list(properties),
+        **extra,
+    }
+
+
+def recipe_schema(min_steps=None, max_steps=None):
+    """
+    `responseSchema` pentru rețetă (aceleași câmpuri ca schița din prompt). Ordinea contează
+    și la streaming: titlul, apoi ingredientele și pașii ajung primii în pagina job-ului.
+    """
+    steps = {'type': 'ARRAY', 'items': _object({
+        'step': {'type': 'INTEGER'},
+        'text': {'type': 'STRING'},
+        'time_minutes': {'type': 'INTEGER'},
+        'temperature_c': {'type': 'INTEGER', 'nullable': True},
+    }, required=('step', 'text', 'time_minutes'))}
+    if min_steps:
+        steps['minItems'] = min_steps
+    if max_steps:
+        steps['maxItems'] = max_steps
+    return _object({
+        'title': {'type': 'STRING'},
+        'servings': {'type': 'INTEGER'},
+        'prep_time_minutes': {'type': 'INTEGER'},
+        'cook_time_minutes': {'type': 'INTEGER'},
+        'ingredients': {'type': 'ARRAY', 'items': _object({
+            'item': {'type': 'STRING'},
+            'quantity': {'type': 'NUMBER'},
+            'unit': {'type': 'STRING'},
+            'notes': {'type': 'STRING'},
+        }, required=('item', 'quantity', 'unit'))},
+        'instructions': steps,
+        'difficulty': {'type': 'INTEGER'},
+        'wine_pairing': {'type': 'STRING'},
+    })
+
+
+def _sketch(schema):
+    """Schița din prompt: `string`, `integer|null`, `[ { "item": string, ... } ]`."""
+    kind = schema['type']
+    if kind == 'OBJECT':
+        fields = ', '.join(f'"{name}": {_sketch(value)}' for name, value in schema['properties'].items())
+        return '{ ' + fields + ' }'
+    if kind == 'ARRAY':
+        return f"[ {_sketch(schema['items'])} ]"
+    text = kind.lower()
+    return f'{text}|null' if schema.get('nullable') else text
+
+
+def schema_sketch(schema):
+    """Schema de nivel superior, un câmp pe linie (cum apare în prompt)."""
+    lines = [f'  "{name}": {_sketch(value)}' for name, value in schema['properties'].items()]
+    return '{\n' + ',\n'.join(lines) + '\n}'
+
+
+class RecipePrompt:
+    """
+    Prompt-ul și `generationConfig` precompilate; `body(ingredients)` doar concatenează.
+
+    `max_output_tokens` None sau 0 lasă limita modelului; `structured_output=False` trimite
+    doar textul (răspunsul poate veni în ```json``` și e parsat tolerant).
+    """
+
+    def __init__(self, min_steps=10, max_steps=None, max_output_tokens=2048, structured_output=True):
+        self.min_steps = min_steps
+        self.max_steps = max_steps
+        self.max_output_tokens = max_output_tokens or None
+        self.structured_output = structured_output
+        self.schema = recipe_schema(min_steps, max_steps)
+
+        if max_steps:
+            steps_rule = f'Între {min_steps} și {max_steps} pași detaliați, {_STEP_NOTE}.'
+        else:
+            steps_rule = f'Minim {min_steps} pași detaliați, {_STEP_NOTE}.'
+        self._prefix = (
+            'Ești un chef profesionist român. Creează o rețetă completă și realistă folosind DOAR ingredientele principale: '
+        )
+        self._suffix = (
+            '. Poți adăuga în mod implicit doar ingrediente de bază (sare, piper, ulei de măsline, apă) dacă sunt necesare. '
+            'RĂSPUNDE DOAR CU JSON VALID (fără explicații, fără text în afara JSON). Folosește exact această schemă:\n'
+            f'{schema_sketch(self.schema)}\n'
+            'Cerințe stricte: \n'
+            f'- {steps_rule} \n'
+            '- Fiecare ingredient trebuie să aibă cantitate numerică și unitate (g, ml, lingurițe, linguri, buc). \n'
+            '- Cantitățile să fie realiste. \n'
+            '- Include temperatură (°C) dacă se coace sau se prăjește. \n'
+            '- "servings" între 2 și 6. \n'
+            '- "difficulty" între 1 și 5. \n'
+            '- Textul în română, clar și natural.'
+        )
+
+        config = {}
+        if structured_output:
+            config['responseMimeType'] = 'application/json'
+            config['responseSchema'] = self.schema
+        if self.max_output_tokens:
+            config['maxOutputTokens'] = self.max_output_tokens
+        # Partajat de toate cererile; nu se modifică după construcție
+        self.generation_config = config
+
+    def text(self, ingredients_text):
+        return self._prefix + ingredients_text + self._suffix
+
+    def body(self, ingredients_text):
+        """Corpul cererii `generateContent` / `streamGenerateContent`."""
+        body = {'contents': [{'parts': [{'text': self.text(ingredients_text)}]}]}
+        if self.generation_config:
+            body['generationConfig'] = self.generation_config
+        return body
+
+
+def response_usage(data):
+    """
+    (tokeni prompt, tokeni răspuns, finishReason) dintr-un răspuns `generateContent` sau din
+    ultima bucată a stream-ului; None pentru valorile lipsă.
+    """
+    if not isinstance(data, dict):
+        return None, None, None
+    usage = data.get('usageMetadata') if isinstance(data.get('usageMetadata'), dict) else {}
+    finish_reason = None
+    try:
+        finish_reason = data['candidates'][0].get('finishReason')
+    except (KeyError, IndexError, TypeError, AttributeError):
+        pass
+    return usage.get('promptTokenCount'), usage.get('candidatesTokenCount'), finish_reason
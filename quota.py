@@ -0,0 +1,169 @@
+"""
+quota.py - Limita zilnică de generări (per utilizator și globală)
+
+Flux: `reserve()` înainte de apelul Gemini (un singur UPSERT atomic, deci
+request-urile concurente nu pot depăși limita), apoi `commit()` la succes sau
+`refund()` la eșec.
+
+Contorul global folosește rândul `user_id = 0` din `usage_limits` și protejează
+bugetul Gemini al întregii aplicații (0 = fără limită globală).
+
+Fiecare worker ține și un cache scurt cu generările rămase per utilizator, astfel
+încât pagina principală nu interoghează SQLite la fiecare afișare. O valoare care
+ar refuza utilizatorul (0 sau sub cererea curentă) e recitită din SQLite: restituirea
+poate veni din alt worker, care nu are acces la cache-ul acestuia.
+"""
+import threading
+import time
+from datetime import datetime
+
+import db
+
+GLOBAL_USER_ID = 0
+
+
+class QuotaExceeded(Exception):
+    """Limita zilnică a fost atinsă (`scope` = 'user' sau 'global')."""
+
+    def __init__(self, scope, limit):
+        super().__init__(f'{scope} daily limit reached ({limit})')
+        self.scope = scope
+        self.limit = limit
+
+
+class Reservation:
+    """O generare rezervată; se confirmă cu `commit()` sau se restituie cu `refund()`."""
+
+    __slots__ = ('user_id', 'day', 'count', 'uses_global', 'state')
+
+    def __init__(self, user_id, day, count, uses_global):
+        self.user_id = user_id
+        self.day = day
+        self.count = count
+        self.uses_global = uses_global
+        self.state = 'reserved'
+
+
+def _today():
+    return datetime.utcnow().date().isoformat()
+
+
+class UsageQuota:
+    def __init__(self, db_path, user_limit=10, global_limit=0, cache_ttl=30.0):
+        self.db_path = db_path
+        self.user_limit = user_limit
+        self.global_limit = global_limit
+        self.cache_ttl = cache_ttl
+        self._cache = {}  # (user_id, day) -> (expires_at, remaining)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        return db.get_connection(self.db_path)
+
+    def _remember(self, user_id, day, remaining):
+        with self._lock:
+            self._cache[(user_id, day)] = (time.monotonic() + self.cache_ttl, max(0, remaining))
+            if len(self._cache) > 10000:
+                self._cache.clear()
+
+    def _cached(self, user_id, day):
+        with self._lock:
+            entry = self._cache.get((user_id, day))
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def remaining(self, user_id):
+        """Generările rămase azi pentru utilizator (din cache-ul workerului dacă e proaspăt și nenul)."""
+        day = _today()
+        cached = self._cached(user_id, day)
+        if cached:
+            return cached
+        return self._read(user_id, day)
+
+    def _read(self, user_id, day):
+        row = self._connect().execute(
+            'SELECT count FROM usage_limits WHERE user_id = ? AND day = ?', (user_id, day)
+        ).fetchone()
+        remaining = max(0, self.user_limit - (row[0] if row else 0))
+        self._remember(user_id, day, remaining)
+        return remaining
+
+    def reserve(self, user_id):
+        """
+        Rezervă o generare. Aruncă `QuotaExceeded` dacă limita (per utilizator sau globală) e atinsă.
+
+        Incrementul și verificarea limitei se fac în același statement
+        (`INSERT ... ON CONFLICT DO UPDATE ... WHERE count + n <= limit RETURNING count`).
+        """
+        return self.reserve_many(user_id, 1)[0]
+
+    def reserve_many(self, user_id, amount):
+        """
+        Rezervă `amount` generări deodată (tot sau nimic), ex: un plan de mese din `/generate_batch`.
+
+        Returns:
+            list[Reservation]: câte o rezervare per generare, confirmate/restituite individual
+        """
+        day = _today()
+        if amount > self.user_limit:
+            raise QuotaExceeded('user', self.user_limit)
+        cached = self._cached(user_id, day)
+        if cached is not None and cached < amount and self._read(user_id, day) < amount:
+            # Refuz fără tranzacție de scriere (o singură citire după cheia primară)
+            raise QuotaExceeded('user', self.user_limit)
+        if self.global_limit and amount > self.global_limit:
+            raise QuotaExceeded('global', self.global_limit)
+
+        conn = self._connect()
+        with conn:
+            if self.global_limit:
+                if self._increment(conn, GLOBAL_USER_ID, day, self.global_limit, amount) is None:
+                    raise QuotaExceeded('global', self.global_limit)
+            count = self._increment(conn, user_id, day, self.user_limit, amount)
+            if count is None:
+                # Excepția anulează tranzacția, inclusiv incrementul global
+                if amount == 1:
+                    self._remember(user_id, day, 0)
+                raise QuotaExceeded('user', self.user_limit)
+
+        self._remember(user_id, day, self.user_limit - count)
+        return [Reservation(user_id, day, count, bool(self.global_limit)) for _ in range(amount)]
+
+    @staticmethod
+    def _increment(conn, user_id, day, limit, amount=1):
+        row = conn.execute('''
+            INSERT INTO usage_limits (user_id, day, count) VALUES (?, ?, ?)
+            ON CONFLICT(user_id, day) DO UPDATE SET count = count + excluded.count WHERE count + excluded.count <= ?
+            RETURNING count
+        ''', (user_id, day, amount, limit)).fetchone()
+        return row[0] if row else None
+
+    def reservation_for(self, user_id, created_at):
+        """
+        Rezervarea unui job pierdut (ex: workerul care o ținea a fost repornit), refăcută
+        din utilizator și momentul creării job-ului, ca să poată fi restituită.
+        """
+        day = datetime.utcfromtimestamp(created_at).date().isoformat()
+        return Reservation(user_id, day, None, bool(self.global_limit))
+
+    def commit(self, reservation):
+        """Generarea a reușit: rezervarea devine definitivă (contorul e deja incrementat)."""
+        reservation.state = 'committed'
+
+    def refund(self, reservation):
+        """Generarea a eșuat: restituie rezervarea (o singură dată)."""
+        if reservation.state != 'reserved':
+            return
+        reservation.state = 'refunded'
+        conn = self._connect()
+        with conn:
+            user_ids = (reservation.user_id, GLOBAL_USER_ID) if reservation.uses_global else (reservation.user_id,)
+            for user_id in user_ids:
+                conn.execute(
+                    'UPDATE usage_limits SET count = MAX(count - 1, 0) WHERE user_id = ? AND day = ?',
+                    (user_id, reservation.day)
+                )
+        # Cache-ul celorlalți workeri se corectează la următoarea verificare (vezi `_read`)
+        with self._lock:
+            self._cache.pop((reservation.user_id, reservation.day), None)
@@ -0,0 +1,271 @@
+"""
+recipe_parser.py - Parsarea răspunsului Gemini în rețeta afișată și salvată
+
+Textul modelului poate fi JSON curat, JSON în ```json ... ```, JSON cu text în
+jur sau JSON trunchiat. `parse_recipe_response` extrage obiectul și formatează
+ingredientele/pașii pentru afișare, plus variantele structurate (cantități,
+durate, temperaturi) pentru salvare. Cu `responseSchema` (prompts.py) răspunsul e
+JSON curat și se decodează direct (`strict=True`).
+
+Fiecare ingredient și pas e formatat o singură dată (linia afișată și detaliile
+structurate din același obiect). Dacă pachetul `orjson` e instalat, e folosit
+pentru decodare; textele pe care `orjson` le tratează altfel decât `json`
+(NaN/Infinity, întregi peste 64 de biți, surogate neîmperecheate) trec prin
+`json`, deci rezultatul e identic cu și fără `orjson`.
+Benchmark și verificarea echivalenței: tools/bench_parser.py.
+"""
+import json
+import logging
+import re
+
+try:
+    import orjson
+except ImportError:  # opțional
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+_FENCE_OPEN_RE = re.compile(r"```[a-zA-Z]*")
+# orjson citește ca float întregii care nu încap pe 64 de biți; json îi păstrează exacți
+_INT64_LIMIT = 2.0 ** 63
+
+
+def _lossy(value):
+    return type(value) is float and not -_INT64_LIMIT < value < _INT64_LIMIT
+
+
+def _orjson_mismatch(data):
+    """
+    True dacă rezultatul orjson poate diferi de json în câmpurile numerice citite de
+    `parse_recipe_response` (un întreg peste 64 de biți citit ca float).
+    """
+    if not isinstance(data, dict):
+        return False
+    if any(_lossy(data.get(key)) for key in ('servings', 'prep_time_minutes', 'cook_time_minutes', 'difficulty')):
+        return True
+    ingredients = data.get('ingredients')
+    if isinstance(ingredients, list):
+        for ing in ingredients:
+            if isinstance(ing, dict) and _lossy(ing.get('quantity')):
+                return True
+    instructions = data.get('instructions')
+    if isinstance(instructions, list):
+        for step in instructions:
+            if isinstance(step, dict):
+                if _lossy(step.get('time_minutes')) or _lossy(step.get('temperature_c')):
+                    return True
+            elif not isinstance(step, str):
+                return True
+    return False
+
+
+def loads(text):
+    """
+    Decodează JSON-ul unei rețete: prin `orjson` când e disponibil, cu revenire la `json`
+    unde rezultatul ar putea diferi (JSON respins de orjson, întregi peste 64 de biți).
+    """
+    if orjson is not None:
+        try:
+            data = orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+        else:
+            if not _orjson_mismatch(data):
+                return data
+    return json.loads(text)
+
+
+def extract_json_text(response_text):
+    """Textul răspunsului fără spații și fără gardul ```json ... ``` (dacă începe cu el)."""
+    json_text = response_text.strip()
+    if json_text.startswith('```'):
+        json_text = json_text[_FENCE_OPEN_RE.match(json_text).end():].strip()
+        if json_text.endswith('```'):
+            json_text = json_text[:-3].strip()
+    return json_text
+
+
+def _format_quantity(quantity):
+    """Cantitatea ca text: 200.0 -> "200", 1.5 -> "1.5", "1/2" -> "1/2"."""
+    kind = type(quantity)
+    if kind is int:
+        return str(quantity)
+    if kind is float:
+        return str(int(quantity)) if quantity.is_integer() else str(quantity)
+    try:
+        return str(int(quantity)) if float(quantity) == int(float(quantity)) else str(quantity)
+    except Exception:
+        return str(quantity)
+
+
+def _format_number(value):
+    """Durată/temperatură pentru afișare: 30.0 -> "30", 2.5 -> "2.5"."""
+    kind = type(value)
+    if kind is int:
+        return str(value)
+    if kind is float and not value.is_integer():
+        return str(value)
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def _ingredient_fields(ing):
+    """Un ingredient -> (linia afișată, item, quantity, unit, notes) sau None dacă nu e obiect/șir."""
+    if isinstance(ing, dict):
+        item = (ing.get('item') or '').strip()
+        quantity = ing.get('quantity')
+        unit = (ing.get('unit') or '').strip()
+        notes = (ing.get('notes') or '').strip()
+        if quantity in (None, ''):
+            qty_str = unit
+        else:
+            qty_str = f"{_format_quantity(quantity)} {unit}".strip() if unit else _format_quantity(quantity).strip()
+        line = ('• ' + (f"{qty_str} " if qty_str else '') + item).strip()
+        if notes:
+            line += f" ({notes})"
+        return line, item, quantity if isinstance(quantity, (int, float)) else None, unit, notes
+    if isinstance(ing, str):
+        item = ing.strip()
+        return f"• {item}", item, None, '', ''
+    return None
+
+
+def ingredients_to_strings(ingredients):
+    """
+    Normalizează lista de ingrediente (din obiecte sau șiruri) în șiruri; nu inventează cantități.
+
+    Converteste ingredientele din format JSON (dict cu item, quantity, unit, notes)
+    în linii text formatate (ex: "• 200 g roșii (coapte)").
+    """
+    if not isinstance(ingredients, list):
+        return []
+    return [fields[0] for fields in map(_ingredient_fields, ingredients) if fields]
+
+
+def _ingredient_detail(fields):
+    return {'item': fields[1], 'quantity': fields[2], 'unit': fields[3], 'notes': fields[4]}
+
+
+def ingredient_details(ingredients):
+    """
+    Ingredientele structurate (item, quantity, unit, notes), în aceeași ordine cu liniile
+    din `ingredients_to_strings`; se salvează în `recipe_ingredients`.
+    """
+    if not isinstance(ingredients, list):
+        return []
+    return [_ingredient_detail(fields) for fields in map(_ingredient_fields, ingredients) if fields]
+
+
+def _step_entry(step_obj):
+    """Un pas -> (linia afișată, detaliile structurate: text, time_minutes, temperature_c)."""
+    if isinstance(step_obj, dict):
+        # Nu adăugăm prefix numeric; UI-ul se ocupă de numerotare
+        text = (step_obj.get('text') or '').strip()
+        time_val = step_obj.get('time_minutes')
+        temp_val = step_obj.get('temperature_c')
+        if not isinstance(time_val, (int, float)):
+            time_val = None
+        if not isinstance(temp_val, (int, float)):
+            temp_val = None
+        if time_val is None and temp_val is None:
+            line = text
+        elif temp_val is None:
+            line = f"{text} (~{_format_number(time_val)} min)".strip()
+        elif time_val is None:
+            line = f"{text} ({_format_number(temp_val)}°C)".strip()
+        else:
+            line = f"{text} (~{_format_number(time_val)} min | {_format_number(temp_val)}°C)".strip()
+        return line, {'text': text, 'time_minutes': time_val, 'temperature_c': temp_val}
+    text = str(step_obj)
+    return text, {'text': text, 'time_minutes': None, 'temperature_c': None}
+
+
+def instruction_to_string(step_obj):
+    """Formatează un pas (dict cu text, time_minutes, temperature_c) ca linie de afișare."""
+    return _step_entry(step_obj)[0]
+
+
+def step_details(instructions):
+    """Pașii structurați (text, time_minutes, temperature_c), în ordinea liniilor afișate."""
+    return [_step_entry(step_obj)[1] for step_obj in instructions]
+
+
+def _int_or_none(value):
+    try:
+        return int(value) if value is not None else None
+    except Exception:
+        return None
+
+
+def _decode_response(response_text, strict):
+    """Obiectul JSON din răspuns sau None (avertismentul e deja scris în log)."""
+    if strict:
+        try:
+            return loads(response_text)
+        except ValueError as e:
+            logger.warning("Invalid JSON in AI response | error=%s preview=%s", e, response_text[:200].replace('\n', ' '))
+            return None
+    json_text = extract_json_text(response_text)
+    try:
+        return loads(json_text)
+    except ValueError:
+        # Text în jurul obiectului: de la prima acoladă la ultima
+        start = json_text.find('{')
+        end = json_text.rfind('}')
+        if start == -1 or end <= start:
+            logger.warning("JSON not found in AI response preview=%s", json_text[:200].replace('\n', ' '))
+            return None
+        try:
+            return loads(json_text[start:end + 1])
+        except ValueError as e:
+            logger.warning("Invalid JSON in AI response | error=%s preview=%s", e, json_text[:200].replace('\n', ' '))
+            return None
+
+
+def parse_recipe_response(response_text, original_ingredients=None, strict=False):
+    """
+    Parsează STRICT JSON-ul din răspunsul AI.
+
+    Extrage JSON din răspunsul Gemini (care poate conține markdown ```json```),
+    validează structura și formatează ingredientele/instrucțiunile pentru afișare.
+    Cu `strict=True` (răspuns cerut cu `responseMimeType: application/json`, vezi prompts.py)
+    textul e decodat direct, fără căutarea obiectului în gard sau în text.
+
+    Returns:
+        dict sau None: rețeta structurată cu toate câmpurile, sau None la eroare de parsare
+    """
+    try:
+        data = _decode_response(response_text, strict)
+        if data is None:
+            return None
+
+        if not isinstance(data, dict):
+            logger.warning("AI response is not a JSON object")
+            return None
+
+        servings = _int_or_none(data.get('servings'))
+        prep_time = _int_or_none(data.get('prep_time_minutes'))
+        cook_time = _int_or_none(data.get('cook_time_minutes'))
+        ingredients = data.get('ingredients') or []
+        instructions = data.get('instructions') or []
+
+        ingredient_fields = [fields for fields in map(_ingredient_fields, ingredients) if fields] if isinstance(ingredients, list) else []
+        step_entries = [_step_entry(step) for step in instructions]
+        parsed = {
+            'title': (data.get('title') or '').strip() or None,
+            'ingredients': [fields[0] for fields in ingredient_fields],
+            'ingredient_items': [fields[1] for fields in ingredient_fields],
+            'ingredient_details': [_ingredient_detail(fields) for fields in ingredient_fields],
+            'instructions': [line for line, _ in step_entries],
+            'steps': [detail for _, detail in step_entries],
+            'difficulty': int(data.get('difficulty') or 3),
+            'wine_pairing': (data.get('wine_pairing') or '').strip(),
+            'servings': servings,
+            'prep_time_minutes': prep_time,
+            'cook_time_minutes': cook_time,
+            'total_time_minutes': (prep_time or 0) + (cook_time or 0) if (prep_time or cook_time) else None
+        }
+        logger.debug("Parsed recipe keys: %s", list(parsed.keys()))
+        return parsed
+    except Exception:
+        logger.exception("Error while parsing AI response")
+        return None
@@ -0,0 +1,268 @@
+"""
+recipe_store.py - Stocarea structurată a rețetelor salvate
+
+O rețetă salvată are:
+- un rând în `recipes` (titlu, dificultate, porții, timpi, proprietar, plus textul
+  ingredientelor/pașilor folosit de indexul full-text)
+- câte un rând per ingredient în `recipe_ingredients` (item, cantitate, unitate, note)
+- câte un rând per pas în `recipe_steps` (text, durată în minute, temperatură)
+
+Rutele citesc doar coloanele de care au nevoie; pagina de detalii primește
+duratele pașilor ca numere (pentru timere), nu doar textul afișat.
+"""
+import re
+
+import ingredient_index
+import near_duplicates
+from generation_cache import strip_diacritics
+
+# Câte ingrediente apar pe cardurile din galerie
+GALLERY_PREVIEW_INGREDIENTS = 3
+
+# Sufixul adăugat la afișarea pașilor: "Coace (~30 min | 200°C)"
+_STEP_EXTRAS_RE = re.compile(
+    r"\s*\((?:~(?P<time>\d+(?:\.\d+)?) min)?(?: \| )?(?:(?P<temp>\d+(?:\.\d+)?)°C)?\)\s*$"
+)
+_BULLET_RE = re.compile(r"^[•\-\*]\s*")
+
+
+def ingredients_preview(lines):
+    """Primele ingrediente (pentru cardurile din galerie), câte unul pe linie."""
+    return '\n'.join(lines[:GALLERY_PREVIEW_INGREDIENTS])
+
+
+def normalize_title(title):
+    """Titlu în litere mici, fără diacritice - pentru filtrarea din galerie."""
+    return strip_diacritics((title or '').lower())
+
+
+def _number(value):
+    """Număr (int dacă e întreg) sau None pentru valori lipsă/nenumerice."""
+    if value in (None, ''):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else number
+
+
+def parse_step_line(line):
+    """Pas afișat -> (text, minute, °C); folosit pentru rețetele salvate doar ca text."""
+    match = _STEP_EXTRAS_RE.search(line or '')
+    if not match or not (match.group('time') or match.group('temp')):
+        return (line or '').strip(), None, None
+    return line[:match.start()].strip(), _number(match.group('time')), _number(match.group('temp'))
+
+
+def ingredient_rows(lines, details=None):
+    """
+    Rândurile pentru `recipe_ingredients`: (position, item, quantity, unit, notes, display).
+
+    `details` sunt obiectele din JSON-ul modelului (item, quantity, unit, notes), în
+    aceeași ordine cu `lines`; fără ele item-ul e linia afișată fără bullet.
+    """
+    details = details if details and len(details) == len(lines) else [None] * len(lines)
+    rows = []
+    for position, (line, detail) in enumerate(zip(lines, details)):
+        if isinstance(detail, dict) and (detail.get('item') or '').strip():
+            rows.append((
+                position,
+                detail['item'].strip(),
+                _number(detail.get('quantity')),
+                (detail.get('unit') or '').strip() or None,
+                (detail.get('notes') or '').strip() or None,
+                line,
+            ))
+        else:
+            rows.append((position, _BULLET_RE.sub('', line).strip(), None, None, None, line))
+    return rows
+
+
+def step_rows(lines, details=None):
+    """Rândurile pentru `recipe_steps`: (position, text, time_minutes, temperature_c, display)."""
+    details = details if details and len(details) == len(lines) else [None] * len(lines)
+    rows = []
+    for position, (line, detail) in enumerate(zip(lines, details)):
+        if isinstance(detail, dict) and (detail.get('text') or '').strip():
+            rows.append((
+                position,
+                detail['text'].strip(),
+                _number(detail.get('time_minutes')),
+                _number(detail.get('temperature_c')),
+                line,
+            ))
+        else:
+            text, minutes, temperature = parse_step_line(line)
+            rows.append((position, text, minutes, temperature, line))
+    return rows
+
+
+def store_structure(cursor, recipe_id, ingredients, steps):
+    """(Re)scrie ingredientele și pașii unei rețete (rânduri din `ingredient_rows` / `step_rows`)."""
+    cursor.execute('DELETE FROM recipe_ingredients WHERE recipe_id = ?', (recipe_id,))
+    cursor.execute('DELETE FROM recipe_steps WHERE recipe_id = ?', (recipe_id,))
+    cursor.executemany(
+        'INSERT INTO recipe_ingredients (recipe_id, position, item, quantity, unit, notes, display) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        [(recipe_id, *row) for row in ingredients]
+    )
+    cursor.executemany(
+        'INSERT INTO recipe_steps (recipe_id, position, text, time_minutes, temperature_c, display) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        [(recipe_id, *row) for row in steps]
+    )
+
+
+def ingredient_items(recipe, ingredients=None):
+    """Numele ingredientelor (câmpul `item`) sau, ca fallback, cele extrase din liniile afișate."""
+    if recipe.get('ingredient_items'):
+        return list(recipe['ingredient_items'])
+    if ingredients is None:
+        ingredients = ingredient_rows(list(recipe.get('ingredients') or []), recipe.get('ingredient_details'))
+    return [row[1] for row in ingredients]
+
+
+def insert_recipe(cursor, recipe, user_id=None):
+    """
+    Salvează o rețetă (dict-ul trimis de pagina de rezultat) în toate tabelele, inclusiv
+    indexul de ingrediente și amprentele de similaritate. Se apelează într-o tranzacție deschisă de apelant.
+
+    Returns:
+        int: id-ul rețetei
+    """
+    lines = list(recipe['ingredients'])
+    instructions = list(recipe['instructions'])
+    ingredients = ingredient_rows(lines, recipe.get('ingredient_details'))
+    steps = step_rows(instructions, recipe.get('steps'))
+
+    cursor.execute('''
+        INSERT INTO recipes (title, ingredients, instructions, difficulty_rating, wine_pairing,
+                             ingredients_preview, title_norm, user_id, servings,
+                             prep_time_minutes, cook_time_minutes, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ''', (
+        recipe['title'],
+        '\n'.join(lines),
+        '\n'.join(instructions),
+        recipe['difficulty'],
+        recipe['wine_pairing'],
+        ingredients_preview(lines),
+        normalize_title(recipe['title']),
+        user_id,
+        _number(recipe.get('servings')),
+        _number(recipe.get('prep_time_minutes')),
+        _number(recipe.get('cook_time_minutes')),
+    ))
+    recipe_id = cursor.lastrowid
+    store_structure(cursor, recipe_id, ingredients, steps)
+    items = ingredient_items(recipe, ingredients)
+    ingredient_index.index_recipe(cursor, recipe_id, items)
+    near_duplicates.index_recipe(cursor, recipe_id, recipe['title'], items)
+    return recipe_id
+
+
+def insert_recipes(cursor, recipes, first_id, term_ids):
+    """
+    Varianta în lot a `insert_recipe` pentru importul bibliotecii (vezi library.py): id-uri
+    consecutive de la `first_id` și câte un `executemany` per tabel.
+
+    Pe lângă câmpurile lui `insert_recipe`, dict-urile pot avea `user_id`, `created_at`,
+    `updated_at` și `fingerprints` (amprentele exportate, refolosite în loc să fie recalculate).
+    `term_ids` e dicționarul de termeni al importului (vezi `ingredient_index.index_recipe_terms`).
+    Indexul full-text e actualizat de apelant, o singură dată la final.
+
+    Returns:
+        int: următorul id liber
+    """
+    recipe_rows, ingredient_rows_, step_rows_, recipe_terms, fingerprint_rows = [], [], [], [], []
+    for recipe_id, recipe in enumerate(recipes, start=first_id):
+        lines = list(recipe['ingredients'])
+        instructions = list(recipe['instructions'])
+        ingredients = ingredient_rows(lines, recipe.get('ingredient_details'))
+        items = ingredient_items(recipe, ingredients)
+        terms = ingredient_index.ingredient_terms(items)
+        recipe_rows.append((
+            recipe_id,
+            recipe['title'],
+            '\n'.join(lines),
+            '\n'.join(instructions),
+            recipe['difficulty'],
+            recipe.get('wine_pairing'),
+            ingredients_preview(lines),
+            normalize_title(recipe['title']),
+            recipe.get('user_id'),
+            _number(recipe.get('servings')),
+            _number(recipe.get('prep_time_minutes')),
+            _number(recipe.get('cook_time_minutes')),
+            recipe.get('created_at'),
+            recipe.get('updated_at'),
+            len(terms),
+        ))
+        ingredient_rows_.extend((recipe_id, *row) for row in ingredients)
+        step_rows_.extend((recipe_id, *row) for row in step_rows(instructions, recipe.get('steps')))
+        recipe_terms.append((recipe_id, terms))
+        fingerprint_rows.append((recipe_id, *(recipe.get('fingerprints') or near_duplicates.fingerprints(recipe['title'], items, terms))))
+
+    cursor.executemany('''
+        INSERT INTO recipes (id, title, ingredients, instructions, difficulty_rating, wine_pairing,
+                             ingredients_preview, title_norm, user_id, servings,
+                             prep_time_minutes, cook_time_minutes, created_at, updated_at, ingredient_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP), ?)
+    ''', recipe_rows)
+    cursor.executemany(
+        'INSERT INTO recipe_ingredients (recipe_id, position, item, quantity, unit, notes, display) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        ingredient_rows_
+    )
+    cursor.executemany(
+        'INSERT INTO recipe_steps (recipe_id, position, text, time_minutes, temperature_c, display) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        step_rows_
+    )
+    ingredient_index.index_recipe_terms(cursor, recipe_terms, term_ids)
+    near_duplicates.index_fingerprints(cursor, fingerprint_rows)
+    return first_id + len(recipe_rows)
+
+
+def load_recipe(conn, recipe_id):
+    """Rețeta completă pentru pagina de detalii sau None dacă nu există."""
+    row = conn.execute('''
+        SELECT id, title, difficulty_rating, wine_pairing, created_at, updated_at, user_id,
+               servings, prep_time_minutes, cook_time_minutes
+        FROM recipes WHERE id = ?
+    ''', (recipe_id,)).fetchone()
+    if not row:
+        return None
+
+    ingredients = conn.execute(
+        'SELECT item, quantity, unit, notes, display FROM recipe_ingredients WHERE recipe_id = ? ORDER BY position',
+        (recipe_id,)
+    ).fetchall()
+    steps = conn.execute(
+        'SELECT text, time_minutes, temperature_c, display FROM recipe_steps WHERE recipe_id = ? ORDER BY position',
+        (recipe_id,)
+    ).fetchall()
+    prep_time, cook_time = row['prep_time_minutes'], row['cook_time_minutes']
+    return {
+        'id': row['id'],
+        'title': row['title'],
+        'difficulty': row['difficulty_rating'],
+        'wine_pairing': row['wine_pairing'],
+        'created_at': row['created_at'],
+        'updated_at': row['updated_at'] or row['created_at'],
+        'user_id': row['user_id'],
+        'servings': row['servings'],
+        'prep_time_minutes': prep_time,
+        'cook_time_minutes': cook_time,
+        'total_time_minutes': (prep_time or 0) + (cook_time or 0) if (prep_time or cook_time) else None,
+        'ingredients': [ingredient['display'] for ingredient in ingredients],
+        'ingredient_details': [dict(ingredient, quantity=_number(ingredient['quantity'])) for ingredient in ingredients],
+        'instructions': [step['display'] for step in steps],
+        'steps': [{
+            'text': step['text'],
+            'time_minutes': _number(step['time_minutes']),
+            'temperature_c': _number(step['temperature_c']),
+            'display': step['display'],
+        } for step in steps],
+    }
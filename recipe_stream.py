@@ -0,0 +1,173 @@
+"""
+recipe_stream.py - Parser JSON incremental pentru răspunsurile Gemini în streaming
+
+Textul vine în bucăți (`streamGenerateContent`); parserul le primește pe rând
+și raportează imediat ce o valoare este completă:
+- ('field', cheie, valoare) pentru fiecare câmp de nivel superior (ex: title)
+- ('item', cheie, element) pentru fiecare element dintr-un array de nivel superior
+  (ex: fiecare ingredient / pas din instructions), înainte ca array-ul să se închidă
+
+Orice text înaintea primului `{` (ex: ```json) este ignorat. Fiecare caracter
+este scanat o singură dată, indiferent de numărul de bucăți.
+"""
+import json
+
+_WHITESPACE = ' \t\r\n'
+
+
+class IncrementalJSONParser:
+    """Scanner pentru un singur obiect JSON de nivel superior, alimentat bucată cu bucată."""
+
+    def __init__(self):
+        self.buffer = ''
+        self.done = False
+        self._pos = 0
+        self._started = False
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._expect_key = True
+        self._key = None
+        self._value_start = None
+        self._elem_start = None
+
+    def feed(self, chunk):
+        """Adaugă text și întoarce lista de evenimente completate de această bucată."""
+        events = []
+        if self.done or not chunk:
+            return events
+        self.buffer += chunk
+        buf = self.buffer
+        i = self._pos
+        end = len(buf)
+        while i < end and not self.done:
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1 and self._expect_key:
+                        self._key = json.loads(buf[self._string_start:i + 1])
+                i += 1
+                continue
+
+            if not self._started:
+                if c == '{':
+                    self._started = True
+                    self._stack.append('{')
+                i += 1
+                continue
+
+            if c in _WHITESPACE:
+                i += 1
+                continue
+
+            depth = len(self._stack)
+            if depth == 1:
+                self._scan_top_level(c, i, events)
+            else:
+                self._scan_nested(c, i, depth, events)
+            i += 1
+        self._pos = i
+        return events
+
+    def _scan_top_level(self, c, i, events):
+        """Caracter în obiectul de nivel superior (chei, `:` și începutul valorilor)."""
+        if c == '"':
+            self._in_string = True
+            self._string_start = i
+            if not self._expect_key and self._value_start is None:
+                self._value_start = i
+            return
+        if c == ':':
+            self._expect_key = False
+            self._value_start = None
+            return
+        if c in ',}':
+            self._finish_scalar_value(i, events)
+            self._expect_key = True
+            if c == '}':
+                self._stack.pop()
+                self.done = True
+            return
+        if not self._expect_key and self._value_start is None:
+            self._value_start = i
+        if c in '{[':
+            self._stack.append(c)
+            self._elem_start = None
+
+    def _scan_nested(self, c, i, depth, events):
+        """Caracter în interiorul unei valori compuse (obiect/array) de nivel superior."""
+        in_top_array = self._stack[1] == '['
+        if c == '"':
+            self._in_string = True
+            self._string_start = i
+            if depth == 2 and in_top_array and self._elem_start is None:
+                self._elem_start = i
+            return
+        if c in '{[':
+            if depth == 2 and in_top_array and self._elem_start is None:
+                self._elem_start = i
+            self._stack.append(c)
+            return
+        if c in '}]':
+            if depth == 2 and in_top_array and self._elem_start is not None:
+                # Element scalar închis de `]`
+                self._emit_item(self.buffer[self._elem_start:i], events)
+            self._stack.pop()
+            depth -= 1
+            if depth == 2 and in_top_array and self._elem_start is not None:
+                self._emit_item(self.buffer[self._elem_start:i + 1], events)
+            elif depth == 1:
+                self._emit_field(self.buffer[self._value_start:i + 1], events)
+                self._value_start = None
+            return
+        if depth == 2 and in_top_array:
+            if c == ',':
+                if self._elem_start is not None:
+                    self._emit_item(self.buffer[self._elem_start:i], events)
+            elif self._elem_start is None:
+                self._elem_start = i
+
+    def _finish_scalar_value(self, i, events):
+        if self._value_start is not None:
+            self._emit_field(self.buffer[self._value_start:i], events)
+            self._value_start = None
+
+    def _emit_field(self, raw, events):
+        try:
+            events.append(('field', self._key, json.loads(raw)))
+        except ValueError:
+            pass
+
+    def _emit_item(self, raw, events):
+        self._elem_start = None
+        try:
+            events.append(('item', self._key, json.loads(raw)))
+        except ValueError:
+            pass
+
+
+def chunk_text(chunk):
+    """Textul dintr-o bucată JSON a `streamGenerateContent` ('' dacă nu are conținut)."""
+    text = ''
+    try:
+        for part in chunk['candidates'][0]['content']['parts']:
+            text += part.get('text') or ''
+    except (KeyError, IndexError, TypeError):
+        pass
+    return text
+
+
+def iter_stream_text(chunks):
+    """
+    Extrage textul din bucățile JSON ale `streamGenerateContent`.
+
+    Returnează tupluri (text, chunk) - `chunk` e dict-ul complet (ex: pentru `usageMetadata`).
+    """
+    for chunk in chunks:
+        yield chunk_text(chunk), chunk
@@ -0,0 +1,104 @@
+"""
+search.py - Căutare full-text în rețetele salvate (SQLite FTS5)
+
+Tabelul virtual `recipes_fts` oglindește coloanele text din `recipes`
+(external content, fără duplicarea textului) și e ținut sincronizat prin
+triggere. Tokenizer-ul `unicode61 remove_diacritics 2` face ca "ciorba" să
+găsească "ciorbă" și "telina" să găsească "țelină"/"ţelină".
+
+Rezultatele sunt ordonate după BM25 (titlul cântărește cel mai mult). Tabelul,
+triggerele și ponderile BM25 sunt create de migrări (migrations.py).
+"""
+import logging
+import re
+
+from markupsafe import escape
+
+logger = logging.getLogger(__name__)
+
+# Marcaje interne pentru snippet (înlocuite cu <mark> după escaparea HTML)
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Triggerul de sincronizare la INSERT, ca în migrarea care a creat `recipes_fts`
+_INSERT_TRIGGER = '''
+    CREATE TRIGGER IF NOT EXISTS recipes_fts_insert AFTER INSERT ON recipes BEGIN
+        INSERT INTO recipes_fts(rowid, title, ingredients, instructions, wine_pairing)
+        VALUES (new.id, new.title, new.ingredients, new.instructions, new.wine_pairing);
+    END
+'''
+
+
+def suspend_insert_sync(cursor):
+    """Importul în lot: rețetele noi nu mai sunt indexate rând cu rând (vezi `resume_insert_sync`)."""
+    cursor.execute('DROP TRIGGER IF EXISTS recipes_fts_insert')
+
+
+def resume_insert_sync(cursor, first_id):
+    """Indexează într-un singur statement rețetele cu id >= `first_id` și recreează triggerul de INSERT."""
+    cursor.execute('''
+        INSERT INTO recipes_fts(rowid, title, ingredients, instructions, wine_pairing)
+        SELECT id, title, ingredients, instructions, wine_pairing FROM recipes WHERE id >= ?
+    ''', (first_id,))
+    cursor.execute(_INSERT_TRIGGER)
+
+
+def is_available(conn):
+    """True dacă tabelul `recipes_fts` există (creat de migrări pe un SQLite cu FTS5)."""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recipes_fts'"
+    ).fetchone() is not None
+
+
+def build_match_query(text):
+    """
+    Transformă textul introdus de utilizator într-o interogare FTS5 sigură.
+
+    Fiecare cuvânt devine un termen cu prefix ("pui"*), toate obligatorii (AND);
+    operatorii FTS5 din input nu sunt interpretați. Întoarce '' dacă nu există cuvinte.
+    """
+    tokens = _TOKEN_RE.findall(text or '')
+    return ' '.join(f'"{token}"*' for token in tokens[:16])
+
+
+def _render_snippet(raw):
+    """Escapează HTML-ul din snippet și transformă marcajele în <mark>."""
+    html = str(escape(raw or ''))
+    return html.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+
+def search_recipes(conn, text, page=1, per_page=20):
+    """
+    Căutare BM25 cu snippet-uri, paginată.
+
+    Returns:
+        (listă de rezultate, există pagina următoare)
+    """
+    match = build_match_query(text)
+    if not match:
+        return [], False
+    offset = (max(1, page) - 1) * per_page
+    rows = conn.execute('''
+        SELECT r.id, r.title, r.difficulty_rating, r.created_at, hits.snippet, hits.rank
+        FROM (
+            SELECT rowid, rank, snippet(recipes_fts, -1, ?, ?, '…', 12) AS snippet
+            FROM recipes_fts
+            WHERE recipes_fts MATCH ?
+            ORDER BY rank
+            LIMIT ? OFFSET ?
+        ) AS hits
+        JOIN recipes r ON r.id = hits.rowid
+        ORDER BY hits.rank
+    ''', (_MARK_START, _MARK_END, match, per_page + 1, offset)).fetchall()
+
+    results = [{
+        'id': row[0],
+        'title': row[1],
+        'difficulty': row[2],
+        'created_at': row[3],
+        'snippet': _render_snippet(row[4]),
+        'score': row[5],
+    } for row in rows[:per_page]]
+    return results, len(rows) > per_page
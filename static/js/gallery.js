@@ -1,37 +1,42 @@
 /**
  * gallery.js - Logică pentru pagina de galerie (listă rețete salvate)
- * 
+ *
  * Funcționalități:
- * - Filtrare rețete după text (căutare în titlu)
- * - Filtrare după dificultate (1-5 stele)
+ * - Filtrare pe server după text (căutare full-text: titlu, ingrediente, instrucțiuni) și dificultate (1-5 stele), prin /api/gallery
+ * - Infinite scroll: paginile următoare se încarcă la derulare (cursor keyset)
  * - Confirmare ștergere cu modal
  */
 
-// ==================== DATE GLOBALE ====================
-// Array cu toate rețetele și referințe la elementele DOM
-var recipesData = [];
+// ==================== STARE ====================
+// Cursorul paginii următoare (gol = nu mai sunt rețete) și request-ul în curs
+var nextCursor = '';
+var loadingPage = false;
+var requestSeq = 0;
+var scrollObserver = null;
+var FILTER_DEBOUNCE_MS = 300;
 
 // ==================== INIȚIALIZARE LA DOM READY ====================
 document.addEventListener('DOMContentLoaded', function() {
-    // Colectează toate cardurile de rețete și extrage datele relevante
-    var recipeCards = document.querySelectorAll('.recipe-card');
-    recipesData = Array.from(recipeCards).map(function(card) {
-        return {
-            element: card,                                      // Referință DOM
-            difficulty: parseInt(card.dataset.difficulty),      // Dificultate 1-5
-            title: card.dataset.title                           // Titlu lowercase pentru căutare
-        };
-    });
+    var recipesGrid = document.getElementById('recipesGrid');
+    if (!recipesGrid) return;
+    nextCursor = recipesGrid.dataset.nextCursor || '';
 
     initializeFilters();
+    initializeInfiniteScroll();
 
-    // Atașează event listeners pe butoanele de ștergere
-    document.querySelectorAll('.delete-btn').forEach(function(btn){
-        btn.addEventListener('click', function() {
-            var id = this.getAttribute('data-id');
-            var title = this.getAttribute('data-title');
-            confirmDelete(id, title);
-        });
+    // Ștergere și efecte hover prin delegare: funcționează și pentru cardurile încărcate ulterior
+    recipesGrid.addEventListener('click', function(e) {
+        var btn = e.target.closest('.delete-btn');
+        if (!btn) return;
+        confirmDelete(btn.getAttribute('data-id'), btn.getAttribute('data-title'));
+    });
+    recipesGrid.addEventListener('mouseover', function(e) {
+        var card = e.target.closest('.recipe-item');
+        if (card) card.style.borderColor = 'var(--primary-color)';
+    });
+    recipesGrid.addEventListener('mouseout', function(e) {
+        var card = e.target.closest('.recipe-item');
+        if (card && !card.contains(e.relatedTarget)) card.style.borderColor = '';
     });
 });
 
@@ -42,48 +47,104 @@ document.addEventListener('DOMContentLoaded', function() {
 function initializeFilters() {
     var searchInput = document.getElementById('searchInput');
     var difficultyFilter = document.getElementById('difficultyFilter');
+    var debounceTimer = null;
 
-    if (searchInput) searchInput.addEventListener('input', filterRecipes);
+    if (searchInput) searchInput.addEventListener('input', function() {
+        clearTimeout(debounceTimer);
+        debounceTimer = setTimeout(filterRecipes, FILTER_DEBOUNCE_MS);
+    });
     if (difficultyFilter) difficultyFilter.addEventListener('change', filterRecipes);
 }
 
-// ==================== FILTRARE ====================
 /**
- * Filtrează rețetele conform criteriilor selectate
- * Ascunde/arată cardurile corespunzătoare
+ * Parametrii curenți de filtrare (pentru /api/gallery și URL-ul paginii)
  */
-function filterRecipes() {
-    var searchTerm = (document.getElementById('searchInput')?.value || '').toLowerCase();
+function currentFilterParams() {
+    var params = new URLSearchParams();
+    var searchTerm = (document.getElementById('searchInput')?.value || '').trim();
     var difficultyValue = document.getElementById('difficultyFilter')?.value || '';
+    if (searchTerm) params.set('q', searchTerm);
+    if (difficultyValue) params.set('difficulty', difficultyValue);
+    return params;
+}
 
-    // FILTRARE
-    var filteredRecipes = recipesData.filter(function(recipe){
-        var matchesSearch = recipe.title.includes(searchTerm);
-        var matchesDifficulty = !difficultyValue || (recipe.difficulty + '') === difficultyValue;
-        return matchesSearch && matchesDifficulty;
-    });
+// ==================== ÎNCĂRCARE PAGINI ====================
+/**
+ * Cere o pagină de la server și o adaugă în grid (sau înlocuiește conținutul)
+ * @param {string} cursor - cursorul paginii (gol pentru prima pagină)
+ * @param {boolean} replace - true când filtrele s-au schimbat
+ */
+function loadPage(cursor, replace) {
+    var params = currentFilterParams();
+    if (cursor) params.set('cursor', cursor);
+    var seq = ++requestSeq;
+    loadingPage = true;
 
-    // AFIȘARE REZULTATE
-    var recipesGrid = document.getElementById('recipesGrid');
+    return fetch(document.getElementById('recipesGrid').dataset.apiUrl + '?' + params.toString(), {
+        headers: { 'Accept': 'application/json' }
+    })
+        .then(function(response) { return response.json(); })
+        .then(function(page) {
+            // Un răspuns mai vechi (filtre schimbate între timp) este ignorat
+            if (seq !== requestSeq) return;
+            var recipesGrid = document.getElementById('recipesGrid');
+            if (replace) recipesGrid.innerHTML = '';
+            recipesGrid.insertAdjacentHTML('beforeend', page.html);
+            nextCursor = page.next_cursor || '';
+            updatePlaceholders();
+        })
+        .catch(function() {})
+        .finally(function() {
+            if (seq === requestSeq) loadingPage = false;
+        });
+}
+
+/**
+ * Arată santinela (mai sunt pagini) și mesajul "fără rezultate" după caz
+ */
+function updatePlaceholders() {
+    var sentinel = document.getElementById('gallerySentinel');
     var noResults = document.getElementById('noResults');
-    
-    if (recipesGrid && noResults) {
-        // Ascunde toate cardurile mai întâi
-        recipesData.forEach(function(recipe){ recipe.element.style.display = 'none'; });
-        
-        if (filteredRecipes.length > 0) {
-            // Arată doar cardurile filtrate
-            filteredRecipes.forEach(function(recipe){
-                recipe.element.style.display = 'block';
-            });
-            noResults.style.display = 'none';
-        } else {
-            // Mesaj "Nu am găsit nicio rețetă"
-            noResults.style.display = 'block';
-        }
+    var hasCards = !!document.querySelector('#recipesGrid .recipe-card');
+    if (sentinel) sentinel.style.display = nextCursor ? 'block' : 'none';
+    if (noResults) noResults.style.display = hasCards ? 'none' : 'block';
+
+    // Dacă santinela e încă vizibilă (pagină scurtă), re-observarea declanșează încărcarea următoarei
+    if (scrollObserver && sentinel && nextCursor) {
+        scrollObserver.unobserve(sentinel);
+        scrollObserver.observe(sentinel);
     }
 }
 
+// ==================== FILTRARE ====================
+/**
+ * Reîncarcă galeria de la prima pagină cu filtrele curente
+ * și păstrează filtrele în URL (link-uri partajabile, back/forward)
+ */
+function filterRecipes() {
+    var params = currentFilterParams().toString();
+    window.history.replaceState(null, '', window.location.pathname + (params ? '?' + params : ''));
+    loadPage('', true);
+}
+
+// ==================== INFINITE SCROLL ====================
+/**
+ * Încarcă pagina următoare când santinela de sub grid devine vizibilă
+ */
+function initializeInfiniteScroll() {
+    var sentinel = document.getElementById('gallerySentinel');
+    if (!sentinel || !window.IntersectionObserver) return;
+
+    scrollObserver = new IntersectionObserver(function(entries) {
+        entries.forEach(function(entry) {
+            if (entry.isIntersecting && nextCursor && !loadingPage) {
+                loadPage(nextCursor, false);
+            }
+        });
+    }, { rootMargin: '400px' });
+    scrollObserver.observe(sentinel);
+}
+
 // ==================== ȘTERGERE REȚETĂ ====================
 /**
  * Deschide modal-ul de confirmare ștergere
@@ -96,17 +157,3 @@ function confirmDelete(recipeId, recipeTitle) {
     var modal = new bootstrap.Modal(document.getElementById('deleteModal'));
     modal.show();
 }
-
-// ==================== EFECTE VIZUALE ====================
-// Hover effect pentru carduri - bordură albastră
-document.addEventListener('DOMContentLoaded', function() {
-    var cards = document.querySelectorAll('.recipe-item');
-    cards.forEach(function(card){
-        card.addEventListener('mouseenter', function(){ 
-            this.style.borderColor = 'var(--primary-color)'; 
-        });
-        card.addEventListener('mouseleave', function(){ 
-            this.style.borderColor = ''; 
-        });
-    });
-});
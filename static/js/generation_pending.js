@@ -0,0 +1,111 @@
+/**
+ * generation_pending.js - Pagina de așteptare pentru un job de generare
+ *
+ * Funcționalități:
+ * - Urmărește statusul job-ului prin SSE (dacă e activat) sau polling cu backoff
+ * - Afișează rețeta parțială (titlu, ingrediente, pași) pe măsură ce e generată
+ * - La final reîncarcă pagina: serverul randează rețeta (sau redirecționează cu eroare)
+ */
+
+// ==================== CONFIGURARE ====================
+var jobEl = document.getElementById('generationJob');
+var statusUrl = jobEl ? jobEl.dataset.statusUrl : null;
+var eventsUrl = jobEl ? jobEl.dataset.eventsUrl : null;
+var useSse = jobEl && jobEl.dataset.useSse === 'true' && !!window.EventSource;
+
+// Interval de polling: pornește de la 1s și crește treptat până la 3s
+// (revine la minim cât timp rețeta parțială avansează)
+var MIN_POLL_DELAY = 700;
+var pollDelay = 1000;
+var MAX_POLL_DELAY = 3000;
+var renderedPartial = '';
+
+/**
+ * Job terminat (reușit sau eșuat): pagina job-ului randează rezultatul
+ */
+function onJobFinished() {
+    window.location.reload();
+}
+
+// ==================== REȚETA PARȚIALĂ ====================
+/**
+ * Înlocuiește conținutul unei liste cu elementele date (textContent, fără HTML)
+ */
+function fillList(listEl, items, withIcon) {
+    listEl.textContent = '';
+    items.forEach(function(text) {
+        var li = document.createElement('li');
+        li.className = withIcon ? 'mb-2' : 'mb-3';
+        if (withIcon) {
+            var icon = document.createElement('i');
+            icon.className = 'fas fa-check-circle me-2';
+            li.appendChild(icon);
+        }
+        li.appendChild(document.createTextNode(text));
+        listEl.appendChild(li);
+    });
+}
+
+/**
+ * Randează rețeta parțială; întoarce true dacă s-a schimbat față de ultima randare
+ */
+function renderPartial(partial) {
+    if (!partial) return false;
+    var serialized = JSON.stringify(partial);
+    if (serialized === renderedPartial) return false;
+    renderedPartial = serialized;
+
+    document.getElementById('partialRecipe').style.display = 'block';
+    document.getElementById('partialTitle').textContent = partial.title || '...';
+    fillList(document.getElementById('partialIngredients'), partial.ingredients || [], true);
+    fillList(document.getElementById('partialInstructions'), partial.instructions || [], false);
+    return true;
+}
+
+// ==================== POLLING ====================
+function pollStatus() {
+    fetch(statusUrl, { headers: { 'Accept': 'application/json' } })
+        .then(function(response) { return response.json(); })
+        .then(function(job) {
+            if (job.status === 'done' || job.status === 'failed') {
+                onJobFinished();
+                return;
+            }
+            if (renderPartial(job.partial)) {
+                pollDelay = MIN_POLL_DELAY;
+            }
+            scheduleNextPoll();
+        })
+        .catch(scheduleNextPoll);
+}
+
+function scheduleNextPoll() {
+    setTimeout(pollStatus, pollDelay);
+    pollDelay = Math.min(MAX_POLL_DELAY, Math.round(pollDelay * 1.5));
+}
+
+// ==================== SSE ====================
+function subscribeToEvents() {
+    var source = new EventSource(eventsUrl);
+    source.addEventListener('partial', function(event) {
+        try { renderPartial(JSON.parse(event.data)); } catch (e) {}
+    });
+    source.addEventListener('done', function() {
+        source.close();
+        onJobFinished();
+    });
+    source.onerror = function() {
+        // Conexiunea SSE a căzut - continuăm cu polling
+        source.close();
+        scheduleNextPoll();
+    };
+}
+
+// ==================== INIȚIALIZARE ====================
+if (statusUrl) {
+    if (useSse) {
+        subscribeToEvents();
+    } else {
+        scheduleNextPoll();
+    }
+}
@@ -0,0 +1,64 @@
+/**
+ * recipe_detail.js - Pagina de detalii a unei rețete salvate
+ *
+ * Funcționalități:
+ * - Timer per pas, pe durata numerică salvată în `recipe_steps` (data-time-minutes)
+ * - Click pe un timer pornit îl oprește și îl resetează
+ */
+
+// ==================== TIMERE PAȘI ====================
+/**
+ * Formatează secundele rămase ca mm:ss
+ */
+function formatRemaining(seconds) {
+    var minutes = Math.floor(seconds / 60);
+    var rest = seconds % 60;
+    return minutes + ':' + (rest < 10 ? '0' : '') + rest;
+}
+
+/**
+ * Pornește sau oprește timerul unui pas
+ * @param {HTMLElement} btn - butonul timerului (în interiorul .instruction-item)
+ */
+function toggleStepTimer(btn) {
+    var step = btn.closest('.instruction-item');
+    var label = btn.querySelector('.step-timer-label');
+    var minutes = parseFloat(step.dataset.timeMinutes);
+    if (!minutes || !label) return;
+
+    if (btn._interval) {
+        clearInterval(btn._interval);
+        btn._interval = null;
+        btn.classList.remove('btn-primary', 'btn-success');
+        btn.classList.add('btn-outline-primary');
+        label.textContent = step.dataset.timeMinutes + ' min';
+        return;
+    }
+
+    var endsAt = Date.now() + Math.round(minutes * 60) * 1000;
+    btn.classList.remove('btn-outline-primary');
+    btn.classList.add('btn-primary');
+    var tick = function() {
+        var remaining = Math.max(0, Math.round((endsAt - Date.now()) / 1000));
+        label.textContent = formatRemaining(remaining);
+        if (remaining === 0) {
+            clearInterval(btn._interval);
+            btn._interval = null;
+            btn.classList.remove('btn-primary');
+            btn.classList.add('btn-success');
+            label.textContent = 'Gata!';
+        }
+    };
+    tick();
+    btn._interval = setInterval(tick, 1000);
+}
+
+// ==================== INIȚIALIZARE ====================
+document.addEventListener('DOMContentLoaded', function() {
+    var list = document.querySelector('.instructions-list');
+    if (!list) return;
+    list.addEventListener('click', function(e) {
+        var btn = e.target.closest('.step-timer-btn');
+        if (btn) toggleStepTimer(btn);
+    });
+});
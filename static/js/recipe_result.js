@@ -3,6 +3,7 @@
  * 
  * Funcționalități:
  * - Salvarea rețetei în baza de date (fetch la /save_recipe)
+ * - Confirmare când galeria are deja o rețetă aproape identică (409)
  * - Colectare date rețetă din DOM (evită JSON inline în HTML)
  */
 
@@ -15,13 +16,42 @@ var recipeData = (function collectRecipeFromDom() {
         var ingredients = Array.from(document.querySelectorAll('.ingredients-list ul li')).map(function(li){
             return li.textContent.trim();
         });
-        var instructions = Array.from(document.querySelectorAll('.instructions-list ol li')).map(function(li){
+        // Ingredientele și pașii structurați (din atributele data-*), salvați în tabele separate
+        var ingredientDetails = Array.from(document.querySelectorAll('.ingredients-list ul li')).map(function(li){
+            return {
+                item: li.dataset.item || '',
+                quantity: li.dataset.quantity === '' || li.dataset.quantity === undefined ? null : parseFloat(li.dataset.quantity),
+                unit: li.dataset.unit || '',
+                notes: li.dataset.notes || ''
+            };
+        });
+        var ingredientItems = ingredientDetails.map(function(d){ return d.item; }).filter(Boolean);
+        var instructionItems = Array.from(document.querySelectorAll('.instructions-list ol li'));
+        var instructions = instructionItems.map(function(li){
             return li.textContent.trim();
         });
+        var steps = instructionItems.map(function(li){
+            return {
+                text: li.dataset.text || '',
+                time_minutes: li.dataset.timeMinutes ? parseFloat(li.dataset.timeMinutes) : null,
+                temperature_c: li.dataset.temperatureC ? parseFloat(li.dataset.temperatureC) : null
+            };
+        });
+        var meta = document.getElementById('recipeMeta');
+        var metaNumber = function(name) {
+            var value = meta ? meta.dataset[name] : '';
+            return value ? parseInt(value, 10) : null;
+        };
         var difficultyText = document.querySelector('.mb-3 .text-muted')?.textContent || '';
         var difficulty = parseInt((difficultyText.match(/(\d+)/) || [0, 3])[1], 10) || 3;
         var wine = document.querySelector('.wine-pairing p')?.textContent.trim() || '';
-        return { title: title, ingredients: ingredients, instructions: instructions, difficulty: difficulty, wine_pairing: wine };
+        return {
+            title: title, ingredients: ingredients, instructions: instructions, difficulty: difficulty, wine_pairing: wine,
+            ingredient_items: ingredientItems, ingredient_details: ingredientDetails, steps: steps,
+            servings: metaNumber('servings'),
+            prep_time_minutes: metaNumber('prepTimeMinutes'),
+            cook_time_minutes: metaNumber('cookTimeMinutes')
+        };
     } catch (e) {
         return {};
     }
@@ -30,13 +60,15 @@ var recipeData = (function collectRecipeFromDom() {
 // ==================== SALVARE REȚETĂ ====================
 /**
  * Salvează rețeta în baza de date prin POST JSON la /save_recipe
- * La succes, redirecționează la galerie
+ * La succes, redirecționează la galerie; pentru un duplicat întreabă dacă se salvează oricum
+ * (altfel deschide rețeta existentă)
  */
-async function saveRecipe() {
+async function saveRecipe(saveAnyway) {
     var btn = document.getElementById('saveRecipeBtn');
     if (btn) {
         btn.disabled = true;
-        btn.dataset.original = btn.innerHTML;
+        // La reîncercarea după confirmare butonul arată deja "Salvez..."
+        btn.dataset.original = btn.dataset.original || btn.innerHTML;
         btn.innerHTML = '<span class="loading"></span> Salvez...';
     }
 
@@ -45,10 +77,18 @@ async function saveRecipe() {
         var response = await fetch('/save_recipe', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(recipeData)
+            body: JSON.stringify(saveAnyway === true ? Object.assign({ save_anyway: true }, recipeData) : recipeData)
         });
         var result = await response.json();
 
+        if (response.status === 409 && result && result.duplicate) {
+            if (confirm(result.message + '\n\nO salvez oricum? (Anulează deschide rețeta existentă)')) {
+                return saveRecipe(true);
+            }
+            window.location.href = result.duplicate.url;
+            return;
+        }
+
         if (result && result.success) {
             // La succes, redirecționează la galerie
             window.location.href = '/gallery';
@@ -0,0 +1,126 @@
+"""
+Limitarea încercărilor de autentificare (auth.LoginThrottle): pragul de blocare,
+expirarea ferestrei glisante și cheile separate per email și per IP.
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import auth  # noqa: E402
+import migrations  # noqa: E402
+
+
+class FakeClock:
+    """Înlocuiește modulul `time` din auth.py: ceasul de perete și cel monoton avansează împreună."""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class LoginThrottleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = os.path.join(self.tmp.name, 'auth.db')
+        migrations.migrate_database(self.db_path)
+        self.clock = FakeClock()
+        patcher = mock.patch.object(auth, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.throttle = auth.LoginThrottle(self.db_path, window=900)
+
+    def _attempts(self, key):
+        return self.throttle._connect().execute(
+            'SELECT COUNT(*) FROM login_attempts WHERE key = ?', (key,)).fetchone()[0]
+
+    def _login(self, email, ip='10.0.0.1'):
+        self.throttle.hit([(f'email:{email}', 3), (f'ip:{ip}', 5)])
+
+    def test_blocks_after_limit_and_does_not_record_refusals(self):
+        for _ in range(3):
+            self._login('ana@example.com')
+            self.clock.advance(10)
+        with self.assertRaises(auth.LoginThrottled) as blocked:
+            self._login('ana@example.com')
+        self.assertEqual(blocked.exception.key, 'email:ana@example.com')
+        # Prima încercare (acum 30 s) iese din fereastră peste 900 - 30 secunde
+        self.assertEqual(blocked.exception.retry_after, 870)
+        self.assertEqual(self._attempts('email:ana@example.com'), 3)
+        self.assertEqual(self._attempts('ip:10.0.0.1'), 3)
+
+    def test_sliding_window_expiry(self):
+        for _ in range(3):
+            self._login('ana@example.com')
+            self.clock.advance(100)
+        self.clock.advance(599)  # prima încercare e la 899 s în urmă
+        with self.assertRaises(auth.LoginThrottled) as blocked:
+            self._login('ana@example.com')
+        self.assertEqual(blocked.exception.retry_after, 1)
+
+        self.clock.advance(1)
+        self._login('ana@example.com')  # a ieșit doar prima încercare din fereastră
+        with self.assertRaises(auth.LoginThrottled) as blocked:
+            self._login('ana@example.com')
+        self.assertEqual(blocked.exception.retry_after, 100)
+
+        self.clock.advance(900)
+        self._login('ana@example.com')
+        # Curățarea periodică șterge încercările ieșite din fereastră
+        self.assertEqual(self._attempts('email:ana@example.com'), 1)
+
+    def test_email_and_ip_keys_are_counted_separately(self):
+        # Emailul blocat nu blochează alte conturi de pe același IP
+        for _ in range(3):
+            self._login('ana@example.com')
+        with self.assertRaises(auth.LoginThrottled):
+            self._login('ana@example.com')
+        self._login('ion@example.com')
+        self._login('ion@example.com', ip='10.0.0.2')
+
+        # Limita IP-ului prinde încercările pe conturi diferite; cea refuzată nu se numără pentru email
+        self._login('maria@example.com')
+        with self.assertRaises(auth.LoginThrottled) as blocked:
+            self._login('maria@example.com')
+        self.assertEqual(blocked.exception.key, 'ip:10.0.0.1')
+        self.assertEqual(self._attempts('ip:10.0.0.1'), 5)
+        self.assertEqual(self._attempts('email:maria@example.com'), 1)
+        self._login('maria@example.com', ip='10.0.0.3')
+
+    def test_blocked_key_is_refused_from_memory_until_reset(self):
+        for _ in range(3):
+            self._login('ana@example.com')
+        with self.assertRaises(auth.LoginThrottled):
+            self._login('ana@example.com')
+
+        conn = self.throttle._connect()
+        with conn:
+            conn.execute('DELETE FROM login_attempts')
+        with self.assertRaises(auth.LoginThrottled):
+            self._login('ana@example.com')
+
+        self.throttle.reset('email:ana@example.com')
+        self._login('ana@example.com')
+
+    def test_disabled_throttle_never_blocks(self):
+        throttle = auth.LoginThrottle(self.db_path, enabled=False)
+        for _ in range(10):
+            throttle.hit([('email:ana@example.com', 1)])
+        self.assertEqual(self._attempts('email:ana@example.com'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Cache-ul de generări (generation_cache.py): cheia canonică a ingredientelor,
+expirarea intrărilor și nivelul SQLite partajat între workeri.
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generation_cache  # noqa: E402
+import migrations  # noqa: E402
+
+RECIPE = {'title': 'Tocăniță de pui', 'ingredients': ['1 kg pui', '3 cartofi'], 'instructions': ['Fierbe.'],
+          'difficulty': 2}
+
+
+class FakeClock:
+    """Înlocuiește modulul `time` din generation_cache.py."""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self):
+        return self.now
+
+
+class CacheKeyTest(unittest.TestCase):
+
+    def test_equivalent_ingredient_lists_share_key(self):
+        key = generation_cache.cache_key('Pui, cartofi, usturoi')
+        for text in ('usturoi,pui,cartofi,cartofi', 'cartofi și Usturoi; pui', ' PUI \n cartofi\n- usturoi. '):
+            with self.subTest(text=text):
+                self.assertEqual(generation_cache.cache_key(text), key)
+        self.assertEqual(generation_cache.normalize_ingredients('Pui, cartofi, usturoi'), 'cartofi,pui,usturoi')
+        self.assertNotEqual(generation_cache.cache_key('pui, cartofi'), key)
+
+
+class GenerationCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = os.path.join(self.tmp.name, 'cache.db')
+        migrations.migrate_database(self.db_path)
+        self.clock = FakeClock()
+        patcher = mock.patch.object(generation_cache, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _cache(self, **kwargs):
+        return generation_cache.GenerationCache(self.db_path, **kwargs)
+
+    def test_hit_for_reordered_ingredients(self):
+        cache = self._cache()
+        cache.set('Pui, cartofi, usturoi', RECIPE)
+        self.assertEqual(cache.get('usturoi,pui,cartofi,cartofi'), RECIPE)
+        self.assertIsNone(cache.get('pui, cartofi'))
+        self.assertEqual((cache.stats()['memory_hits'], cache.stats()['misses']), (1, 1))
+
+    def test_expired_entries_miss_in_both_levels(self):
+        cache = self._cache(ttl_seconds=60)
+        cache.set('pui, cartofi', RECIPE)
+        self.clock.now += 59
+        self.assertEqual(cache.get('pui, cartofi'), RECIPE)
+        self.assertIsNotNone(cache.expires_at('pui, cartofi'))
+
+        self.clock.now += 1
+        self.assertIsNone(cache.get('pui, cartofi'))
+        self.assertIsNone(self._cache().get('pui, cartofi'))
+        self.assertIsNone(cache.expires_at('pui, cartofi'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_second_instance_sharing_database_hits(self):
+        writer, reader = self._cache(), self._cache()
+        writer.set('pui, cartofi, usturoi', RECIPE)
+        self.assertEqual(reader.get('Usturoi, Pui, cartofi'), RECIPE)
+        self.assertEqual(reader.get('usturoi, pui, cartofi'), RECIPE)
+        stats = reader.stats()
+        self.assertEqual((stats['db_hits'], stats['memory_hits'], stats['size']), (1, 1, 1))
+
+        # Intrarea întoarsă e o copie: modificarea ei nu strică cache-ul
+        reader.get('pui, cartofi, usturoi')['title'] = 'altceva'
+        self.assertEqual(reader.get('pui, cartofi, usturoi')['title'], RECIPE['title'])
+
+    def test_memory_level_is_bounded_lru(self):
+        cache = self._cache(max_entries=2)
+        for text in ('pui', 'vita', 'peste'):
+            cache.set(text, dict(RECIPE, title=text))
+        self.assertEqual(cache.stats()['size'], 2)
+        self.assertEqual(cache.get('pui')['title'], 'pui')  # evacuată din memorie, regăsită în SQLite
+        self.assertEqual(cache.stats()['db_hits'], 1)
+
+    def test_disabled_cache_stores_nothing(self):
+        cache = self._cache(enabled=False)
+        cache.set('pui', RECIPE)
+        self.assertIsNone(cache.get('pui'))
+        self.assertIsNone(self._cache().get('pui'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Decontarea job-urilor de generare (jobs.py): fiecare job își confirmă sau restituie
+rezervarea exact o dată, inclusiv la erori înainte de runner și la expirare.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jobs  # noqa: E402
+import migrations  # noqa: E402
+
+
+class GenerationJobSettleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'jobs.db')
+        migrations.migrate_database(self.db_path)
+        self.settled = []
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.tmp.cleanup()
+
+    def _queue(self, runner, job_timeout=180):
+        queue = jobs.GenerationJobQueue(self.db_path, runner, max_workers=1, job_timeout=job_timeout,
+                                        settle=lambda job, context, ok: self.settled.append((job['id'], context, ok)))
+        self.addCleanup(queue.shutdown, True)
+        return queue
+
+    def _wait(self, queue, job_id):
+        list(queue.as_completed([job_id], timeout=5))
+        return queue.get(job_id)
+
+    def test_success_and_runner_failure_settle_once(self):
+        def runner(job_id, ingredients, user_id, **context):
+            if ingredients == 'fail':
+                raise jobs.GenerationError('nu')
+            return {'title': ingredients}
+
+        queue = self._queue(runner)
+        ok = queue.submit(1, 'pui', reservation='r1')
+        failed = queue.submit(1, 'fail', reservation='r2')
+        self.assertEqual(self._wait(queue, ok)['status'], jobs.STATUS_DONE)
+        self.assertEqual(self._wait(queue, failed)['error'], 'nu')
+        self.assertEqual(sorted(self.settled), sorted([(ok, {'reservation': 'r1'}, True),
+                                                       (failed, {'reservation': 'r2'}, False)]))
+
+    def test_failure_before_runner_refunds(self):
+        runner = mock.Mock()
+        queue = self._queue(runner)
+        original = queue._transition
+
+        def transition(job_id, statuses, **fields):
+            if fields.get('status') == jobs.STATUS_RUNNING:
+                raise RuntimeError('database is locked')
+            return original(job_id, statuses, **fields)
+
+        with mock.patch.object(queue, '_transition', side_effect=transition):
+            job_id = queue.submit(1, 'pui', reservation='r1')
+            job = self._wait(queue, job_id)
+        runner.assert_not_called()
+        self.assertEqual(job['status'], jobs.STATUS_FAILED)
+        self.assertEqual(self.settled, [(job_id, {'reservation': 'r1'}, False)])
+
+    def test_stale_job_expires_once_and_late_result_is_ignored(self):
+        def runner(job_id, ingredients, user_id, **context):
+            self.release.wait(5)
+            return {'title': ingredients}
+
+        queue = self._queue(runner, job_timeout=60)
+        job_id = queue.submit(1, 'pui', reservation='r1')
+        with mock.patch.object(jobs.time, 'time', return_value=time.time() + 61):
+            self.assertEqual(queue.get(job_id)['status'], jobs.STATUS_FAILED)
+            self.assertEqual(queue.get(job_id)['status'], jobs.STATUS_FAILED)
+        self.release.set()
+        self.assertEqual(self._wait(queue, job_id)['status'], jobs.STATUS_FAILED)
+        self.assertEqual(self.settled, [(job_id, {'reservation': 'r1'}, False)])
+
+    def test_sweep_expires_jobs_of_restarted_worker(self):
+        # Job rămas "running" de la un worker repornit: fără context în acest worker
+        conn = jobs.db.get_connection(self.db_path)
+        with conn:
+            conn.execute("INSERT INTO generation_jobs (id, user_id, ingredients, status, created_at) "
+                         "VALUES ('lost', 7, 'linte', 'running', ?)", (time.time() - 600,))
+        queue = self._queue(lambda *args, **context: {'title': 'ok'}, job_timeout=60)
+        self._wait(queue, queue.submit(1, 'pui', reservation='r1'))
+        self.assertEqual(queue.get('lost')['status'], jobs.STATUS_FAILED)
+        lost = [(job, context, ok) for job, context, ok in self.settled if job == 'lost']
+        self.assertEqual(lost, [('lost', {}, False)])
+
+
+if __name__ == '__main__':
+    unittest.main()
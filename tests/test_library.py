@@ -0,0 +1,131 @@
+"""
+Exportul și importul bibliotecii (library.py): un export importat într-o bază nouă
+reproduce rețetele, ingredientele, pașii și căutarea full-text; o linie invalidă
+anulează tot importul.
+"""
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+import ingredient_index  # noqa: E402
+import library  # noqa: E402
+import migrations  # noqa: E402
+import recipe_store  # noqa: E402
+import search  # noqa: E402
+
+RECIPES = [
+    {
+        'title': 'Ciorbă de perișoare',
+        'ingredients': ['500 g carne tocată de porc', '2 morcovi', '100 g orez'],
+        'instructions': ['1. Formează perișoarele.', '2. Fierbe 40 minute la 95°C.'],
+        'ingredient_details': [
+            {'item': 'carne tocată de porc', 'quantity': 500, 'unit': 'g', 'notes': ''},
+            {'item': 'morcovi', 'quantity': 2, 'unit': 'buc', 'notes': 'rași'},
+            {'item': 'orez', 'quantity': 100, 'unit': 'g', 'notes': ''},
+        ],
+        'steps': [
+            {'text': 'Formează perișoarele.', 'time_minutes': None, 'temperature_c': None},
+            {'text': 'Fierbe.', 'time_minutes': 40, 'temperature_c': 95},
+        ],
+        'difficulty': 3, 'wine_pairing': 'Fetească Neagră', 'servings': 4,
+        'prep_time_minutes': 20, 'cook_time_minutes': 40,
+    },
+    {
+        'title': 'Tocăniță de pui',
+        'ingredients': ['- 1 kg pui', '- 3 cartofi', '- 2 căței de usturoi'],
+        'instructions': ['1. Rumenește puiul.', '2. Adaugă cartofii.'],
+        'difficulty': 2, 'wine_pairing': None,
+    },
+    {
+        'title': 'Salată de "vinete" {rapidă}',
+        'ingredients': ['3 vinete', '1 ceapă'],
+        'instructions': ['Coace vinetele.'],
+        'difficulty': 1, 'wine_pairing': 'Rosé',
+    },
+]
+
+
+class LibraryRoundTripTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.source = self._database('source.db')
+        with self.source:
+            owner = self.source.execute(
+                "INSERT INTO users (email, password_hash) VALUES ('ana@example.com', 'hash')").lastrowid
+            for number, recipe in enumerate(RECIPES):
+                recipe_store.insert_recipe(self.source.cursor(), recipe, user_id=owner if number == 0 else None)
+
+    def _database(self, name, with_owner=False):
+        path = os.path.join(self.tmp.name, name)
+        migrations.migrate_database(path)
+        conn = db.connect(path)
+        self.addCleanup(conn.close)
+        if with_owner:
+            with conn:
+                conn.execute("INSERT INTO users (email, password_hash) VALUES ('ana@example.com', 'hash')")
+        return conn
+
+    def _import(self, conn, data, **kwargs):
+        header, records = library.read_export(library.open_text(io.BytesIO(data)))
+        return library.import_recipes(conn, header, records, **kwargs)
+
+    @staticmethod
+    def _snapshot(conn):
+        recipes = list(library.iter_recipes(conn))
+        fts = {text: [r['title'] for r in search.search_recipes(conn, text)[0]]
+               for text in ('perișoare', 'cartofi', 'vinete', 'fetească')}
+        matches = [m['title'] for m in ingredient_index.find_matches(conn, 'pui, cartofi, usturoi')]
+        return recipes, fts, matches
+
+    def test_round_trip_preserves_recipes_and_search(self):
+        expected = self._snapshot(self.source)
+        self.assertEqual(expected[1]['perișoare'], ['Ciorbă de perișoare'])
+        for layout in library.LAYOUTS:
+            for compress in (False, True):
+                with self.subTest(layout=layout, compress=compress):
+                    data = b''.join(library.export_chunks(self.source, layout, compress=compress))
+                    target = self._database(f'{layout}-{compress}.db', with_owner=True)
+                    result = self._import(target, data, batch_size=2)
+                    self.assertEqual((result['imported'], result['first_id']), (len(RECIPES), 1))
+                    self.assertEqual(self._snapshot(target), expected)
+                    self.assertEqual(recipe_store.load_recipe(target, 1), recipe_store.load_recipe(self.source, 1))
+
+    def test_malformed_line_rolls_back_whole_import(self):
+        lines = b''.join(library.export_chunks(self.source, 'ndjson')).splitlines(keepends=True)
+        target = self._database('target.db')
+        with target:
+            recipe_store.insert_recipe(target.cursor(), RECIPES[1])
+        before = self._snapshot(target)
+
+        broken = {
+            'JSON invalid': lines[:3] + [b'{"title": "Trunchiat", \n'] + lines[3:],
+            'fără titlu': lines[:3] + [b'{"difficulty": 2, "ingredients": [], "instructions": []}\n'] + lines[3:],
+        }
+        for name, data in broken.items():
+            with self.subTest(name), self.assertRaises(library.LibraryFormatError):
+                # batch_size=1: primele rețete sunt deja inserate când apare linia invalidă
+                self._import(target, b''.join(data), batch_size=1)
+            self.assertFalse(target.in_transaction)
+            self.assertEqual(self._snapshot(target), before)
+
+        # Indexul full-text se actualizează din nou per rând după importul anulat
+        with target:
+            recipe_store.insert_recipe(target.cursor(), RECIPES[2])
+        self.assertEqual(self._snapshot(target)[1]['vinete'], [RECIPES[2]['title']])
+
+    def test_rejects_foreign_files(self):
+        for data in (b'', b'not json\n', b'{"format": "altceva"}\n',
+                     b'{"format": "recipe-library", "version": 99, "layout": "ndjson"}\n', b'\x1f\x8b\x08trunchiat'):
+            with self.subTest(data=data), self.assertRaises(library.LibraryFormatError):
+                library.read_export(library.open_text(io.BytesIO(data)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Migrările schemei (migrations.py): o bază creată de versiunea de dinainte de migrări
+(`init_db()`, user_version = 0, cu date) și o bază goală ajung la aceeași schemă;
+rularea repetată nu mai schimbă nimic, iar o migrare eșuată nu lasă urme.
+"""
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+import ingredient_index  # noqa: E402
+import migrations  # noqa: E402
+import search  # noqa: E402
+
+# Schema creată de `init_db()` înainte de migrări
+BASELINE_SCHEMA = '''
+    CREATE TABLE recipes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        ingredients TEXT NOT NULL,
+        instructions TEXT NOT NULL,
+        difficulty_rating INTEGER NOT NULL,
+        wine_pairing TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT NOT NULL UNIQUE,
+        password_hash TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE usage_limits (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        day DATE NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        UNIQUE(user_id, day)
+    );
+'''
+
+RECIPES = [
+    ('Ciorbă de perișoare', '- 500 g carne tocată de porc\n- 2 morcovi\n- 1 ceapă\n- 100 g orez',
+     '1. Toacă ceapa.\n2. Formează perișoarele.\n3. Fierbe 40 minute.', 3, 'Fetească Neagră'),
+    ('Tocăniță de pui', '- 1 kg pui\n- 3 cartofi\n- 2 căței de usturoi',
+     '1. Rumenește puiul.\n2. Adaugă cartofii și fierbe 30 minute.', 2, None),
+]
+
+
+def _schema(conn):
+    """Obiectele din `sqlite_master`, cu SQL-ul normalizat (indentarea diferă între versiuni)."""
+    rows = conn.execute("SELECT type, name, tbl_name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'")
+    return sorted((row[0], row[1], row[2], ' '.join((row[3] or '').split())) for row in rows)
+
+
+class MigrationsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _connect(self, name):
+        conn = db.connect(os.path.join(self.tmp.name, name))
+        self.addCleanup(conn.close)
+        return conn
+
+    def _legacy(self):
+        conn = self._connect('legacy.db')
+        conn.executescript(BASELINE_SCHEMA)
+        with conn:
+            conn.executemany('INSERT INTO recipes (title, ingredients, instructions, difficulty_rating, wine_pairing) '
+                             'VALUES (?, ?, ?, ?, ?)', RECIPES)
+            conn.execute("INSERT INTO users (email, password_hash) VALUES ('ana@example.com', 'hash')")
+            conn.execute("INSERT INTO usage_limits (user_id, day, count) VALUES (1, '2025-01-01', 4)")
+        return conn
+
+    def test_legacy_and_empty_databases_reach_same_schema(self):
+        legacy, empty = self._legacy(), self._connect('empty.db')
+        latest = migrations.MIGRATIONS[-1][0]
+        self.assertEqual(migrations.migrate(legacy), latest)
+        self.assertEqual(migrations.migrate(empty), latest)
+        self.assertEqual(_schema(legacy), _schema(empty))
+
+        # Datele vechi au trecut prin backfill: structură, FTS, termeni de ingrediente
+        self.assertEqual(legacy.execute('SELECT count FROM usage_limits WHERE user_id = 1').fetchone()[0], 4)
+        self.assertEqual(legacy.execute('SELECT COUNT(*) FROM recipe_ingredients').fetchone()[0], 7)
+        self.assertEqual(legacy.execute('SELECT COUNT(*) FROM recipe_steps').fetchone()[0], 5)
+        self.assertEqual(legacy.execute('SELECT COUNT(*) FROM schema_reindex').fetchone()[0], 0)
+        self.assertTrue(search.is_available(legacy))
+        results, _ = search.search_recipes(legacy, 'perișoare')
+        self.assertEqual([r['title'] for r in results], ['Ciorbă de perișoare'])
+        matches = ingredient_index.find_matches(legacy, 'pui, cartofi, usturoi', min_coverage=0.5)
+        self.assertEqual([m['title'] for m in matches], ['Tocăniță de pui'])
+
+    def test_rerun_is_a_no_op(self):
+        conn = self._legacy()
+        version = migrations.migrate(conn)
+        schema, changes = _schema(conn), conn.total_changes
+        self.assertEqual(migrations.migrate(conn), version)
+        self.assertEqual(_schema(conn), schema)
+        self.assertEqual(conn.total_changes, changes)
+
+    def test_new_migration_bumps_user_version(self):
+        conn = self._connect('recipes.db')
+        latest = migrations.migrate(conn)
+
+        def add_table(cursor):
+            cursor.execute('CREATE TABLE extra (id INTEGER PRIMARY KEY)')
+
+        with mock.patch.object(migrations, 'MIGRATIONS', migrations.MIGRATIONS + [(latest + 1, 'test', add_table)]):
+            self.assertEqual(migrations.migrate(conn), latest + 1)
+        self.assertEqual(migrations.current_version(conn), latest + 1)
+        self.assertTrue(conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'extra'").fetchone())
+
+    def test_failed_migration_rolls_back(self):
+        conn = self._legacy()
+        latest = migrations.migrate(conn)
+
+        def broken(cursor):
+            cursor.execute('CREATE TABLE extra (id INTEGER PRIMARY KEY)')
+            cursor.execute("UPDATE recipes SET title = 'stricat'")
+            raise RuntimeError('migrare eșuată')
+
+        with mock.patch.object(migrations, 'MIGRATIONS', migrations.MIGRATIONS + [(latest + 1, 'test', broken)]), \
+                self.assertLogs(migrations.logger, 'ERROR'), self.assertRaises(RuntimeError):
+            migrations.migrate(conn)
+        self.assertFalse(conn.in_transaction)
+        self.assertEqual(migrations.current_version(conn), latest)
+        self.assertIsNone(conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'extra'").fetchone())
+        titles = [row[0] for row in conn.execute('SELECT title FROM recipes ORDER BY id')]
+        self.assertEqual(titles, [recipe[0] for recipe in RECIPES])
+
+
+if __name__ == '__main__':
+    unittest.main()
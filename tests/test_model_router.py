@@ -0,0 +1,213 @@
+"""
+Rutarea cu cereri dublate (model_router.py): peste `AsyncGeminiClient` cu un transport
+fals (fără rețea și fără httpx instalat) și, cu streaming, peste `tools/fake_gemini.py`
+cu funcția de generare a aplicației.
+"""
+import asyncio
+import importlib
+import os
+import sys
+import tempfile
+import threading
+import types
+import unittest
+from http.server import ThreadingHTTPServer
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'tools'))
+
+import fake_gemini  # noqa: E402
+import gemini_client  # noqa: E402
+import model_router  # noqa: E402
+
+
+class _HTTPError(Exception):
+    pass
+
+
+class _ConnectError(_HTTPError):
+    pass
+
+
+class _Response:
+    status_code = 200
+    headers = {}
+    text = ''
+
+    def json(self):
+        return {'candidates': []}
+
+
+fake_httpx = types.SimpleNamespace(HTTPError=_HTTPError, ConnectError=_ConnectError,
+                                   ConnectTimeout=_ConnectError, Response=_Response)
+
+
+class _Transport:
+    """Înlocuiește `httpx.AsyncClient`: `send` așteaptă `delay` secunde (sau la nesfârșit)."""
+
+    def __init__(self, delay=None):
+        self.delay = delay
+        self.started = asyncio.Event()
+
+    def build_request(self, *args, **kwargs):
+        return None
+
+    async def send(self, request, stream=False):
+        self.started.set()
+        if self.delay is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.delay)
+        return _Response()
+
+
+def _client(transport, **options):
+    client = gemini_client.AsyncGeminiClient('key', max_retries=0, **options)
+    client._client = transport
+    return client
+
+
+def _open_breaker(breaker):
+    """Breaker-ul trece în half-open: un eșec cu prag 1, cooldown 0."""
+    breaker.record_failure()
+    assert breaker.state == gemini_client.CircuitBreaker.HALF_OPEN
+
+
+async def _generate(attempt):
+    return await attempt.client.generate_content({})
+
+
+@mock.patch.object(gemini_client, '_httpx', return_value=fake_httpx)
+class HalfOpenProbeCancelTest(unittest.TestCase):
+
+    def test_cancelled_probe_releases_breaker(self, _):
+        async def scenario():
+            client = _client(_Transport(), breaker_threshold=1, breaker_cooldown=0)
+            _open_breaker(client.breaker)
+            task = asyncio.ensure_future(client.post({}))
+            await client.client.started.wait()
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            return client.breaker
+
+        breaker = asyncio.run(scenario())
+        self.assertTrue(breaker.allow())
+
+    def test_router_cancels_losing_probe_without_blocking_route(self, _):
+        async def scenario():
+            primary = _client(_Transport(), breaker_threshold=1, breaker_cooldown=0)
+            fallback = _client(_Transport(delay=0.01))
+            _open_breaker(primary.breaker)
+            router = model_router.HedgedRouter(
+                model_router.Route('primary', primary), model_router.Route('fallback', fallback),
+                initial_delay=0.05, min_delay=0.01, is_valid=lambda result: result is not None,
+            )
+            result = await router.generate_async(_generate)
+            # Încercarea anulată se termină pe bucla de evenimente
+            await asyncio.sleep(0.01)
+            return result, router, primary.breaker
+
+        result, router, breaker = asyncio.run(scenario())
+        self.assertEqual(result, {'candidates': []})
+        self.assertEqual(router.stats()['routes']['primary']['cancelled'], 1)
+        self.assertEqual(router.stats()['routes']['fallback']['wins'], 1)
+        self.assertTrue(breaker.allow())
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def test_only_one_probe_in_half_open(self):
+        breaker = gemini_client.CircuitBreaker(failure_threshold=1, cooldown=0)
+        _open_breaker(breaker)
+        self.assertEqual(breaker.acquire(), (True, True))
+        self.assertEqual(breaker.acquire(), (False, False))
+        breaker.release_probe()
+        self.assertEqual(breaker.acquire(), (True, True))
+        breaker.record_success()
+        self.assertEqual(breaker.acquire(), (True, False))
+
+
+def _import_app(workdir):
+    """`import app` cu baza de date în `workdir` (modulul e importat o singură dată per proces)."""
+    env = {'SECRET_KEY': 'test-secret', 'METRICS_ENABLED': 'false', 'LOG_LEVEL': 'WARNING',
+           'METRICS_DIR': os.path.join(workdir, 'metrics')}
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with mock.patch.dict(os.environ, env):
+            return importlib.import_module('app')
+    finally:
+        os.chdir(cwd)
+
+
+class StreamingHedgeTest(unittest.TestCase):
+    """Cu streaming câștigă prima rețetă validă, nu primul conținut."""
+
+    PRIMARY = 'primary-model'
+    FALLBACK = 'fallback-model'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.app = _import_app(cls.tmp.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def _serve(self, stream_chunks=8, **options):
+        config = fake_gemini.FakeGeminiConfig(fenced_rate=0.0, stream_chunks=stream_chunks, seed=1, **options)
+        handler = type('Handler', (fake_gemini.FakeGeminiHandler,), {'config': config})
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return config, f'http://127.0.0.1:{server.server_port}/v1beta'
+
+    def _generate(self, base_url, initial_delay):
+        def route(name, model):
+            return model_router.Route(name, gemini_client.GeminiClient('fake-key', base_url=base_url, model=model,
+                                                                       max_retries=0))
+
+        router = model_router.HedgedRouter(route('primary', self.PRIMARY), route('fallback', self.FALLBACK),
+                                           initial_delay=initial_delay, min_delay=0.01,
+                                           is_valid=self.app._is_complete_recipe)
+        partials = []
+        with mock.patch.object(self.app, 'GEMINI_API_KEY', 'fake-key'):
+            recipe = router.generate(lambda attempt: self.app.get_gemini_response_streaming(
+                'pui, cartofi, ceapă', on_partial=partials.append, attempt=attempt))
+        # Așteaptă și încercarea anulată (se oprește la următoarea bucată din stream)
+        router.close()
+        return recipe, partials, router.stats()
+
+    def test_primary_stream_cut_after_content_falls_back(self):
+        config, base_url = self._serve(model_latency={self.PRIMARY: (0.2, 0.2), self.FALLBACK: (0.3, 0.3)},
+                                       model_cut={self.PRIMARY: 1.0})
+        recipe, partials, stats = self._generate(base_url, initial_delay=5.0)
+
+        self.assertTrue(self.app._is_complete_recipe(recipe))
+        self.assertEqual(config.stats['cut'], 1)
+        # Rețeta parțială a primei încercări s-a afișat, apoi a rezervei
+        self.assertTrue(partials)
+        self.assertEqual(stats['failovers'], 1)
+        self.assertEqual(stats['routes']['primary']['failed'], 1)
+        self.assertEqual(stats['routes']['fallback']['wins'], 1)
+
+    def test_stream_started_but_slow_is_hedged(self):
+        # Primul conținut al rutei principale vine înaintea întârzierii, rețeta completă mult după
+        config, base_url = self._serve(model_latency={self.PRIMARY: (6.0, 6.0), self.FALLBACK: (0.2, 0.2)},
+                                       stream_chunks=24)
+        recipe, partials, stats = self._generate(base_url, initial_delay=1.5)
+
+        self.assertTrue(self.app._is_complete_recipe(recipe))
+        self.assertTrue(partials)
+        self.assertEqual(stats['hedged'], 1)
+        self.assertEqual(stats['routes']['fallback']['wins'], 1)
+        self.assertEqual(stats['routes']['primary']['cancelled'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Limita zilnică de generări (quota.py): rezervări concurente la limită, contorul global
+și restituirea, inclusiv cache-ul de generări rămase al fiecărui worker.
+"""
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrations  # noqa: E402
+import quota  # noqa: E402
+
+
+class UsageQuotaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = os.path.join(self.tmp.name, 'quota.db')
+        migrations.migrate_database(self.db_path)
+
+    def _count(self, user_id):
+        conn = quota.db.connect(self.db_path)
+        try:
+            row = conn.execute('SELECT count FROM usage_limits WHERE user_id = ?', (user_id,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else 0
+
+    def _race(self, threads, reserve):
+        """`threads` rezervări simultane; fiecare thread are conexiunea lui (`db.get_connection`)."""
+        barrier = threading.Barrier(threads)
+        outcomes = []
+
+        def worker():
+            barrier.wait()
+            try:
+                outcomes.append(reserve())
+            except quota.QuotaExceeded as e:
+                outcomes.append(e)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join(10)
+        return outcomes
+
+    def test_concurrent_reservations_stop_at_limit(self):
+        usage = quota.UsageQuota(self.db_path, user_limit=5)
+        outcomes = self._race(20, lambda: usage.reserve(1))
+        reserved = [o for o in outcomes if isinstance(o, quota.Reservation)]
+        refused = [o for o in outcomes if isinstance(o, quota.QuotaExceeded)]
+        self.assertEqual((len(reserved), len(refused)), (5, 15))
+        self.assertEqual({e.scope for e in refused}, {'user'})
+        self.assertEqual(self._count(1), 5)
+        self.assertEqual(usage.remaining(1), 0)
+
+    def test_reserve_many_is_all_or_nothing(self):
+        usage = quota.UsageQuota(self.db_path, user_limit=5)
+        usage.reserve_many(1, 3)
+        with self.assertRaises(quota.QuotaExceeded):
+            usage.reserve_many(1, 3)
+        self.assertEqual(self._count(1), 3)
+        self.assertEqual(len(usage.reserve_many(1, 2)), 2)
+
+    def test_global_limit_uses_row_zero_across_users(self):
+        usage = quota.UsageQuota(self.db_path, user_limit=5, global_limit=4)
+        outcomes = self._race(8, lambda: usage.reserve(threading.get_ident()))
+        self.assertEqual(sum(isinstance(o, quota.Reservation) for o in outcomes), 4)
+        self.assertEqual({o.scope for o in outcomes if isinstance(o, quota.QuotaExceeded)}, {'global'})
+        self.assertEqual(self._count(quota.GLOBAL_USER_ID), 4)
+
+        # Refuzul pe limita utilizatorului anulează și incrementul global
+        usage = quota.UsageQuota(self.db_path, user_limit=1, global_limit=10)
+        usage.reserve(99)
+        with self.assertRaises(quota.QuotaExceeded) as refused:
+            usage.reserve(99)
+        self.assertEqual(refused.exception.scope, 'user')
+        self.assertEqual(self._count(quota.GLOBAL_USER_ID), 5)
+
+        usage.refund(usage.reserve(100))
+        self.assertEqual(self._count(quota.GLOBAL_USER_ID), 5)
+
+    def test_refund_restores_slot_once(self):
+        usage = quota.UsageQuota(self.db_path, user_limit=2)
+        first = usage.reserve(1)
+        usage.reserve(1)
+        self.assertEqual(usage.remaining(1), 0)
+        usage.refund(first)
+        usage.refund(first)
+        self.assertEqual(self._count(1), 1)
+        self.assertEqual(usage.remaining(1), 1)
+
+        committed = usage.reserve(1)
+        usage.commit(committed)
+        usage.refund(committed)
+        self.assertEqual(self._count(1), 2)
+
+    def test_refund_from_another_worker_is_seen_despite_cached_zero(self):
+        # Doi workeri: cache-uri separate, aceeași bază de date
+        worker_a = quota.UsageQuota(self.db_path, user_limit=1, cache_ttl=3600)
+        worker_b = quota.UsageQuota(self.db_path, user_limit=1, cache_ttl=3600)
+        reservation = worker_a.reserve(1)
+        with self.assertRaises(quota.QuotaExceeded):
+            worker_b.reserve(1)
+        self.assertEqual(worker_b.remaining(1), 0)
+
+        worker_a.refund(reservation)
+        self.assertEqual(worker_b.remaining(1), 1)
+        worker_b.reserve(1)
+        self.assertEqual(self._count(1), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Parserul JSON incremental (recipe_stream.IncrementalJSONParser): aceleași evenimente
+oricum ar fi tăiat textul în bucăți, inclusiv în mijlocul escape-urilor, al acoladelor
+din șiruri și al array-urilor imbricate.
+"""
+import json
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import recipe_stream  # noqa: E402
+
+DOCUMENT = '''```json
+{
+  "title": "Ciorbă \\"de casă\\" {rapidă} [v2] \\\\ \\u0103\\n",
+  "servings": 4,
+  "ingredients": [
+    {"item": "pui}", "quantity": 1.5, "unit": "kg", "notes": "tăiat \\"cuburi\\", fără os]"},
+    {"item": "cartofi", "quantity": 3, "unit": "buc", "notes": ""}
+  ],
+  "instructions": ["1. Taie {tot}, apoi [amestecă].", "2. Fierbe \\\\ 30 min", "3. \\"Gata\\""],
+  "matrix": [[1, [2, "]"]], [], [{"a": [3]}]],
+  "numbers": [1 , -2.5e1,true,null],
+  "tags": {"sezon": ["iarnă", "toamnă"], "vegan": false},
+  "empty": "",
+  "difficulty": 3
+}
+```'''
+
+
+def _expected_events():
+    """Evenimentele deduse din JSON-ul complet: câte un 'item' per element de array, apoi 'field'."""
+    data = json.loads(DOCUMENT.split('```json', 1)[1].rsplit('```', 1)[0])
+    events = []
+    for key, value in data.items():
+        if isinstance(value, list):
+            events.extend(('item', key, element) for element in value)
+        events.append(('field', key, value))
+    return events
+
+
+def _parse(chunks):
+    parser = recipe_stream.IncrementalJSONParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return parser, events
+
+
+class IncrementalJSONParserTest(unittest.TestCase):
+
+    def test_whole_document(self):
+        parser, events = _parse([DOCUMENT])
+        self.assertTrue(parser.done)
+        self.assertEqual(events, _expected_events())
+
+    def test_every_two_chunk_boundary(self):
+        expected = _expected_events()
+        for cut in range(1, len(DOCUMENT)):
+            with self.subTest(cut=cut, around=DOCUMENT[max(0, cut - 5):cut + 5]):
+                parser, events = _parse([DOCUMENT[:cut], DOCUMENT[cut:]])
+                self.assertTrue(parser.done)
+                self.assertEqual(events, expected)
+
+    def test_one_character_at_a_time(self):
+        parser, events = _parse(DOCUMENT)
+        self.assertTrue(parser.done)
+        self.assertEqual(events, _expected_events())
+
+    def test_random_chunk_sizes(self):
+        rng = random.Random(7)
+        expected = _expected_events()
+        for _ in range(200):
+            chunks, pos = [], 0
+            while pos < len(DOCUMENT):
+                size = rng.randint(1, 12)
+                chunks.append(DOCUMENT[pos:pos + size])
+                pos += size
+            self.assertEqual(_parse(chunks)[1], expected)
+
+    def test_items_are_reported_before_array_closes(self):
+        parser = recipe_stream.IncrementalJSONParser()
+        self.assertEqual(parser.feed('{"instructions": ["Taie, \\"fin\\"", "Fierbe'), [
+            ('item', 'instructions', 'Taie, "fin"'),
+        ])
+        self.assertEqual(parser.feed('"'), [])
+        self.assertEqual(parser.feed(']'), [
+            ('item', 'instructions', 'Fierbe'),
+            ('field', 'instructions', ['Taie, "fin"', 'Fierbe']),
+        ])
+        self.assertFalse(parser.done)
+        self.assertEqual(parser.feed('}\n``` text după'), [])
+        self.assertTrue(parser.done)
+        self.assertEqual(parser.feed('{"title": "ignorat"}'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
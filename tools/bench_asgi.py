@@ -0,0 +1,211 @@
+"""
+bench_asgi.py - Generări concurente: Gunicorn sync (Procfile) vs. modul ASGI (asgi.py)
+
+Pentru fiecare mod pornește serverul Gemini fals și aplicația pe o bază de date
+temporară, trimite `--generations` generări distincte (POST /generate_recipe din
+`--clients` thread-uri), urmărește job-urile până la final și raportează:
+- timpul total și generările pe secundă
+- câte apeluri Gemini au fost în curs simultan (`max_in_flight` din fake Gemini)
+- RSS-ul maxim și numărul maxim de thread-uri ale procesului server (cu workerii)
+
+Moduri:
+- sync: `gunicorn app:app --workers 2 --threads 4` (GENERATION_MAX_CONCURRENCY implicit, 4 per worker)
+- sync-wide: același Gunicorn cu `--wide-threads` thread-uri de generare per worker
+- asgi: `uvicorn asgi:application --workers 1` (generări ca și corutine, httpx)
+
+RSS-ul se citește din /proc (Linux).
+
+Rulare: python tools/bench_asgi.py --generations 200 --latency 2
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import loadtest  # noqa: E402
+
+ROOT = loadtest.ROOT
+_JOB_RE = re.compile(r'/jobs/([0-9a-f]+)$')
+
+
+def _proc_tree(pid):
+    """PID-ul și toți descendenții (workerii Gunicorn / Uvicorn)."""
+    pids = [pid]
+    for current in pids:
+        try:
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children') as handle:
+                    pids.extend(int(child) for child in handle.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+def _rss_and_threads(pid):
+    rss_kib = threads = 0
+    for current in _proc_tree(pid):
+        try:
+            with open(f'/proc/{current}/status') as handle:
+                for line in handle:
+                    if line.startswith('VmRSS:'):
+                        rss_kib += int(line.split()[1])
+                    elif line.startswith('Threads:'):
+                        threads += int(line.split()[1])
+        except OSError:
+            continue
+    return rss_kib, threads
+
+
+class Sampler(threading.Thread):
+    """Eșantionează RSS-ul și thread-urile serverului la fiecare 100 ms; păstrează maximul."""
+
+    def __init__(self, pid):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.max_rss_kib = 0
+        self.max_threads = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            rss_kib, threads = _rss_and_threads(self.pid)
+            self.max_rss_kib = max(self.max_rss_kib, rss_kib)
+            self.max_threads = max(self.max_threads, threads)
+            self.stopped.wait(0.1)
+
+
+def _server_command(mode, port, args):
+    if mode == 'asgi':
+        return [sys.executable, '-m', 'uvicorn', 'asgi:application', '--app-dir', ROOT,
+                '--host', '127.0.0.1', '--port', str(port), '--workers', '1', '--log-level', 'warning']
+    return [sys.executable, '-m', 'gunicorn', 'app:app', '--pythonpath', ROOT,
+            '--bind', f'127.0.0.1:{port}', '--workers', str(args.workers), '--threads', str(args.threads),
+            '--timeout', '120']
+
+
+def _login(base_url, index):
+    session = requests.Session()
+    session.get(f'{base_url}/register')
+    form = {'email': f'bench-{os.getpid()}-{index}@example.com', 'password': 'bench-password',
+            'csrf_token': session.cookies.get('csrf_token', '')}
+    session.post(f'{base_url}/register', data=form, allow_redirects=False)
+    form['csrf_token'] = session.cookies.get('csrf_token', '')
+    session.post(f'{base_url}/login', data=form, allow_redirects=False)
+    # Conexiunile keep-alive inactive sunt închise de Gunicorn după 2s; un POST pe una
+    # dintre ele ar eșua fără retry, deci trimiterile pornesc pe conexiuni noi
+    session.close()
+    session.mount('http://', HTTPAdapter(max_retries=Retry(total=3, allowed_methods=['GET'])))
+    return session
+
+
+def run_mode(mode, args):
+    workdir = tempfile.mkdtemp(prefix=f'bench-{mode}-')
+    gemini_port, app_port = loadtest._free_port(), loadtest._free_port()
+    fake = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, 'tools', 'fake_gemini.py'), '--port', str(gemini_port),
+        '--latency-p50', str(args.latency), '--latency-p95', str(args.latency * 1.2),
+    ], stdout=subprocess.DEVNULL)
+    env = dict(os.environ,
+               GEMINI_API_KEY='fake-key',
+               GEMINI_BASE_URL=f'http://127.0.0.1:{gemini_port}/v1beta',
+               QUOTA_USER_DAILY_LIMIT='1000000',
+               LOGIN_THROTTLE_ENABLED='false',
+               GENERATION_MAX_PENDING=str(args.generations),
+               SECRET_KEY='bench-secret',
+               FLASK_DEBUG='false',
+               LOG_LEVEL='WARNING',
+               METRICS_ENABLED='false')
+    if mode == 'sync-wide':
+        env['GENERATION_MAX_CONCURRENCY'] = str(args.wide_threads)
+    server = subprocess.Popen(_server_command(mode, app_port, args), env=env, cwd=workdir,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    processes = [fake, server]
+    try:
+        if not (loadtest._wait_for_port(gemini_port) and loadtest._wait_for_port(app_port)):
+            raise SystemExit(f'Serverul nu a pornit ({mode})')
+        base_url = f'http://127.0.0.1:{app_port}'
+        sessions = [_login(base_url, index) for index in range(args.clients)]
+        idle_rss_kib, idle_threads = _rss_and_threads(server.pid)
+        sampler = Sampler(server.pid)
+        sampler.start()
+
+        def submit(index):
+            session = sessions[index % len(sessions)]
+            response = session.post(f'{base_url}/generate_recipe', allow_redirects=False, data={
+                'ingredients': f'bench{index}, cartofi, ceapă', 'generate_anyway': '1',
+                'csrf_token': session.cookies.get('csrf_token', ''),
+            })
+            job = _JOB_RE.search(response.headers.get('Location', ''))
+            return (session, job.group(1)) if job else None
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.clients) as pool:
+            jobs = [job for job in pool.map(submit, range(args.generations)) if job]
+        submitted = time.perf_counter() - started
+
+        pending = dict((job_id, session) for session, job_id in jobs)
+        done = failed = 0
+        deadline = time.monotonic() + args.timeout
+        while pending and time.monotonic() < deadline:
+            for job_id, session in list(pending.items()):
+                status = session.get(f'{base_url}/jobs/{job_id}/status').json().get('status')
+                if status in ('done', 'failed'):
+                    done += status == 'done'
+                    failed += status == 'failed'
+                    del pending[job_id]
+            time.sleep(0.2)
+        elapsed = time.perf_counter() - started
+        sampler.stopped.set()
+        sampler.join()
+        upstream = requests.get(f'http://127.0.0.1:{gemini_port}/stats').json()
+        return {
+            'mode': mode,
+            'done': done,
+            'failed': failed + len(pending) + (args.generations - len(jobs)),
+            'submit_s': submitted,
+            'elapsed_s': elapsed,
+            'max_in_flight': upstream.get('max_in_flight'),
+            'idle_rss_mb': idle_rss_kib / 1024,
+            'max_rss_mb': sampler.max_rss_kib / 1024,
+            'idle_threads': idle_threads,
+            'max_threads': sampler.max_threads,
+        }
+    finally:
+        loadtest.stop_stack(processes, workdir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark generări concurente: Gunicorn sync vs. ASGI')
+    parser.add_argument('--modes', default='sync,sync-wide,asgi')
+    parser.add_argument('--generations', type=int, default=200)
+    parser.add_argument('--clients', type=int, default=16, help='thread-uri care trimit generările')
+    parser.add_argument('--latency', type=float, default=2.0, help='latența mediană a fake Gemini (secunde)')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--wide-threads', type=int, default=100, help='GENERATION_MAX_CONCURRENCY pentru sync-wide')
+    parser.add_argument('--timeout', type=float, default=600)
+    args = parser.parse_args(argv)
+
+    rows = [run_mode(mode, args) for mode in args.modes.split(',')]
+    print(f"\n{args.generations} generări, latență Gemini ~{args.latency}s\n")
+    print(f"{'mod':10} {'ok':>5} {'eșuate':>7} {'total s':>8} {'gen/s':>7} {'Gemini simultan':>16} "
+          f"{'RSS idle MB':>12} {'RSS max MB':>11} {'thread-uri max':>15}")
+    for row in rows:
+        print(f"{row['mode']:10} {row['done']:5} {row['failed']:7} {row['elapsed_s']:8.1f} "
+              f"{row['done'] / row['elapsed_s']:7.1f} {row['max_in_flight']:16} {row['idle_rss_mb']:12.1f} "
+              f"{row['max_rss_mb']:11.1f} {row['max_threads']:15}")
+    return 0 if all(not row['failed'] for row in rows) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
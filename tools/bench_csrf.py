@@ -0,0 +1,79 @@
+"""
+bench_csrf.py - Costul per request al cookie-ului / tokenului CSRF (eager vs. lazy)
+
+Rulează aplicația în proces (Flask test client, bază de date temporară) și
+măsoară, pentru un fișier static, un răspuns JSON și o pagină HTML, timpul
+mediu per request cu `CSRF_LAZY=false` (tokenul semnat și cookie-ul setat pe
+fiecare răspuns) și `CSRF_LAZY=true`, plus antetele rezultate (`Set-Cookie`,
+`Vary: Cookie`).
+
+Rulare: python tools/bench_csrf.py [--requests 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCENARIOS = [
+    ('static', '/static/js/base.js'),
+    ('json', '/api/gallery'),
+    ('html', '/gallery'),
+]
+
+
+def _measure(client, path, count):
+    client.get(path)
+    started = time.perf_counter()
+    for _ in range(count):
+        response = client.get(path)
+        response.close()
+    elapsed = (time.perf_counter() - started) / count
+    response = client.get(path)
+    headers = response.headers
+    response.close()
+    return elapsed, 'csrf_token=' in ' '.join(headers.getlist('Set-Cookie')), 'Cookie' in headers.get('Vary', '')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark CSRF eager vs. lazy')
+    parser.add_argument('--requests', type=int, default=2000, help='request-uri per scenariu și mod')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    os.chdir(tempfile.mkdtemp(prefix='bench-csrf-'))
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('METRICS_ENABLED', 'false')
+    import app as app_module
+
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+        session['user_email'] = 'bench@example.com'
+
+    print(f"{'scenariu':10} {'mod':6} {'µs/request':>11} {'Set-Cookie':>11} {'Vary: Cookie':>13}")
+    results = {}
+    for name, path in SCENARIOS:
+        # Modurile alternează pe mai multe runde; se păstrează runda cea mai rapidă
+        for _ in range(args.rounds):
+            for lazy in (False, True):
+                app_module.CSRF_LAZY = lazy
+                elapsed, set_cookie, vary = _measure(client, path, args.requests // args.rounds)
+                results[(name, lazy)] = min(elapsed, results.get((name, lazy), elapsed))
+        for lazy in (False, True):
+            elapsed = results[(name, lazy)]
+            app_module.CSRF_LAZY = lazy
+            _, set_cookie, vary = _measure(client, path, 1)
+            print(f"{name:10} {'lazy' if lazy else 'eager':6} {elapsed * 1e6:11.1f} {'da' if set_cookie else 'nu':>11} {'da' if vary else 'nu':>13}")
+    print()
+    for name, _ in SCENARIOS:
+        eager, lazy = results[(name, False)], results[(name, True)]
+        print(f"{name:10} {(eager - lazy) * 1e6:+8.1f} µs/request economisiți ({eager / lazy:.2f}x)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
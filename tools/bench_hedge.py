@@ -0,0 +1,155 @@
+"""
+bench_hedge.py - Latența generărilor cu și fără cereri dublate pe un model de rezervă
+
+Pornește serverul Gemini fals cu o coadă lentă injectată pe modelul principal
+(`--slow-rate` din cereri așteaptă de `--slow-factor` ori latența lor înainte de
+primul byte) și un model de rezervă mai rapid, apoi rulează `--generations` generări
+(`--concurrency` în paralel) prin funcțiile de generare ale aplicației
+(`get_gemini_response[_streaming]` cu `attempt`) și `model_router.HedgedRouter`:
+
+- primary: doar modelul principal (routerul fără rută de rezervă)
+- hedge-same: dublare pe același model (altă cerere, de obicei altă replică)
+- hedge-fallback: dublare pe modelul de rezervă (`--fallback-model`)
+
+Primele `--warmup` generări din fiecare mod nu se măsoară: până la `--min-samples`
+latențe routerul dublează după întârzierea inițială (GEMINI_HEDGE_DELAY).
+Raportează p50 / p90 / p99 / max ale timpului până la rețeta completă, generările
+eșuate, cererile în plus trimise către Gemini (cost), câte generări au fost dublate și
+câștigate de ruta de rezervă, stream-urile anulate și întârzierea de dublare la final
+(adaptată din latențele observate).
+
+Rulare: python tools/bench_hedge.py --generations 300 --slow-rate 0.08 --slow-factor 6
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import loadtest  # noqa: E402
+
+ROOT = loadtest.ROOT
+PRIMARY_MODEL = 'gemini-2.5-flash'
+
+
+def _percentiles(values):
+    values = sorted(values)
+    return {name: loadtest.percentile(values, pct) for name, pct in (('p50', 50), ('p90', 90), ('p99', 99))} | \
+        {'max': values[-1] if values else 0.0}
+
+
+def run_mode(app, mode, args, gemini_url):
+    from gemini_client import GeminiClient
+    import model_router
+
+    def client(model):
+        return GeminiClient('fake-key', base_url=gemini_url, model=model, pool_size=2 * args.concurrency, max_retries=0)
+
+    fallback = None
+    if mode == 'hedge-same':
+        fallback = model_router.Route('fallback', client(PRIMARY_MODEL))
+    elif mode == 'hedge-fallback':
+        fallback = model_router.Route('fallback', client(args.fallback_model))
+    router = model_router.HedgedRouter(
+        model_router.Route('primary', client(PRIMARY_MODEL)), fallback, quantile=args.quantile,
+        initial_delay=args.initial_delay, min_samples=args.min_samples, is_valid=app._is_complete_recipe,
+        max_workers=2 * args.concurrency,
+    )
+
+    def generate(index):
+        ingredients = f'hedge{index}, cartofi, ceapă'
+        started = time.perf_counter()
+        if args.streaming:
+            recipe = router.generate(lambda attempt: app.get_gemini_response_streaming(ingredients, attempt=attempt))
+        else:
+            recipe = router.generate(lambda attempt: app.get_gemini_response(ingredients, attempt))
+        return time.perf_counter() - started, app._is_complete_recipe(recipe)
+
+    stats_url = f'{gemini_url.rsplit("/", 1)[0]}/stats'
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(generate, range(-args.warmup, 0)))
+        router.close()
+        warm = router.stats()
+        before = requests.get(stats_url).json()
+        started = time.perf_counter()
+        results = list(pool.map(generate, range(args.generations)))
+        elapsed = time.perf_counter() - started
+    # Încercările anulate se închid în fundal (la următoarea bucată a stream-ului)
+    router.close()
+    after = requests.get(stats_url).json()
+    stats = router.stats()
+    latencies = [latency for latency, ok in results if ok]
+    return dict(
+        _percentiles(latencies),
+        mode=mode,
+        failed=sum(1 for _, ok in results if not ok),
+        extra_requests=(after['requests'] - before['requests']) / args.generations - 1,
+        cancelled=after['disconnected'] - before['disconnected'],
+        hedged=stats['hedged'] + stats['failovers'] - warm['hedged'] - warm['failovers'],
+        fallback_wins=stats['routes'].get('fallback', {}).get('wins', 0) - warm['routes'].get('fallback', {}).get('wins', 0),
+        hedge_delay=stats['hedge_delay'] if fallback else None,
+        elapsed=elapsed,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark cereri dublate (hedged) pe un model de rezervă')
+    parser.add_argument('--modes', default='primary,hedge-same,hedge-fallback')
+    parser.add_argument('--generations', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=40, help='generări nemăsurate la începutul fiecărui mod')
+    parser.add_argument('--latency', type=float, default=1.0, help='latența mediană a modelului principal (secunde)')
+    parser.add_argument('--slow-rate', type=float, default=0.08, help='fracțiunea cererilor lente ale fake Gemini')
+    parser.add_argument('--slow-factor', type=float, default=6.0)
+    parser.add_argument('--fallback-model', default='gemini-2.5-flash-lite')
+    parser.add_argument('--fallback-latency', type=float, default=0.7, help='latența mediană a modelului de rezervă')
+    parser.add_argument('--quantile', type=float, default=0.9)
+    parser.add_argument('--initial-delay', type=float, default=10.0)
+    parser.add_argument('--min-samples', type=int, default=20)
+    parser.add_argument('--no-streaming', dest='streaming', action='store_false')
+    args = parser.parse_args(argv)
+
+    port = loadtest._free_port()
+    fake = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, 'tools', 'fake_gemini.py'), '--port', str(port),
+        '--latency-p50', str(args.latency), '--latency-p95', str(args.latency * 1.5),
+        '--model-latency', f'{args.fallback_model}={args.fallback_latency}:{args.fallback_latency * 1.5}',
+        '--slow-rate', str(args.slow_rate), '--slow-factor', str(args.slow_factor),
+    ], stdout=subprocess.DEVNULL)
+    workdir = tempfile.mkdtemp(prefix='bench-hedge-')
+    try:
+        if not loadtest._wait_for_port(port):
+            raise SystemExit('Fake Gemini nu a pornit')
+        gemini_url = f'http://127.0.0.1:{port}/v1beta'
+        os.environ.update(GEMINI_API_KEY='fake-key', GEMINI_BASE_URL=gemini_url, LOG_LEVEL='WARNING',
+                          METRICS_ENABLED='false', SECRET_KEY='bench-secret')
+        # Aplicația își creează baza de date în directorul curent
+        os.chdir(workdir)
+        sys.path.insert(0, ROOT)
+        import app  # noqa: E402
+
+        rows = [run_mode(app, mode, args, gemini_url) for mode in args.modes.split(',')]
+    finally:
+        fake.terminate()
+        fake.wait()
+
+    print(f"\n{args.generations} generări ({args.concurrency} în paralel, "
+          f"{'streaming' if args.streaming else 'fără streaming'}), principal ~{args.latency}s, "
+          f"{args.slow_rate:.0%} lente x{args.slow_factor}, rezervă ~{args.fallback_latency}s\n")
+    print(f"{'mod':15} {'p50':>6} {'p90':>6} {'p99':>6} {'max':>6} {'eșuate':>7} {'cereri +':>9} "
+          f"{'dublate':>8} {'câștig rez.':>12} {'anulate':>8} {'întârziere':>11}")
+    for row in rows:
+        delay = f"{row['hedge_delay']:.2f}s" if row['hedge_delay'] is not None else '-'
+        print(f"{row['mode']:15} {row['p50']:6.2f} {row['p90']:6.2f} {row['p99']:6.2f} {row['max']:6.2f} "
+              f"{row['failed']:7} {row['extra_requests']:9.1%} {row['hedged']:8} {row['fallback_wins']:12} "
+              f"{row['cancelled']:8} {delay:>11}")
+    return 0 if all(not row['failed'] for row in rows) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+bench_library.py - Exportul / importul bibliotecii comparat cu salvarea rețetă cu rețetă
+
+Pe baze temporare:
+1. importă `--recipes` rețete sintetice (fără amprente: se calculează la import)
+2. exportă biblioteca în `ndjson` și `columnar`, cu și fără gzip: timp, dimensiune,
+   vârful de memorie Python (tracemalloc, într-o trecere separată)
+3. importă exportul într-o bază nouă (amprentele sunt refolosite) și verifică
+   numărul de rânduri din toate tabelele și o căutare full-text
+4. baseline: `recipe_store.insert_recipe` + commit per rețetă (ca `/save_recipe`)
+   pentru primele `--baseline` rețete, extrapolat la total
+
+Rulare: python tools/bench_library.py --recipes 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+import library  # noqa: E402
+import migrations  # noqa: E402
+import recipe_store  # noqa: E402
+import search  # noqa: E402
+
+INGREDIENTS = [
+    'pui', 'cartofi', 'ceapă', 'usturoi', 'morcovi', 'ardei gras', 'roșii', 'smântână', 'brânză telemea',
+    'ouă', 'făină', 'unt', 'orez', 'ciuperci', 'dovlecel', 'vinete', 'porc', 'vită', 'pătrunjel', 'mărar',
+    'lapte', 'zahăr', 'mere', 'nuci', 'fasole', 'varză', 'somon', 'lămâie', 'paste', 'spanac',
+]
+TABLES = ('recipes', 'recipe_ingredients', 'recipe_steps', 'recipe_ingredient_terms',
+          'recipe_fingerprints', 'recipe_lsh_buckets', 'recipes_fts')
+
+
+def synthetic_recipes(count, seed=7):
+    rnd = random.Random(seed)
+    for index in range(count):
+        items = rnd.sample(INGREDIENTS, rnd.randint(4, 9))
+        details = [{'item': item, 'quantity': rnd.randint(1, 500), 'unit': rnd.choice(('g', 'ml', 'buc')), 'notes': ''}
+                   for item in items]
+        steps = [{'text': f'Pasul {step + 1}: se gătește {rnd.choice(items)}', 'time_minutes': rnd.choice((None, 10, 30)),
+                  'temperature_c': None} for step in range(rnd.randint(3, 7))]
+        yield {
+            'title': f'{items[0].capitalize()} cu {items[1]} #{index}',
+            'ingredients': [f"• {d['quantity']} {d['unit']} {d['item']}" for d in details],
+            'instructions': [step['text'] for step in steps],
+            'difficulty': rnd.randint(1, 5),
+            'wine_pairing': rnd.choice(('Fetească Neagră', 'Sauvignon Blanc', '')),
+            'servings': rnd.randint(1, 6),
+            'prep_time_minutes': rnd.choice((10, 20, 30)),
+            'cook_time_minutes': rnd.choice((None, 15, 45)),
+            'ingredient_details': details,
+            'steps': steps,
+        }
+
+
+def _new_db(workdir, name):
+    conn = db.connect(os.path.join(workdir, name))
+    migrations.migrate(conn)
+    return conn
+
+
+def _counts(conn):
+    return {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] for table in TABLES}
+
+
+def _search_ids(conn):
+    results, _ = search.search_recipes(conn, 'ciuperci smântână', per_page=50)
+    return [row['id'] for row in results]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export/import în lot vs. salvare rețetă cu rețetă')
+    parser.add_argument('--recipes', type=int, default=100_000)
+    parser.add_argument('--baseline', type=int, default=2000, help='rețete salvate una câte una (extrapolat)')
+    args = parser.parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix='bench-library-')
+
+    source = _new_db(workdir, 'source.db')
+    header = {'format': library.FORMAT_NAME, 'version': library.FORMAT_VERSION, 'layout': 'ndjson'}
+    result = library.import_recipes(source, header, synthetic_recipes(args.recipes))
+    print(f"{args.recipes} rețete sintetice: import {result['seconds']:.1f}s (amprente calculate)")
+
+    exports = {}
+    print(f"\n{'export':18} {'secunde':>8} {'MB':>8} {'vârf mem MB':>12}")
+    for layout in library.LAYOUTS:
+        for compress in (False, True):
+            name = f"{layout}{'.gz' if compress else ''}"
+            path = os.path.join(workdir, f'export.{name}')
+            started = time.perf_counter()
+            with open(path, 'wb') as output:
+                for chunk in library.export_chunks(source, layout, compress=compress):
+                    output.write(chunk)
+            elapsed = time.perf_counter() - started
+            # A doua trecere doar pentru memorie (tracemalloc încetinește mult exportul)
+            tracemalloc.start()
+            for _ in library.export_chunks(source, layout, compress=compress):
+                pass
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            exports[name] = path
+            print(f"{name:18} {elapsed:8.2f} {os.path.getsize(path) / 1e6:8.1f} {peak / 1e6:12.1f}")
+
+    expected, expected_search = _counts(source), _search_ids(source)
+    print(f"\n{'import':18} {'secunde':>8} {'rețete/s':>10} {'identic':>8}")
+    for name in ('ndjson.gz', 'columnar.gz'):
+        target = _new_db(workdir, f'target-{name}.db')
+        with open(exports[name], 'rb') as raw:
+            header, records = library.read_export(library.open_text(raw))
+            result = library.import_recipes(target, header, records)
+        same = _counts(target) == expected and len(_search_ids(target)) == len(expected_search)
+        print(f"{name:18} {result['seconds']:8.2f} {result['imported'] / result['seconds']:10.0f} {'da' if same else 'NU':>8}")
+        target.close()
+
+    baseline = _new_db(workdir, 'baseline.db')
+    count = min(args.baseline, args.recipes)
+    started = time.perf_counter()
+    for recipe in synthetic_recipes(count):
+        cursor = baseline.cursor()
+        recipe_store.insert_recipe(cursor, recipe)
+        baseline.commit()
+    elapsed = time.perf_counter() - started
+    print(f"{'rând cu rând':18} {elapsed * args.recipes / count:8.2f} {count / elapsed:10.0f}"
+          f"   (extrapolat din {count} rețete)")
+    baseline.close()
+    source.close()
+    print(f'\nBazele și exporturile: {workdir}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+bench_login.py - Debitul login-urilor legitime în timpul unui atac de tip credential stuffing
+
+Pornește aplicația (Gunicorn, 2 workeri x 4 thread-uri) pe o bază temporară și
+creează conturi legitime și conturi "victimă". Apoi, timp de `--duration` secunde:
+- `--attackers` thread-uri trimit parole greșite pentru conturile victimă, din
+  `--attack-ips` adrese (X-Forwarded-For, cu TRUSTED_PROXY_COUNT=1)
+- `--legit` thread-uri se autentifică corect, fiecare login de pe altă adresă
+
+Se compară metodele de hash (`--methods`) cu și fără limitarea încercărilor:
+login-uri legitime pe secundă și p50/p95, încercări de atac procesate/refuzate și
+timpul CPU consumat de server (din /proc, Linux).
+
+Rulare: python tools/bench_login.py --duration 30
+"""
+import argparse
+import itertools
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import loadtest  # noqa: E402
+from bench_asgi import _proc_tree  # noqa: E402
+
+ROOT = loadtest.ROOT
+PASSWORD = 'parola-corecta-123'
+_CSRF_RE = re.compile(r'name="csrf_token" value="([^"]+)"')
+
+
+def _cpu_seconds(pid):
+    """utime + stime pentru procesul server și workerii lui."""
+    ticks = 0
+    for current in _proc_tree(pid):
+        try:
+            with open(f'/proc/{current}/stat') as handle:
+                fields = handle.read().rsplit(')', 1)[1].split()
+            ticks += int(fields[11]) + int(fields[12])
+        except (OSError, IndexError):
+            continue
+    return ticks / os.sysconf('SC_CLK_TCK')
+
+
+def _ip(index):
+    return f'10.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255}'
+
+
+def _post_form(base_url, path, email, password, ip):
+    """GET (token CSRF) + POST pe o sesiune nouă; întoarce (status, latența POST-ului, Location)."""
+    session = requests.Session()
+    headers = {'X-Forwarded-For': ip}
+    page = session.get(f'{base_url}{path}', headers=headers)
+    match = _CSRF_RE.search(page.text)
+    started = time.perf_counter()
+    response = session.post(f'{base_url}{path}', headers=headers, allow_redirects=False, data={
+        'email': email, 'password': password, 'csrf_token': match.group(1) if match else '',
+    })
+    return response.status_code, time.perf_counter() - started, response.headers.get('Location', '')
+
+
+def run_config(method, throttle, args):
+    workdir = tempfile.mkdtemp(prefix='bench-login-')
+    port = loadtest._free_port()
+    env = dict(os.environ,
+               PASSWORD_HASH_METHOD=method,
+               LOGIN_THROTTLE_ENABLED='true' if throttle else 'false',
+               TRUSTED_PROXY_COUNT='1',
+               SECRET_KEY='bench-secret',
+               FLASK_DEBUG='false',
+               LOG_LEVEL='WARNING',
+               METRICS_ENABLED='false')
+    server = subprocess.Popen([
+        sys.executable, '-m', 'gunicorn', 'app:app', '--pythonpath', ROOT,
+        '--bind', f'127.0.0.1:{port}', '--workers', '2', '--threads', '4', '--timeout', '120',
+    ], env=env, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not loadtest._wait_for_port(port):
+            raise SystemExit('Serverul nu a pornit')
+        base_url = f'http://127.0.0.1:{port}'
+        users = [f'user{i}@example.com' for i in range(args.legit)]
+        victims = [f'victim{i}@example.com' for i in range(args.victims)]
+        ip_counter = itertools.count(1)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda email: _post_form(base_url, '/register', email, PASSWORD, _ip(next(ip_counter))),
+                          users + victims))
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        legit_latencies, legit_failed = [], 0
+        attack = {'processed': 0, 'throttled': 0}
+
+        def legit_worker(email):
+            nonlocal legit_failed
+            while not stop.is_set():
+                status, elapsed, location = _post_form(base_url, '/login', email, PASSWORD, _ip(next(ip_counter)))
+                with lock:
+                    if status == 302 and '/login' not in location:
+                        legit_latencies.append(elapsed)
+                    else:
+                        legit_failed += 1
+
+        def attack_worker(index):
+            rnd = random.Random(index)
+            while not stop.is_set():
+                ip = f'192.0.2.{rnd.randrange(args.attack_ips)}'
+                status, _, _ = _post_form(base_url, '/login', rnd.choice(victims), f'ghicit-{rnd.random()}', ip)
+                with lock:
+                    attack['throttled' if status == 429 else 'processed'] += 1
+
+        cpu_before = _cpu_seconds(server.pid)
+        threads = [threading.Thread(target=legit_worker, args=(email,)) for email in users]
+        threads += [threading.Thread(target=attack_worker, args=(index,)) for index in range(args.attackers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        cpu = _cpu_seconds(server.pid) - cpu_before
+
+        latencies = sorted(legit_latencies)
+        return {
+            'method': method,
+            'throttle': throttle,
+            'legit_ok': len(latencies),
+            'legit_failed': legit_failed,
+            'legit_rps': len(latencies) / args.duration,
+            'legit_p50_ms': statistics.median(latencies) * 1000 if latencies else 0,
+            'legit_p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0,
+            'attack_processed': attack['processed'],
+            'attack_throttled': attack['throttled'],
+            'cpu_s': cpu,
+        }
+    finally:
+        loadtest.stop_stack([server], workdir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Login-uri legitime sub atac: metode de hash și limitarea încercărilor')
+    parser.add_argument('--methods', default='scrypt,scrypt:16384:8:1',
+                        help='metode PASSWORD_HASH_METHOD separate prin virgulă')
+    parser.add_argument('--throttle', choices=('both', 'on', 'off'), default='both')
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--legit', type=int, default=4, help='thread-uri cu login-uri corecte')
+    parser.add_argument('--attackers', type=int, default=16, help='thread-uri de atac')
+    parser.add_argument('--attack-ips', type=int, default=4, help='adrese de pe care vine atacul')
+    parser.add_argument('--victims', type=int, default=10, help='conturi existente atacate')
+    args = parser.parse_args(argv)
+
+    throttles = {'both': (False, True), 'on': (True,), 'off': (False,)}[args.throttle]
+    rows = [run_config(method, throttle, args) for method in args.methods.split(',') for throttle in throttles]
+    print(f"\n{args.duration:.0f}s, {args.legit} utilizatori legitimi, {args.attackers} thread-uri de atac "
+          f"de pe {args.attack_ips} IP-uri pe {args.victims} conturi\n")
+    print(f"{'metodă':24} {'limitare':>8} {'login/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'eșuate':>7} "
+          f"{'atac procesat':>14} {'atac refuzat':>13} {'CPU s':>7}")
+    for row in rows:
+        print(f"{row['method']:24} {'da' if row['throttle'] else 'nu':>8} {row['legit_rps']:8.1f} "
+              f"{row['legit_p50_ms']:8.1f} {row['legit_p95_ms']:8.1f} {row['legit_failed']:7} "
+              f"{row['attack_processed']:14} {row['attack_throttled']:13} {row['cpu_s']:7.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
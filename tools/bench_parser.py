@@ -0,0 +1,300 @@
+"""
+bench_parser.py - Micro-benchmark pentru recipe_parser (parsarea răspunsului Gemini)
+
+Compară `recipe_parser.parse_recipe_response` (și `ingredients_to_strings`) cu
+implementarea de dinainte, păstrată mai jos ca referință, pe un corpus de
+răspunsuri realiste: JSON curat, JSON în ```json```, JSON cu text în jur, JSON
+trunchiat, liste foarte lungi de pași, cantități ca text.
+
+Pentru fiecare caz verifică întâi că rezultatul e identic octet cu octet cu
+referința (serializat JSON), apoi raportează timpul per apel și accelerarea;
+cu `orjson` instalat compară și backend-ul `json` (`--no-orjson`).
+Codul de ieșire e 1 dacă vreun rezultat diferă.
+
+Rulare: python tools/bench_parser.py [--repeat 5] [--number 0] [--case fenced]
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import re
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'tools'))
+
+import recipe_parser  # noqa: E402
+from fake_gemini import build_recipe  # noqa: E402
+
+logger = logging.getLogger('bench_parser.reference')
+
+
+# ==================== REFERINȚĂ (implementarea din app.py de dinainte) ====================
+
+def _ingredients_to_strings(ingredients):
+    """
+    Normalizează lista de ingrediente (din obiecte sau șiruri) în șiruri; nu inventează cantități.
+    
+    Converteste ingredientele din format JSON (dict cu item, quantity, unit, notes)
+    în linii text formatate (ex: "• 200 g roșii (coapte)").
+    """
+    normalized = []
+    if isinstance(ingredients, list):
+        for ing in ingredients:
+            if isinstance(ing, dict):
+                item = (ing.get('item') or '').strip()
+                quantity = ing.get('quantity')
+                unit = (ing.get('unit') or '').strip()
+                notes = (ing.get('notes') or '').strip()
+                qty_parts = []
+                if quantity not in (None, ''):
+                    try:
+                        qty_parts.append(str(int(quantity)) if float(quantity) == int(float(quantity)) else str(quantity))
+                    except Exception:
+                        qty_parts.append(str(quantity))
+                if unit:
+                    qty_parts.append(unit)
+                qty_str = ' '.join(qty_parts).strip()
+                line = ('• ' + (f"{qty_str} " if qty_str else '') + item).strip()
+                if notes:
+                    line += f" ({notes})"
+                normalized.append(line)
+            elif isinstance(ing, str):
+                normalized.append(f"• {ing.strip()}")
+    return normalized
+
+
+def _ingredient_details(ingredients):
+    """
+    Ingredientele structurate (item, quantity, unit, notes), în aceeași ordine cu liniile
+    din `_ingredients_to_strings`; se salvează în `recipe_ingredients`.
+    """
+    details = []
+    if isinstance(ingredients, list):
+        for ing in ingredients:
+            if isinstance(ing, dict):
+                details.append({
+                    'item': (ing.get('item') or '').strip(),
+                    'quantity': ing.get('quantity') if isinstance(ing.get('quantity'), (int, float)) else None,
+                    'unit': (ing.get('unit') or '').strip(),
+                    'notes': (ing.get('notes') or '').strip(),
+                })
+            elif isinstance(ing, str):
+                details.append({'item': ing.strip(), 'quantity': None, 'unit': '', 'notes': ''})
+    return details
+
+
+def _step_details(instructions):
+    """Pașii structurați (text, time_minutes, temperature_c), în ordinea liniilor afișate."""
+    steps = []
+    for step_obj in instructions:
+        if isinstance(step_obj, dict):
+            time_val = step_obj.get('time_minutes')
+            temp_val = step_obj.get('temperature_c')
+            steps.append({
+                'text': (step_obj.get('text') or '').strip(),
+                'time_minutes': time_val if isinstance(time_val, (int, float)) else None,
+                'temperature_c': temp_val if isinstance(temp_val, (int, float)) else None,
+            })
+        else:
+            steps.append({'text': str(step_obj), 'time_minutes': None, 'temperature_c': None})
+    return steps
+
+
+
+def _instruction_to_string(step_obj):
+    """Formatează un pas (dict cu text, time_minutes, temperature_c) ca linie de afișare."""
+    if isinstance(step_obj, dict):
+        # Nu adăugăm prefix numeric; UI-ul se ocupă de numerotare
+        text = (step_obj.get('text') or '').strip()
+        time_val = step_obj.get('time_minutes')
+        temp_val = step_obj.get('temperature_c')
+        extras = []
+        if isinstance(time_val, (int, float)):
+            extras.append(f"~{int(time_val) if float(time_val).is_integer() else time_val} min")
+        if isinstance(temp_val, (int, float)):
+            extras.append(f"{int(temp_val) if float(temp_val).is_integer() else temp_val}°C")
+        suffix = f" ({' | '.join(extras)})" if extras else ''
+        return f"{text}{suffix}".strip()
+    return str(step_obj)
+
+
+def parse_recipe_response(response_text, original_ingredients):
+    """
+    Parsează STRICT JSON-ul din răspunsul AI.
+    
+    Extrage JSON din răspunsul Gemini (care poate conține markdown ```json```),
+    validează structura și formatează ingredientele/instrucțiunile pentru afișare.
+    
+    Returns:
+        dict sau None: rețeta structurată cu toate câmpurile, sau None la eroare de parsare
+    """
+    try:
+        json_text = response_text.strip()
+        if json_text.startswith('```'):
+            json_text = re.sub(r"^```[a-zA-Z]*", "", json_text).strip()
+            if json_text.endswith('```'):
+                json_text = json_text[:-3].strip()
+
+        try:
+            data = json.loads(json_text)
+        except Exception:
+            start = json_text.find('{')
+            end = json_text.rfind('}')
+            if start != -1 and end != -1 and end > start:
+                possible_json = json_text[start:end + 1]
+                data = json.loads(possible_json)
+            else:
+                logger.warning("JSON not found in AI response preview=%s", json_text[:200].replace('\n', ' '))
+                return None
+
+        if not isinstance(data, dict):
+            logger.warning("AI response is not a JSON object")
+            return None
+
+        servings = data.get('servings')
+        prep_time = data.get('prep_time_minutes')
+        cook_time = data.get('cook_time_minutes')
+        try:
+            servings = int(servings) if servings is not None else None
+        except Exception:
+            servings = None
+        try:
+            prep_time = int(prep_time) if prep_time is not None else None
+        except Exception:
+            prep_time = None
+        try:
+            cook_time = int(cook_time) if cook_time is not None else None
+        except Exception:
+            cook_time = None
+
+        ingredient_details = _ingredient_details(data.get('ingredients') or [])
+        parsed = {
+            'title': (data.get('title') or '').strip() or None,
+            'ingredients': _ingredients_to_strings(data.get('ingredients') or []),
+            'ingredient_items': [detail['item'] for detail in ingredient_details],
+            'ingredient_details': ingredient_details,
+            'instructions': [_instruction_to_string(step) for step in (data.get('instructions') or [])],
+            'steps': _step_details(data.get('instructions') or []),
+            'difficulty': int(data.get('difficulty') or 3),
+            'wine_pairing': (data.get('wine_pairing') or '').strip(),
+            'servings': servings,
+            'prep_time_minutes': prep_time,
+            'cook_time_minutes': cook_time,
+            'total_time_minutes': (prep_time or 0) + (cook_time or 0) if (prep_time or cook_time) else None
+        }
+        logger.debug("Parsed recipe keys: %s", list(parsed.keys()))
+        return parsed
+    except Exception:
+        logger.exception("Error while parsing AI response")
+        return None
+
+
+# ==================== CORPUS ====================
+def build_corpus(seed=7):
+    """Cazurile benchmark-ului: nume -> text de răspuns al modelului."""
+    rng = random.Random(seed)
+    recipe = build_recipe(['pui', 'cartofi', 'usturoi', 'roșii', 'smântână', 'mărar'], rng)
+    text = json.dumps(recipe, ensure_ascii=False, indent=2)
+
+    huge = build_recipe(['vită', 'ceapă', 'morcovi', 'țelină', 'vin roșu'], rng)
+    huge['instructions'] = [
+        {'step': n, 'text': f"Pasul {n}: amestecă și verifică gustul, ajustând focul după nevoie.",
+         'time_minutes': rng.choice([1, 2.5, 5, 10]), 'temperature_c': rng.choice([None, 180, 200])}
+        for n in range(1, 401)
+    ]
+    huge['ingredients'] = huge['ingredients'] * 20
+
+    text_quantities = dict(recipe, ingredients=[
+        {'item': 'făină', 'quantity': '500', 'unit': 'g', 'notes': 'cernută'},
+        {'item': 'lapte', 'quantity': '1/2', 'unit': 'l', 'notes': ''},
+        {'item': 'ouă', 'quantity': '2.0', 'unit': 'buc', 'notes': ''},
+        {'item': 'zahăr', 'quantity': 1.5, 'unit': 'linguri', 'notes': None},
+        {'item': 'sare', 'quantity': None, 'unit': '', 'notes': 'după gust'},
+        'un praf de scorțișoară',
+    ], servings='4', prep_time_minutes='15 min')
+
+    odd_values = dict(recipe, instructions=[
+        'Pas dat doar ca text.',
+        {'text': '  Fierbe  ', 'time_minutes': 2.5, 'temperature_c': 100.0},
+        {'text': 'Coace', 'time_minutes': True, 'temperature_c': '180'},
+        {'text': None, 'time_minutes': 1e300},
+        ['pas', 'ca', 'listă'],
+    ], ingredients=[{'item': 'ouă', 'quantity': True}, {'item': ' apă ', 'quantity': 1e20, 'unit': None}, 42],
+        difficulty='4')
+
+    return {
+        'clean': text,
+        'compact': json.dumps(recipe, ensure_ascii=False),
+        'fenced': f"```json\n{text}\n```",
+        'prose': f"Desigur! Iată o rețetă cu ingredientele tale:\n\n```json\n{text}\n```\n\nPoftă bună!",
+        'truncated': f"```json\n{text[:len(text) * 2 // 3]}",
+        'no_json': 'Îmi pare rău, nu pot genera o rețetă cu aceste ingrediente.',
+        'huge_steps': f"```json\n{json.dumps(huge, ensure_ascii=False, indent=2)}\n```",
+        'text_quantities': json.dumps(text_quantities, ensure_ascii=False),
+        'odd_values': json.dumps(odd_values, ensure_ascii=False),
+        'nan_and_bigint': text.replace('"servings": ', '"servings": 12345678901234567890123, "x": NaN, "_": ', 1),
+    }
+
+
+def _serialize(value):
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, allow_nan=True)
+
+
+def _time_call(func, arg, repeat, number):
+    timer = timeit.Timer(lambda: func(arg, 'pui, cartofi'))
+    if not number:
+        number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark recipe_parser vs. implementarea de referință')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--number', type=int, default=0, help='apeluri per repetare (0 = automat)')
+    parser.add_argument('--case', action='append', help='rulează doar aceste cazuri')
+    parser.add_argument('--no-orjson', action='store_true', help='dezactivează orjson în recipe_parser')
+    args = parser.parse_args(argv)
+
+    # Avertismentele se formatează ca în producție, dar nu se afișează
+    handler = logging.StreamHandler(io.StringIO())
+    logging.basicConfig(level=logging.INFO, handlers=[handler])
+    if args.no_orjson:
+        recipe_parser.orjson = None
+
+    corpus = build_corpus()
+    cases = args.case or list(corpus)
+    mismatches = 0
+    print(f"backend: {'orjson ' + recipe_parser.orjson.__version__ if recipe_parser.orjson else 'json'}\n")
+    print(f"{'caz':18} {'octeți':>8} {'referință µs':>13} {'nou µs':>9} {'accelerare':>11}  identic")
+    for name in cases:
+        text = corpus[name]
+        expected = _serialize(parse_recipe_response(text, 'pui, cartofi'))
+        actual = _serialize(recipe_parser.parse_recipe_response(text, 'pui, cartofi'))
+        same = expected == actual
+        mismatches += not same
+        old = _time_call(parse_recipe_response, text, args.repeat, args.number)
+        new = _time_call(recipe_parser.parse_recipe_response, text, args.repeat, args.number)
+        print(f"{name:18} {len(text.encode('utf-8')):8d} {old * 1e6:13.1f} {new * 1e6:9.1f} {old / new:10.2f}x  {'da' if same else 'NU'}")
+
+    # Formatarea ingredientelor separat (apelată și per ingredient în modul streaming)
+    ingredients = json.loads(corpus['huge_steps'].strip('`json\n'))['ingredients']
+    same = _ingredients_to_strings(ingredients) == recipe_parser.ingredients_to_strings(ingredients)
+    mismatches += not same
+    old = min(timeit.repeat(lambda: _ingredients_to_strings(ingredients), repeat=args.repeat, number=200)) / 200
+    new = min(timeit.repeat(lambda: recipe_parser.ingredients_to_strings(ingredients), repeat=args.repeat, number=200)) / 200
+    print(f"\n_ingredients_to_strings ({len(ingredients)} ingrediente): {old * 1e6:.1f} µs -> {new * 1e6:.1f} µs "
+          f"({old / new:.2f}x), identic: {'da' if same else 'NU'}")
+
+    if mismatches:
+        print(f"\n{mismatches} rezultate diferă de referință")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,360 @@
+"""
+fake_gemini.py - Server HTTP local care imită API-ul Gemini (pentru load test și dezvoltare)
+
+Răspunde la `POST /v1beta/models/<model>:generateContent` și
+`:streamGenerateContent?alt=sse` cu o rețetă JSON construită din ingredientele
+din prompt, fără cheie API și fără cost. Aplicația îl folosește prin:
+
+    GEMINI_BASE_URL=http://127.0.0.1:8765/v1beta GEMINI_API_KEY=fake gunicorn app:app ...
+
+Comportamente configurabile (vezi `--help`):
+- latență log-normală (p50 / p95), împărțită pe bucăți în modul streaming; altă latență per
+  model (`--model-latency`) și o coadă lentă injectată (`--slow-rate` / `--slow-factor`: o cerere
+  din N așteaptă înainte de primul byte de câteva ori latența ei, ca la o replică supraîncărcată)
+- erori 5xx și 429 (cu Retry-After) cu probabilitate dată
+- stream-uri întrerupte per model (`--model-cut`): după jumătate din bucăți conexiunea se
+  închide fără `finishReason` (rețeta parțială începe, dar JSON-ul rămâne incomplet)
+- răspunsuri învelite în ```json ... ``` sau JSON invalid/trunchiat (doar trunchiat dacă cererea
+  are `responseMimeType: application/json`, ca API-ul real)
+- `generationConfig`: numărul de pași din `responseSchema` (minItems/maxItems) și
+  `maxOutputTokens` (textul e tăiat, cu `finishReason: MAX_TOKENS`)
+
+`GET /stats` întoarce contoarele cererilor servite, inclusiv numărul maxim de
+cereri în curs simultan (`max_in_flight`), cererile per model, stream-urile
+închise de client înainte de final (`disconnected`, încercările anulate) și cele
+întrerupte de server (`cut`).
+
+Rulare: python tools/fake_gemini.py --port 8765 --latency-p50 1.5 --latency-p95 4 --error-rate 0.02
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+_ROUTE_RE = re.compile(r"^/v1beta/models/(?P<model>[^/:]+):(?P<method>generateContent|streamGenerateContent)$")
+_INGREDIENTS_RE = re.compile(r"ingredientele principale:\s*(?P<ingredients>.+?)\.\s+Poți", re.S)
+
+_UNITS = ['g', 'g', 'ml', 'buc', 'linguri', 'lingurițe']
+_STEP_TEMPLATES = [
+    'Spală și pregătește {a}.',
+    'Taie {a} în bucăți potrivite.',
+    'Încinge uleiul într-o tigaie la foc mediu.',
+    'Adaugă {a} și călește ușor.',
+    'Pune {b} și amestecă bine.',
+    'Condimentează cu sare și piper după gust.',
+    'Adaugă puțină apă și lasă să fiarbă la foc mic.',
+    'Transferă totul într-o tavă de copt.',
+    'Coace în cuptorul preîncălzit.',
+    'Verifică dacă {a} este gătit(ă) complet.',
+    'Lasă preparatul să se odihnească câteva minute.',
+    'Servește cald, ornat cu verdeață.',
+]
+
+
+class FakeGeminiConfig:
+    def __init__(self, latency_p50=1.0, latency_p95=3.0, error_rate=0.0, rate_limit_rate=0.0,
+                 retry_after=1, fenced_rate=0.3, malformed_rate=0.0, stream_chunks=8, seed=None,
+                 model_latency=None, slow_rate=0.0, slow_factor=5.0, model_cut=None):
+        self.latency_p50 = latency_p50
+        self.latency_p95 = latency_p95
+        # model -> (p50, p95); modelele lipsă folosesc latența implicită
+        self.model_latency = dict(model_latency or {})
+        # model -> probabilitatea ca un stream să fie întrerupt la jumătate
+        self.model_cut = dict(model_cut or {})
+        self.slow_rate = slow_rate
+        self.slow_factor = slow_factor
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.fenced_rate = fenced_rate
+        self.malformed_rate = malformed_rate
+        self.stream_chunks = max(1, stream_chunks)
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'ok': 0, 'errors': 0, 'rate_limited': 0, 'malformed': 0, 'streams': 0,
+                      'in_flight': 0, 'max_in_flight': 0, 'slow': 0, 'disconnected': 0, 'cut': 0, 'models': {}}
+
+    def latency(self, model=None):
+        """
+        Latență log-normală cu mediana `latency_p50` și percentila 95 `latency_p95` (secunde),
+        sau cele din `model_latency` pentru `model`.
+        """
+        p50, p95 = self.model_latency.get(model, (self.latency_p50, self.latency_p95))
+        if p50 <= 0:
+            return 0.0
+        sigma = math.log(max(p95, p50) / p50) / 1.645
+        with self.lock:
+            return self.random.lognormvariate(math.log(p50), sigma)
+
+    def stall(self, latency):
+        """Așteptarea înaintea răspunsului unei cereri lente (`slow_rate`), altfel 0."""
+        if not self.roll(self.slow_rate):
+            return 0.0
+        self.count('slow')
+        return latency * (self.slow_factor - 1)
+
+    def roll(self, probability):
+        with self.lock:
+            return self.random.random() < probability
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def count_model(self, model):
+        with self.lock:
+            self.stats['models'][model] = self.stats['models'].get(model, 0) + 1
+
+    def enter(self):
+        with self.lock:
+            self.stats['in_flight'] += 1
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.stats['in_flight'])
+
+    def leave(self):
+        with self.lock:
+            self.stats['in_flight'] -= 1
+
+
+def _prompt_ingredients(body):
+    try:
+        prompt = body['contents'][0]['parts'][0]['text']
+    except (KeyError, IndexError, TypeError):
+        return ['pui', 'cartofi']
+    match = _INGREDIENTS_RE.search(prompt)
+    text = match.group('ingredients') if match else prompt[-200:]
+    items = [part.strip() for part in re.split(r"[,;\n]+|\s+și\s+|\s+si\s+", text) if part.strip()]
+    return items[:12] or ['pui', 'cartofi']
+
+
+def _step_count(config, rng):
+    """Numărul de pași: între minItems și maxItems din responseSchema, altfel toate șabloanele."""
+    try:
+        steps = config['responseSchema']['properties']['instructions']
+    except (KeyError, TypeError):
+        return len(_STEP_TEMPLATES)
+    low = int(steps.get('minItems') or 1)
+    high = int(steps.get('maxItems') or max(low, len(_STEP_TEMPLATES)))
+    return rng.randint(low, max(low, high))
+
+
+def build_recipe(ingredients, rng, step_count=None):
+    """O rețetă plauzibilă în schema cerută de prompt-ul aplicației."""
+    main = ingredients[0]
+    steps = []
+    for index in range(1, (step_count or len(_STEP_TEMPLATES)) + 1):
+        template = _STEP_TEMPLATES[(index - 1) % len(_STEP_TEMPLATES)]
+        text = template.format(a=main, b=ingredients[min(index, len(ingredients) - 1)])
+        temperature = 200 if 'cuptor' in text else None
+        steps.append({'step': index, 'text': text, 'time_minutes': rng.choice([2, 5, 10, 15, 25]),
+                      'temperature_c': temperature})
+    return {
+        'title': f"{main.capitalize()} cu {', '.join(ingredients[1:3]) or 'legume'} la cuptor",
+        'servings': rng.randint(2, 6),
+        'prep_time_minutes': rng.choice([10, 15, 20]),
+        'cook_time_minutes': rng.choice([25, 35, 45]),
+        'ingredients': [
+            {'item': item, 'quantity': rng.choice([1, 2, 100, 200, 250, 500]), 'unit': rng.choice(_UNITS), 'notes': ''}
+            for item in ingredients
+        ] + [{'item': 'ulei de măsline', 'quantity': 2, 'unit': 'linguri', 'notes': ''}],
+        'instructions': steps,
+        'difficulty': rng.randint(1, 5),
+        'wine_pairing': 'Un vin alb sec, servit rece (ex: Fetească Albă).',
+    }
+
+
+# Lungimea unei rețete complete (toate șabloanele de pași): la ea latența e cea configurată
+_REFERENCE_CHARS = len(json.dumps(build_recipe(['pui', 'cartofi', 'ceapă'], random.Random(0)), ensure_ascii=False, indent=2))
+
+
+def _candidate(text, usage=None, finish_reason=None):
+    candidate = {'content': {'role': 'model', 'parts': [{'text': text}]}}
+    if finish_reason:
+        candidate['finishReason'] = finish_reason
+    payload = {'candidates': [candidate]}
+    if usage:
+        payload['usageMetadata'] = usage
+    return payload
+
+
+def _usage(body, text):
+    """usageMetadata aproximativ (~4 caractere pe token), ca în răspunsurile reale."""
+    prompt_tokens = len(json.dumps(body, ensure_ascii=False)) // 4
+    output_tokens = len(text) // 4
+    return {'promptTokenCount': prompt_tokens, 'candidatesTokenCount': output_tokens,
+            'totalTokenCount': prompt_tokens + output_tokens}
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = FakeGeminiConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if urlparse(self.path).path == '/stats':
+            with self.config.lock:
+                stats = dict(self.config.stats, models=dict(self.config.stats['models']))
+            self._send_json(200, stats)
+        else:
+            self._send_json(404, {'error': {'code': 404, 'message': 'not found'}})
+
+    def do_POST(self):
+        config = self.config
+        url = urlparse(self.path)
+        match = _ROUTE_RE.match(url.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        if not match:
+            self._send_json(404, {'error': {'code': 404, 'message': 'not found'}})
+            return
+        config.count('requests')
+        config.count_model(match.group('model'))
+        config.enter()
+        try:
+            if config.roll(config.rate_limit_rate):
+                config.count('rate_limited')
+                self._send_json(429, {'error': {'code': 429, 'message': 'Resource has been exhausted', 'status': 'RESOURCE_EXHAUSTED'}},
+                                headers={'Retry-After': str(config.retry_after)})
+                return
+            if config.roll(config.error_rate):
+                config.count('errors')
+                time.sleep(config.latency(match.group('model')) / 4)
+                self._send_json(503, {'error': {'code': 503, 'message': 'The model is overloaded', 'status': 'UNAVAILABLE'}})
+                return
+
+            try:
+                body = json.loads(raw or b'{}')
+            except ValueError:
+                self._send_json(400, {'error': {'code': 400, 'message': 'Invalid JSON payload'}})
+                return
+
+            generation = body.get('generationConfig') if isinstance(body.get('generationConfig'), dict) else {}
+            structured = generation.get('responseMimeType') == 'application/json'
+            with config.lock:
+                recipe = build_recipe(_prompt_ingredients(body), config.random, _step_count(generation, config.random))
+            text = json.dumps(recipe, ensure_ascii=False, indent=2)
+            if config.roll(config.malformed_rate):
+                config.count('malformed')
+                text = text[:len(text) // 2] if structured else 'Desigur! Iată rețeta:\n' + text[:len(text) // 2]
+            elif not structured and config.roll(config.fenced_rate):
+                text = f"```json\n{text}\n```"
+            finish_reason = 'STOP'
+            max_tokens = generation.get('maxOutputTokens')
+            if max_tokens and len(text) // 4 > max_tokens:
+                text, finish_reason = text[:max_tokens * 4], 'MAX_TOKENS'
+
+            # Latența crește cu lungimea răspunsului (referința: rețeta completă, ~12 pași)
+            latency = config.latency(match.group('model')) * len(text) / _REFERENCE_CHARS
+            time.sleep(config.stall(latency))
+            if match.group('method') == 'streamGenerateContent' and parse_qs(url.query).get('alt') == ['sse']:
+                config.count('streams')
+                cut = config.roll(config.model_cut.get(match.group('model'), 0.0))
+                if not self._stream(text, latency, _usage(body, text), finish_reason, cut):
+                    config.count('disconnected')
+                    return
+                if cut:
+                    config.count('cut')
+                    return
+            else:
+                time.sleep(latency)
+                self._send_json(200, _candidate(text, _usage(body, text), finish_reason))
+            config.count('ok')
+        finally:
+            config.leave()
+
+    def _stream(self, text, latency, usage, finish_reason, cut=False):
+        """
+        SSE cu `stream_chunks` bucăți de text; latența totală e împărțită între ele, usageMetadata pe ultima.
+        Cu `cut` se trimite doar prima jumătate a bucăților. False dacă clientul a închis conexiunea înainte de final.
+        """
+        chunks = self.config.stream_chunks
+        size = math.ceil(len(text) / chunks)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        for index, start in enumerate(range(0, len(text), size)):
+            if cut and index >= max(1, chunks // 2):
+                return True
+            time.sleep(latency / chunks)
+            last = start + size >= len(text)
+            payload = json.dumps(_candidate(text[start:start + size], usage if last else None,
+                                            finish_reason if last else None), ensure_ascii=False)
+            try:
+                self.wfile.write(f"data: {payload}\r\n\r\n".encode('utf-8'))
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                return False
+        return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Server local care imită API-ul Gemini')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-p50', type=float, default=1.0, help='mediana latenței pentru o rețetă completă (secunde)')
+    parser.add_argument('--latency-p95', type=float, default=3.0, help='percentila 95 a latenței (secunde)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='probabilitatea unui 503')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='probabilitatea unui 429')
+    parser.add_argument('--retry-after', type=int, default=1, help='valoarea Retry-After la 429 (secunde)')
+    parser.add_argument('--fenced-rate', type=float, default=0.3, help='probabilitatea ca JSON-ul să fie în ```json```')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='probabilitatea unui JSON invalid/trunchiat')
+    parser.add_argument('--stream-chunks', type=int, default=8, help='bucăți per răspuns în modul streaming')
+    parser.add_argument('--model-latency', action='append', default=[], metavar='MODEL=P50:P95',
+                        help='latența altui model (repetabil), ex: gemini-2.5-flash-lite=0.6:1.2')
+    parser.add_argument('--model-cut', action='append', default=[], metavar='MODEL=RATE',
+                        help='probabilitatea ca stream-ul unui model să fie întrerupt la jumătate (repetabil)')
+    parser.add_argument('--slow-rate', type=float, default=0.0, help='probabilitatea unei cereri lente (coada latenței)')
+    parser.add_argument('--slow-factor', type=float, default=5.0, help='de câte ori durează mai mult o cerere lentă')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+    model_latency = {}
+    for spec in args.model_latency:
+        model, _, values = spec.partition('=')
+        p50, _, p95 = values.partition(':')
+        model_latency[model] = (float(p50), float(p95 or p50))
+    model_cut = {}
+    for spec in args.model_cut:
+        model, _, rate = spec.partition('=')
+        model_cut[model] = float(rate)
+
+    FakeGeminiHandler.config = FakeGeminiConfig(
+        latency_p50=args.latency_p50, latency_p95=args.latency_p95, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after, fenced_rate=args.fenced_rate,
+        malformed_rate=args.malformed_rate, stream_chunks=args.stream_chunks, seed=args.seed,
+        model_latency=model_latency, slow_rate=args.slow_rate, slow_factor=args.slow_factor,
+        model_cut=model_cut,
+    )
+    # Backlog mare: benchmark-urile deschid sute de conexiuni simultan
+    ThreadingHTTPServer.request_queue_size = 1024
+    server = ThreadingHTTPServer((args.host, args.port), FakeGeminiHandler)
+    server.daemon_threads = True
+    print(f"Fake Gemini pe http://{args.host}:{args.port}/v1beta (GEMINI_BASE_URL)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,348 @@
+"""
+loadtest.py - Test de încărcare end-to-end (login, generare, salvare, galerie, detalii)
+
+Fiecare utilizator virtual (un thread cu sesiunea lui) se înregistrează, se
+autentifică și apoi repetă fluxul complet:
+generate_recipe -> polling job -> rețeta randată -> save_recipe -> gallery /
+api/gallery / search -> detaliile unei rețete.
+
+La final afișează per rută: număr de cereri, erori, throughput și latențele
+p50/p95/p99/max. Cu `--spawn` pornește singur serverul Gemini fals
+(tools/fake_gemini.py) și Gunicorn cu modelul de workeri/thread-uri din
+Procfile, pe o bază de date temporară.
+
+Exemple:
+    python tools/loadtest.py --spawn --users 16 --duration 60
+    python tools/loadtest.py --spawn --workers 4 --threads 8 --latency-p50 2 --error-rate 0.05
+    python tools/loadtest.py --base-url http://127.0.0.1:8001 --users 8 --iterations 3
+
+Codul de ieșire e 1 dacă rata de erori depășește `--max-error-rate` sau p95 al
+unei rute depășește `--max-p95-ms` (pentru rulare înainte de deploy).
+"""
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INGREDIENTS = [
+    'pui', 'cartofi', 'usturoi', 'ceapă', 'roșii', 'brânză', 'ouă', 'orez', 'fasole', 'vită',
+    'porc', 'smântână', 'mărar', 'pătrunjel', 'ardei', 'dovlecel', 'vinete', 'morcovi',
+    'ciuperci', 'lapte', 'făină', 'spanac', 'linte', 'somon', 'paste', 'mazăre',
+]
+
+_RECIPE_LINK_RE = re.compile(r'/recipe/(\d+)')
+_JOB_RE = re.compile(r'/jobs/([0-9a-f]+)$')
+
+
+def percentile(sorted_values, pct):
+    """Percentila `pct` (nearest-rank) dintr-o listă sortată."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Stats:
+    """Latențele și erorile per rută (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(list)
+        self._errors = defaultdict(int)
+        self._statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, route, elapsed, ok, status):
+        with self._lock:
+            self._latencies[route].append(elapsed)
+            self._statuses[route][status] += 1
+            if not ok:
+                self._errors[route] += 1
+
+    def summary(self, duration):
+        rows = []
+        with self._lock:
+            for route in sorted(self._latencies):
+                values = sorted(self._latencies[route])
+                count = len(values)
+                rows.append({
+                    'route': route,
+                    'count': count,
+                    'errors': self._errors[route],
+                    'error_rate': self._errors[route] / count if count else 0.0,
+                    'rps': count / duration if duration else 0.0,
+                    'p50_ms': percentile(values, 50) * 1000,
+                    'p95_ms': percentile(values, 95) * 1000,
+                    'p99_ms': percentile(values, 99) * 1000,
+                    'max_ms': values[-1] * 1000 if values else 0.0,
+                    'statuses': dict(self._statuses[route]),
+                })
+        return rows
+
+
+class VirtualUser:
+    def __init__(self, base_url, index, stats, args, rng):
+        self.base_url = base_url.rstrip('/')
+        self.index = index
+        self.stats = stats
+        self.args = args
+        self.rng = rng
+        self.session = requests.Session()
+        self.email = f"load-{os.getpid()}-{index}-{rng.randrange(1 << 30)}@example.com"
+
+    def _csrf(self):
+        return self.session.cookies.get('csrf_token', '')
+
+    def request(self, route, method, path, expect=(200,), **kwargs):
+        kwargs.setdefault('allow_redirects', False)
+        kwargs.setdefault('timeout', self.args.timeout)
+        headers = kwargs.pop('headers', {})
+        if method != 'GET':
+            headers['X-CSRFToken'] = self._csrf()
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, headers=headers, **kwargs)
+        except requests.RequestException:
+            self.stats.record(route, time.perf_counter() - started, False, 'exception')
+            return None
+        ok = response.status_code in expect
+        self.stats.record(route, time.perf_counter() - started, ok, response.status_code)
+        return response
+
+    def setup(self):
+        self.request('GET /register', 'GET', '/register')
+        form = {'email': self.email, 'password': 'load-test-password', 'csrf_token': self._csrf()}
+        self.request('POST /register', 'POST', '/register', data=form, expect=(302,))
+        form['csrf_token'] = self._csrf()
+        response = self.request('POST /login', 'POST', '/login', data=form, expect=(302,))
+        return response is not None and response.status_code == 302
+
+    def _ingredients(self):
+        # Un pool mic de combinații produce hit-uri în cache; `--distinct` controlează rata
+        combo_rng = random.Random(self.rng.randrange(self.args.distinct))
+        return ', '.join(combo_rng.sample(INGREDIENTS, combo_rng.randint(2, 5)))
+
+    def generate(self):
+        """POST /generate_recipe, apoi polling pe job până la rezultat; întoarce ingredientele sau None."""
+        ingredients = self._ingredients()
+        started = time.perf_counter()
+        response = self.request('POST /generate_recipe', 'POST', '/generate_recipe', expect=(200, 302), data={
+            'ingredients': ingredients, 'generate_anyway': '1', 'csrf_token': self._csrf(),
+        })
+        if response is None:
+            return None
+        location = response.headers.get('Location', '')
+        job = _JOB_RE.search(location)
+        if response.status_code == 302 and job:
+            deadline = time.monotonic() + self.args.job_timeout
+            status = 'queued'
+            while status not in ('done', 'failed') and time.monotonic() < deadline:
+                time.sleep(self.args.poll_interval)
+                poll = self.request('GET /jobs/<id>/status', 'GET', f'/jobs/{job.group(1)}/status')
+                status = poll.json().get('status') if poll is not None and poll.status_code == 200 else status
+            page = self.request('GET /jobs/<id>', 'GET', f'/jobs/{job.group(1)}', expect=(200,))
+            ok = status == 'done' and page is not None and page.status_code == 200
+        else:
+            # Rețetă din cache (randată direct) sau redirect la index (limită / coadă plină)
+            ok = response.status_code == 200
+        self.stats.record('generate (end-to-end)', time.perf_counter() - started, ok, 'done' if ok else 'failed')
+        return ingredients if ok else None
+
+    def save(self, ingredients):
+        items = [item.strip() for item in ingredients.split(',')]
+        recipe = {
+            'title': f"Load test {items[0]} {self.rng.randrange(1 << 20)}",
+            'ingredients': [f"• 200 g {item}" for item in items],
+            'ingredient_items': items,
+            'instructions': [f"Pasul {n} (~{5 * n} min)" for n in range(1, 11)],
+            'difficulty': self.rng.randint(1, 5),
+            'wine_pairing': 'Fetească Albă',
+        }
+        # 409: galeria are deja o rețetă aproape identică (aceleași ingrediente) - răspuns normal
+        response = self.request('POST /save_recipe', 'POST', '/save_recipe', expect=(200, 409), json=recipe)
+        return response is not None and response.status_code == 200 and response.json().get('success')
+
+    def browse(self):
+        gallery = self.request('GET /gallery', 'GET', '/gallery')
+        ids = _RECIPE_LINK_RE.findall(gallery.text) if gallery is not None and gallery.status_code == 200 else []
+        page = self.request('GET /api/gallery', 'GET', '/api/gallery')
+        cursor = page.json().get('next_cursor') if page is not None and page.status_code == 200 else None
+        if cursor:
+            self.request('GET /api/gallery?cursor', 'GET', '/api/gallery', params={'cursor': cursor})
+        self.request('GET /search', 'GET', '/search', expect=(200, 503), params={'q': self.rng.choice(INGREDIENTS)})
+        if ids:
+            self.request('GET /recipe/<id>', 'GET', f'/recipe/{self.rng.choice(ids)}')
+
+    def run(self, stop_at, iterations):
+        if not self.setup():
+            return
+        done = 0
+        while time.monotonic() < stop_at and (not iterations or done < iterations):
+            ingredients = self.generate()
+            if ingredients and self.rng.random() < self.args.save_ratio:
+                self.save(ingredients)
+            self.browse()
+            done += 1
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def spawn_stack(args):
+    """Pornește fake Gemini + Gunicorn (bază de date temporară); întoarce (base_url, procese, director)."""
+    workdir = tempfile.mkdtemp(prefix='loadtest-')
+    gemini_port, app_port = _free_port(), _free_port()
+    fake = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, 'tools', 'fake_gemini.py'), '--port', str(gemini_port),
+        '--latency-p50', str(args.latency_p50), '--latency-p95', str(args.latency_p95),
+        '--error-rate', str(args.error_rate), '--rate-limit-rate', str(args.rate_limit_rate),
+        '--fenced-rate', str(args.fenced_rate), '--malformed-rate', str(args.malformed_rate),
+    ], stdout=subprocess.DEVNULL)
+    env = dict(os.environ,
+               GEMINI_API_KEY='fake-key',
+               GEMINI_BASE_URL=f'http://127.0.0.1:{gemini_port}/v1beta',
+               GEMINI_STREAMING='true' if args.streaming else 'false',
+               QUOTA_USER_DAILY_LIMIT='1000000',
+               LOGIN_THROTTLE_ENABLED='false',
+               SECRET_KEY='load-test-secret',
+               FLASK_DEBUG='false',
+               LOG_LEVEL=args.app_log_level)
+    app = subprocess.Popen([
+        sys.executable, '-m', 'gunicorn', 'app:app',
+        '--pythonpath', ROOT, '--chdir', workdir,
+        '--bind', f'127.0.0.1:{app_port}',
+        '--workers', str(args.workers), '--threads', str(args.threads), '--timeout', '120',
+    ], env=env, cwd=workdir, stdout=subprocess.DEVNULL, stderr=None if args.app_log_level == 'DEBUG' else subprocess.DEVNULL)
+    processes = [fake, app]
+    if not (_wait_for_port(gemini_port) and _wait_for_port(app_port)):
+        stop_stack(processes, workdir)
+        raise SystemExit('Nu au pornit fake Gemini / Gunicorn')
+    return f'http://127.0.0.1:{app_port}', processes, workdir, gemini_port
+
+
+def stop_stack(processes, workdir):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_report(rows, duration, users):
+    print(f"\n{users} utilizatori, {duration:.1f}s\n")
+    header = f"{'ruta':28} {'cereri':>7} {'erori':>6} {'err%':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        print(f"{row['route']:28} {row['count']:7d} {row['errors']:6d} {row['error_rate'] * 100:6.1f} "
+              f"{row['rps']:7.2f} {row['p50_ms']:8.1f} {row['p95_ms']:8.1f} {row['p99_ms']:8.1f} {row['max_ms']:8.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test end-to-end pentru Recipe AI Generator')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8001', help='aplicația testată (ignorat cu --spawn)')
+    parser.add_argument('--spawn', action='store_true', help='pornește fake Gemini + Gunicorn pe o bază temporară')
+    parser.add_argument('--users', type=int, default=8, help='utilizatori virtuali concurenți')
+    parser.add_argument('--duration', type=float, default=30, help='durata testului (secunde)')
+    parser.add_argument('--iterations', type=int, default=0, help='iterații per utilizator (0 = până expiră durata)')
+    parser.add_argument('--distinct', type=int, default=50, help='combinații distincte de ingrediente (controlează rata de cache hit)')
+    parser.add_argument('--save-ratio', type=float, default=0.5, help='fracțiunea de rețete generate care se salvează')
+    parser.add_argument('--poll-interval', type=float, default=0.5)
+    parser.add_argument('--job-timeout', type=float, default=180)
+    parser.add_argument('--timeout', type=float, default=60, help='timeout per cerere HTTP')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--json', dest='json_path', help='scrie raportul și în acest fișier JSON')
+    parser.add_argument('--max-error-rate', type=float, default=None, help='eșuează dacă o rută depășește rata de erori')
+    parser.add_argument('--max-p95-ms', type=float, default=None, help='eșuează dacă p95 al unei rute (fără generare) depășește pragul')
+    spawn = parser.add_argument_group('--spawn')
+    spawn.add_argument('--workers', type=int, default=2)
+    spawn.add_argument('--threads', type=int, default=4)
+    spawn.add_argument('--streaming', action='store_true', help='GEMINI_STREAMING=true în aplicație')
+    spawn.add_argument('--latency-p50', type=float, default=1.0)
+    spawn.add_argument('--latency-p95', type=float, default=3.0)
+    spawn.add_argument('--error-rate', type=float, default=0.0)
+    spawn.add_argument('--rate-limit-rate', type=float, default=0.0)
+    spawn.add_argument('--fenced-rate', type=float, default=0.3)
+    spawn.add_argument('--malformed-rate', type=float, default=0.0)
+    spawn.add_argument('--app-log-level', default='WARNING')
+    args = parser.parse_args(argv)
+
+    processes, workdir, gemini_port = [], None, None
+    base_url = args.base_url
+    if args.spawn:
+        base_url, processes, workdir, gemini_port = spawn_stack(args)
+        print(f"Aplicație: {base_url} (workers={args.workers}, threads={args.threads}), fake Gemini: :{gemini_port}")
+
+    rng = random.Random(args.seed)
+    stats = Stats()
+    started = time.monotonic()
+    stop_at = started + args.duration
+    threads = [
+        threading.Thread(target=VirtualUser(base_url, index, stats, args, random.Random(rng.random())).run,
+                         args=(stop_at, args.iterations), daemon=True)
+        for index in range(args.users)
+    ]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.monotonic() - started
+        rows = stats.summary(duration)
+        print_report(rows, duration, args.users)
+        if gemini_port:
+            try:
+                print(f"\nFake Gemini: {requests.get(f'http://127.0.0.1:{gemini_port}/stats', timeout=5).json()}")
+            except requests.RequestException:
+                pass
+    finally:
+        if processes:
+            stop_stack(processes, workdir)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as handle:
+            json.dump({'duration': duration, 'users': args.users, 'routes': rows}, handle, indent=2)
+
+    failed = False
+    for row in rows:
+        if args.max_error_rate is not None and row['error_rate'] > args.max_error_rate:
+            print(f"FAIL: {row['route']} rata de erori {row['error_rate']:.2%} > {args.max_error_rate:.2%}")
+            failed = True
+        if (args.max_p95_ms is not None and not row['route'].startswith('generate')
+                and row['p95_ms'] > args.max_p95_ms):
+            print(f"FAIL: {row['route']} p95 {row['p95_ms']:.0f} ms > {args.max_p95_ms:.0f} ms")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+profile_startup.py - Costul pornirii unui worker: importuri și fazele de inițializare din app.py
+
+Fiecare rulare e un proces Python nou (pornire la rece) care face `import app`, într-un
+director temporar (baza de date se creează acolo, ca pe discul efemer Render). Se raportează:
+
+- timpul total al `import app` (median / max pe `--runs` rulări, fără `-X importtime`)
+- fazele de după importuri (`app.STARTUP_PHASES`: dotenv, flask, metrics, gemini,
+  database, caches, generation, routes)
+- cele mai scumpe module importate direct (cumulativ, dintr-o rulare în plus cu `-X importtime`)
+- dacă `requests` / `httpx` au fost importate la pornire (ar trebui să nu fie)
+
+Două moduri:
+- import: ca `python app.py` / uvicorn, migrările rulează la import
+- worker: ca un worker Gunicorn, cu schema adusă la zi înaintea fork-ului
+  (gunicorn.conf.py, `DB_SCHEMA_READY=1`)
+
+Iese cu cod 1 dacă medianul modului worker depășește `--max-seconds` (implicit
+`TARGET_SECONDS`). `--app-dir` profilează altă copie a aplicației (ex: un `git worktree`
+al versiunii anterioare, pentru comparație; versiunile fără fazele de pornire raportează
+doar totalul și modulele, `--modes import`).
+
+Rulare: python tools/profile_startup.py [--runs 7] [--top 15] [--max-seconds 0.4] [--app-dir DIR]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import loadtest  # noqa: E402
+
+ROOT = loadtest.ROOT
+# Ținta pentru pornirea unui worker (medianul `import app`), vezi README "Pornire (cold start)"
+TARGET_SECONDS = 0.4
+
+_CHILD = '''
+import json, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+import app
+total = time.perf_counter() - started
+print(json.dumps({{'total': total, 'phases': getattr(app, 'STARTUP_PHASES', []),
+                  'lazy': {{name: name in sys.modules for name in ('requests', 'httpx')}}}}))
+'''
+
+# "import time:       145 |        312 |   flask_wtf.csrf" (microsecunde, indentarea = nivelul)
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)$')
+
+
+def _environment(workdir, mode, app_dir):
+    env = dict(os.environ, LOG_LEVEL='WARNING', METRICS_ENABLED='false', SECRET_KEY='profile-secret',
+               METRICS_DIR=os.path.join(workdir, 'metrics'))
+    env.pop('DB_SCHEMA_READY', None)
+    env.pop('DB_FTS_ENABLED', None)
+    if mode == 'worker':
+        # Ce face gunicorn.conf.py în master înaintea fork-ului
+        output = subprocess.run([sys.executable, os.path.join(app_dir, 'migrations.py')], cwd=workdir, env=env,
+                                check=True, capture_output=True, text=True).stdout
+        env.update(DB_SCHEMA_READY='1', DB_FTS_ENABLED='1' if 'fts=True' in output else '0')
+    return env
+
+
+def run_once(mode, app_dir, importtime=False):
+    """Un proces nou care importă aplicația; (rezultatul din copil, modulele importate direct cu `importtime`)."""
+    with tempfile.TemporaryDirectory(prefix='profile-startup-') as workdir:
+        env = _environment(workdir, mode, app_dir)
+        options = ['-X', 'importtime'] if importtime else []
+        process = subprocess.run([sys.executable, *options, '-c', _CHILD.format(root=app_dir)],
+                                 cwd=workdir, env=env, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise SystemExit(f'import app a eșuat ({mode}):\n{process.stderr[-2000:]}')
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+    # Modulele importate direct de app.py și costul lor cumulativ: `-X importtime` scrie copiii
+    # (nivelul 1) înaintea modulului părinte (nivelul 0)
+    modules, children = {}, {}
+    for line in process.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        level = (len(match.group(3)) - 1) // 2
+        if level == 1:
+            children[match.group(4)] = int(match.group(2)) / 1e6
+        elif level == 0:
+            if match.group(4) == 'app':
+                modules = children
+            children = {}
+    return result, modules
+
+
+def profile(mode, runs, app_dir):
+    totals, phases = [], {}
+    for _ in range(runs):
+        result, _ = run_once(mode, app_dir)
+        totals.append(result['total'])
+        for name, seconds in result['phases']:
+            phases.setdefault(name, []).append(seconds)
+    # `-X importtime` încetinește importurile: doar pentru distribuția pe module
+    result, modules = run_once(mode, app_dir, importtime=True)
+    lazy = result['lazy']
+    median = lambda values: loadtest.percentile(sorted(values), 50)  # noqa: E731
+    phase_total = sum(median(values) for values in phases.values())
+    return {
+        'mode': mode,
+        'median': median(totals),
+        'max': max(totals),
+        'imports': median(totals) - phase_total,
+        'phases': [(name, median(values)) for name, values in phases.items()],
+        'modules': sorted(modules.items(), key=lambda item: -item[1]),
+        'lazy': lazy,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Profilul pornirii aplicației (importuri + faze de inițializare)')
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--top', type=int, default=15, help='câte module importate se afișează')
+    parser.add_argument('--modes', default='import,worker')
+    parser.add_argument('--max-seconds', type=float, default=TARGET_SECONDS, help='ținta pentru medianul modului worker')
+    parser.add_argument('--app-dir', default=ROOT, help='copia aplicației de profilat (implicit acest repo)')
+    args = parser.parse_args(argv)
+
+    reports = [profile(mode, args.runs, os.path.abspath(args.app_dir)) for mode in args.modes.split(',')]
+    for report in reports:
+        print(f"\n== {report['mode']}: import app median {report['median'] * 1000:.0f} ms, "
+              f"max {report['max'] * 1000:.0f} ms ({args.runs} rulări)")
+        print(f"  {'importuri':24} {report['imports'] * 1000:8.1f} ms")
+        for name, seconds in report['phases']:
+            print(f"  {name:24} {seconds * 1000:8.1f} ms")
+        loaded = [name for name, imported in report['lazy'].items() if imported]
+        print(f"  importate la pornire: {', '.join(loaded) or '-'} (din requests, httpx)")
+        print("  module (cumulativ, -X importtime):")
+        for name, seconds in report['modules'][:args.top]:
+            print(f"    {name:30} {seconds * 1000:8.1f} ms")
+
+    worker = next((report for report in reports if report['mode'] == 'worker'), None)
+    if worker is not None and worker['median'] > args.max_seconds:
+        print(f"\nPornirea unui worker ({worker['median']:.3f}s) depășește ținta de {args.max_seconds:.3f}s")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
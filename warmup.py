@@ -0,0 +1,284 @@
+"""
+warmup.py - Pre-generarea rețetelor pentru combinațiile populare de ingrediente
+
+Cererile de generare se concentrează pe câteva combinații (de sezon), dar fiecare
+costă un apel Gemini "la rece" după ce intrarea din cache-ul de generări expiră.
+Warm-up-ul rulează manual (`python warmup.py`), ca proces de fundal (`--loop`) pe o
+mașină care vede același recipes.db, sau într-un thread al serviciului web
+(`WARMUP_IN_PROCESS=true`, vezi `start_in_background`) și, în orele de trafic redus
+(`WARMUP_HOURS`, ora din `WARMUP_TZ`):
+
+1. extrage combinațiile cele mai cerute din ultimele `--days` zile: job-urile de
+   generare (`generation_jobs`) plus hit-urile din cache-ul de generări, grupate după
+   forma canonică a ingredientelor (aceeași cheie ca în generation_cache.py)
+2. păstrează combinațiile fără rețetă în cache sau care expiră înainte de
+   `--refresh-within` secunde
+3. le generează prin același drum ca job-urile aplicației (routerul de modele,
+   `get_gemini_response`), cel mult `--budget` apeluri Gemini per rulare, și le
+   scrie în cache cu `WARMUP_TTL` (implicit 24h), ca să acopere orele de vârf
+
+Workerii aplicației găsesc rețeta în SQLite la primul miss din memorie, deci o
+cerere populară se servește din cache fără job și fără apel Gemini. Apelurile
+warm-up-ului nu consumă cota utilizatorilor și nici cota globală (`QUOTA_GLOBAL_DAILY_LIMIT`):
+bugetul lor e `WARMUP_BUDGET`.
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from generation_cache import normalize_ingredients
+
+logger = logging.getLogger('warmup')
+
+# Cu --loop: cel mult o rulare la atâtea secunde, verificată la fiecare LOOP_SLEEP
+MIN_RUN_INTERVAL = 20 * 3600
+LOOP_SLEEP = 600
+
+
+def parse_hours(spec):
+    """'2-6' -> (2, 6): orele [start, end) în `WARMUP_TZ`; intervalul poate trece de miezul nopții ('23-5')."""
+    start, _, end = (spec or '').partition('-')
+    start, end = int(start), int(end or start)
+    if not (0 <= start < 24 and 0 <= end <= 24):
+        raise ValueError(f'Interval de ore invalid: {spec!r}')
+    return start, end
+
+
+def parse_timezone(name):
+    """'Europe/Bucharest' -> ZoneInfo; fereastra de ore nu depinde de fusul containerului (UTC pe Render)."""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f'Fus orar necunoscut: {name!r}') from None
+
+
+def in_window(hours, now=None, tz=None):
+    """True dacă ora lui `now` (implicit acum, în fusul `tz`) e în fereastra `hours` (start == end: oricând)."""
+    start, end = hours
+    hour = (now or datetime.now(tz)).hour
+    if start == end:
+        return True
+    if start < end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+def seconds_until_window(hours, now=None, tz=None):
+    """Secundele până la începutul ferestrei (0 dacă suntem în ea)."""
+    now = now or datetime.now(tz)
+    if in_window(hours, now):
+        return 0.0
+    start = now.replace(hour=hours[0], minute=0, second=0, microsecond=0)
+    if start <= now:
+        start += timedelta(days=1)
+    return (start - now).total_seconds()
+
+
+def popular_combinations(conn, since, limit=50, min_requests=3):
+    """
+    Combinațiile cerute de cel puțin `min_requests` ori după `since`, cele mai cerute primele.
+
+    Returns:
+        list[dict]: `canonical`, `ingredients` (textul cel mai des trimis, cu diacritice,
+        folosit în prompt), `requests` (job-uri + hit-uri din cache), `users`
+    """
+    requests = Counter()
+    users = defaultdict(set)
+    texts = defaultdict(Counter)
+    rows = conn.execute(
+        'SELECT ingredients, user_id FROM generation_jobs WHERE created_at > ?', (since,)
+    )
+    for ingredients, user_id in rows:
+        canonical = normalize_ingredients(ingredients)
+        if not canonical:
+            continue
+        requests[canonical] += 1
+        users[canonical].add(user_id)
+        texts[canonical][ingredients.strip()] += 1
+    # Cererile servite din cache nu creează job-uri; `hits` numără citirile din SQLite
+    for canonical, hits in conn.execute(
+            'SELECT canonical, hits FROM generation_cache WHERE created_at > ? AND hits > 0', (since,)):
+        requests[canonical] += hits
+
+    combinations = []
+    for canonical, count in requests.most_common():
+        if count < min_requests:
+            break
+        text = texts[canonical].most_common(1)[0][0] if texts[canonical] else canonical.replace(',', ', ')
+        combinations.append({'canonical': canonical, 'ingredients': text, 'requests': count,
+                             'users': len(users[canonical])})
+        if len(combinations) >= limit:
+            break
+    return combinations
+
+
+def due_combinations(combinations, cache, refresh_within, now=None):
+    """Combinațiile fără rețetă în cache sau a căror intrare expiră în mai puțin de `refresh_within` secunde."""
+    deadline = (now or time.time()) + refresh_within
+    due = []
+    for combination in combinations:
+        expires_at = cache.expires_at(combination['ingredients'])
+        if expires_at is None or expires_at < deadline:
+            due.append(combination)
+    return due
+
+
+def warm(combinations, generate, cache, budget, ttl_seconds, concurrency=2, should_continue=None):
+    """
+    Generează rețetele pentru `combinations` (în ordine), cel mult `budget` apeluri.
+
+    `generate(ingredients)` întoarce rețeta sau None; rețetele se scriu în `cache` cu
+    `ttl_seconds`. `should_continue()` e verificat înaintea fiecărui apel (ex: fereastra
+    de ore s-a încheiat). Returns: dict cu `generated`, `failed`, `calls`.
+    """
+    stats = Counter()
+    lock = threading.Lock()
+    selected = combinations[:max(0, budget)]
+
+    def count(field):
+        with lock:
+            stats[field] += 1
+
+    def run(combination):
+        if should_continue is not None and not should_continue():
+            return
+        count('calls')
+        started = time.perf_counter()
+        recipe = generate(combination['ingredients'])
+        if recipe:
+            cache.set(combination['ingredients'], recipe, ttl_seconds=ttl_seconds)
+            count('generated')
+            logger.info("Warm-up generated | requests=%s elapsed=%.2fs ingredients='%s'",
+                        combination['requests'], time.perf_counter() - started, combination['canonical'])
+        else:
+            count('failed')
+            logger.warning("Warm-up failed | ingredients='%s'", combination['canonical'])
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='warmup') as executor:
+        list(executor.map(run, selected))
+    return {'generated': stats['generated'], 'failed': stats['failed'], 'calls': stats['calls']}
+
+
+def run_once(app, args, hours=None):
+    """O rulare: combinațiile populare -> cele de reîmprospătat -> generare în limita bugetului."""
+    since = time.time() - args.days * 86400
+    combinations = popular_combinations(app.get_db(), since, args.top, args.min_requests)
+    due = due_combinations(combinations, app.generation_cache, args.refresh_within)
+    logger.info("Warm-up plan | popular=%s due=%s budget=%s", len(combinations), len(due), args.budget)
+    if args.dry_run:
+        for combination in due[:args.budget]:
+            print(f"{combination['requests']:6} {combination['users']:5}  {combination['ingredients']}")
+        return {'generated': 0, 'failed': 0, 'calls': 0}
+
+    def generate(ingredients):
+        recipe = app.gemini_router.generate(lambda attempt: app.get_gemini_response(ingredients, attempt))
+        return recipe if app._is_complete_recipe(recipe) else None
+
+    result = warm(due, generate, app.generation_cache, args.budget, args.ttl, args.concurrency,
+                  should_continue=(lambda: in_window(hours, tz=args.tz)) if hours else None)
+    logger.info("Warm-up done | popular=%s due=%s generated=%s failed=%s",
+                len(combinations), len(due), result['generated'], result['failed'])
+    return result
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Pre-generează rețetele pentru combinațiile populare de ingrediente')
+    parser.add_argument('--budget', type=int, default=int(os.getenv('WARMUP_BUDGET', '20')),
+                        help='apeluri Gemini per rulare')
+    parser.add_argument('--top', type=int, default=int(os.getenv('WARMUP_TOP', '50')),
+                        help='câte combinații populare se iau în calcul')
+    parser.add_argument('--min-requests', type=int, default=int(os.getenv('WARMUP_MIN_REQUESTS', '3')))
+    parser.add_argument('--days', type=float, default=float(os.getenv('WARMUP_DAYS', '7')),
+                        help='fereastra de istoric (zile)')
+    parser.add_argument('--ttl', type=int, default=int(os.getenv('WARMUP_TTL', str(24 * 3600))),
+                        help='TTL-ul rețetelor pre-generate (secunde)')
+    parser.add_argument('--refresh-within', type=int, default=int(os.getenv('WARMUP_REFRESH_WITHIN', str(18 * 3600))),
+                        help='regenerează intrările care expiră în mai puțin de atâtea secunde')
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('WARMUP_CONCURRENCY', '2')))
+    parser.add_argument('--hours', default=os.getenv('WARMUP_HOURS', '2-6'),
+                        help='orele de trafic redus în fusul --tz, ex: 2-6 (cu --loop)')
+    parser.add_argument('--tz', type=parse_timezone, default=os.getenv('WARMUP_TZ', 'Europe/Bucharest'),
+                        help='fusul orar al ferestrei --hours (implicit Europe/Bucharest)')
+    parser.add_argument('--loop', action='store_true', help='rulează zilnic în fereastra --hours')
+    parser.add_argument('--dry-run', action='store_true', help='doar afișează combinațiile care s-ar genera')
+    return parser
+
+
+def run_loop(app, args, hours):
+    """O rulare pe zi, în fereastra `hours` (fusul `args.tz`); nu se întoarce."""
+    last_run = None
+    while True:
+        wait = seconds_until_window(hours, tz=args.tz)
+        if wait:
+            logger.info("Warm-up waiting | hours=%s tz=%s sleep=%.0fs", args.hours, args.tz, wait)
+            time.sleep(wait)
+            continue
+        # O rulare pe fereastră (și pentru ferestrele care trec de miezul nopții)
+        if last_run is None or time.time() - last_run >= MIN_RUN_INTERVAL:
+            last_run = time.time()
+            try:
+                run_once(app, args, hours)
+            except Exception:
+                logger.exception("Warm-up run failed")
+        time.sleep(LOOP_SLEEP)
+
+
+def start_in_background(app):
+    """
+    Bucla de warm-up într-un thread daemon al serviciului web (`WARMUP_IN_PROCESS=true`).
+
+    Pe Render discul (cu recipes.db) aparține serviciului web: un serviciu separat pentru
+    `python warmup.py --loop` ar scrie în altă bază de date decât cea citită de workeri.
+    Fiecare worker Gunicorn pornește thread-ul, dar bucla rulează doar în cel care obține
+    `flock` pe `<baza de date>.warmup.lock`; ceilalți reîncearcă la LOOP_SLEEP secunde, deci
+    preiau bucla dacă workerul care o rula e repornit. Configurarea e cea din mediu (`WARMUP_*`).
+    """
+    try:
+        import fcntl
+    except ImportError:
+        logger.warning("Warm-up in process unavailable (no fcntl on this platform)")
+        return None
+    args = build_parser().parse_args([])
+    hours = parse_hours(args.hours)
+
+    def run():
+        with open(f'{app.DATABASE}.warmup.lock', 'a') as lock:
+            while True:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except OSError:
+                    time.sleep(LOOP_SLEEP)
+            logger.info("Warm-up loop started in process | pid=%s", os.getpid())
+            run_loop(app, args, hours)
+
+    thread = threading.Thread(target=run, name='warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    hours = parse_hours(args.hours)
+
+    # Importul aplicației deschide baza de date, aplică migrările și creează clientul Gemini
+    import app
+
+    if not app.GEMINI_API_KEY and not args.dry_run:
+        logger.error("GEMINI_API_KEY lipsește")
+        return 1
+    if not args.loop:
+        result = run_once(app, args)
+        return 0 if not result['failed'] else 1
+    run_loop(app, args, hours)
+
+
+if __name__ == '__main__':
+    sys.exit(main())